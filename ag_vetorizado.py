@@ -0,0 +1,265 @@
+"""
+Motor de AG vetorizado (NumPy) para main2.py.
+
+A população é um array int32 (indivíduos × alunos) com o índice denso da
+sala de cada aluno (-1 = não alocado), em vez de listas DEAP de inteiros
+Python. Todos os passos de uma geração operam sobre o array inteiro:
+
+- crossover uniforme: máscaras booleanas sobre pares de pais;
+- mutação: sorteia o número de posições por filho (binomial), depois as
+  posições (distintas), e tira a nova sala da matriz de candidatas (top-K
+  por aluno); se a sala atual está superlotada, vai para a candidata com
+  mais vagas livres, como custom_mutate, com a ocupação atualizada a cada
+  troca;
+- reparo de capacidade (opcional): os filhos com sala superlotada passam
+  por reparo.repair_capacity, linha a linha;
+- avaliação em lote: ocupação por np.bincount e custos pela matriz float32
+  alunos × K do custo de cada candidata (distância + penalidade,
+  pré-calculada); salas válidas fora do top-K têm a distância calculada na
+  hora. Em blocos de linhas para limitar a memória;
+- seleção (mu + lambda) por torneio vetorizado.
+
+O fitness tem as mesmas parcelas de avaliador.IncrementalEvaluator, somadas
+em float64 (o melhor indivíduo final é reavaliado pelo avaliador exato).
+
+Com `peso`, cada linha do problema é uma unidade de alunos idênticos (ver
+unidades.py) alocada inteira em uma sala: o cromossomo encolhe para uma
+posição por unidade, e custos, violações e ocupação são multiplicados pelo
+tamanho da unidade.
+"""
+import time
+
+import numpy as np
+from deap import tools
+
+from reparo import repair_capacity
+
+# Linhas da população avaliadas por vez (limita os temporários P × alunos)
+BLOCO_AVALIACAO = 32
+
+
+class BatchProblem:
+    """
+    Arrays do problema para o motor vetorizado.
+
+    `candidatas` é a matriz int32 (alunos × K) de índices densos de sala em
+    ordem crescente de distância (-1 = sem opção) e `custo_candidatas`
+    (alunos × K) o custo de cada candidata; `distancia(alunos, escolas)`
+    devolve a distância (km) de alunos a escolas, para as salas fora das
+    candidatas; `sala_col` a escola de cada sala (-1 se a escola não existe);
+    `sala_grupo`/`aluno_grupo` códigos de (etapa, horario); `penalidades` o
+    dicionário de pesos de main2.py; `peso` (opcional) o número de alunos de
+    cada linha.
+    """
+
+    def __init__(self, candidatas, custo_candidatas, distancia, sala_col, sala_grupo,
+                 sala_vagas, aluno_grupo, especial, penalidades, peso=None):
+        self.candidatas = np.ascontiguousarray(candidatas, dtype=np.int32)
+        self.n_opcoes = (self.candidatas >= 0).sum(axis=1)
+        # Custo (distância + penalidade de longa distância) só das candidatas
+        self.custo_candidatas = np.ascontiguousarray(custo_candidatas, dtype=np.float32)
+        self.distancia = distancia
+        self.sala_col = np.asarray(sala_col, dtype=np.int64)
+        self.sala_grupo = np.asarray(sala_grupo, dtype=np.int64)
+        self.sala_vagas = np.asarray(sala_vagas, dtype=np.int64)
+        self.aluno_grupo = np.asarray(aluno_grupo, dtype=np.int64)
+        self.especial = np.asarray(especial, dtype=bool)
+        self.penalidades = penalidades
+        self.n_alunos = len(self.aluno_grupo)
+        self.n_salas = len(self.sala_vagas)
+        self.avaliacoes = 0
+        self.peso = None if peso is None else np.asarray(peso, dtype=np.int64)
+
+    def arc_cost(self, dist):
+        """Custo de cada distância: a distância mais a penalidade de longa distância."""
+        p = self.penalidades
+        dist = np.asarray(dist, dtype=np.float64)
+        return dist + np.maximum(0.0, dist - p["distance_target_km"]) ** 2 * p["distance_multiplier"]
+
+    def occupancy(self, genes):
+        """Ocupação (linhas × salas) de cada indivíduo."""
+        # Não alocados contam numa sala fictícia (última coluna), descartada
+        largura = self.n_salas + 1
+        chave = np.where(genes >= 0, genes, self.n_salas).astype(np.int64)
+        chave += (np.arange(len(genes)) * largura)[:, None]
+        pesos = None if self.peso is None else np.broadcast_to(self.peso, genes.shape).ravel()
+        return np.bincount(chave.ravel(), pesos, minlength=len(genes) * largura).reshape(
+            len(genes), largura)[:, :-1].astype(np.int64)
+
+    def evaluate(self, genes):
+        """Fitness (float64) de cada linha de `genes`."""
+        fitness = np.empty(len(genes))
+        for ini in range(0, len(genes), BLOCO_AVALIACAO):
+            fitness[ini:ini + BLOCO_AVALIACAO] = self._evaluate_block(genes[ini:ini + BLOCO_AVALIACAO])
+        self.avaliacoes += len(genes)
+        return fitness
+
+    def _evaluate_block(self, genes):
+        p = self.penalidades
+        alocado = genes >= 0
+        g = np.where(alocado, genes, 0)
+        col = self.sala_col[g]
+        valido = alocado & (col >= 0) & (self.sala_grupo[g] == self.aluno_grupo)
+
+        # Custo de cada gene pela posição entre as candidatas: a primeira
+        # coluna (a maioria dos genes) numa passada densa, as outras só nos
+        # genes ainda sem posição; fora do top-K, pela distância
+        primeira = valido & (genes == self.candidatas[:, 0])
+        custo = np.where(primeira, self.custo_candidatas[:, 0], 0.0).ravel()
+        pos = np.flatnonzero(valido & ~primeira)
+        alunos, salas = pos % self.n_alunos, genes.ravel()[pos]
+        for j in range(1, self.candidatas.shape[1]):
+            if not len(pos):
+                break
+            acerto = salas == self.candidatas[alunos, j]
+            custo[pos[acerto]] = self.custo_candidatas[alunos[acerto], j]
+            resto = ~acerto
+            pos, alunos, salas = pos[resto], alunos[resto], salas[resto]
+        if len(pos):
+            custo[pos] = self.arc_cost(self.distancia(alunos, col.ravel()[pos]))
+        custo = custo.reshape(genes.shape)
+        custo = custo.sum(axis=1) if self.peso is None else custo @ self.peso
+
+        sobra = np.maximum(0, self.occupancy(genes) - self.sala_vagas).sum(axis=1)
+        nao_alocado = ~alocado
+        return (custo
+                + self._count(alocado & ~valido) * p["mismatch"]
+                + self._count(nao_alocado & self.especial) * p["unassigned_special"]
+                + self._count(nao_alocado & ~self.especial) * p["unassigned_normal"]
+                + sobra * p["overcapacity"])
+
+    def _count(self, mascara):
+        """Alunos marcados em cada linha de `mascara` (somando os pesos)."""
+        if self.peso is None:
+            return mascara.sum(axis=1)
+        return mascara @ self.peso
+
+    def crossover(self, rng, pais_a, pais_b, indpb=0.5):
+        """Crossover uniforme: cada gene vem de `pais_b` com probabilidade indpb."""
+        return np.where(rng.random(pais_a.shape) < indpb, pais_b, pais_a)
+
+    def mutate(self, rng, genes, indpb):
+        """
+        Mutação (in place) de cada linha de `genes`: cada posição é sorteada
+        com prob. indpb, sem repetição, e as sorteadas são visitadas em
+        ordem, com a ocupação atualizada a cada troca, como custom_mutate.
+        """
+        ocupacao = self.occupancy(genes)
+        por_linha = rng.binomial(self.n_alunos, indpb, size=len(genes))
+        for linha, n in enumerate(por_linha.tolist()):
+            alunos = np.sort(rng.choice(self.n_alunos, n, replace=False))
+            alunos = alunos[self.n_opcoes[alunos] > 1]
+            if len(alunos) == 0:
+                continue
+            # Sala sorteada entre as candidatas do aluno
+            escolha = (rng.random(len(alunos)) * self.n_opcoes[alunos]).astype(np.int64)
+            self._move(genes[linha], ocupacao[linha], alunos,
+                       self.candidatas[alunos, escolha])
+        return genes
+
+    def _move(self, salas, ocupacao, alunos, sorteadas):
+        """Troca de sala dos `alunos` de uma linha, em ordem, atualizando `ocupacao`."""
+        vagas = self.sala_vagas
+        peso = [1] * len(alunos) if self.peso is None else self.peso[alunos].tolist()
+        for i, nova, p in zip(alunos.tolist(), sorteadas.tolist(), peso):
+            atual = int(salas[i])
+            # Sala atual superlotada: vai para a candidata com mais vagas livres
+            if atual >= 0 and ocupacao[atual] > vagas[atual]:
+                cand = self.candidatas[i, :self.n_opcoes[i]]
+                livres = vagas[cand] - ocupacao[cand]
+                melhor = int(livres.argmax())
+                if livres[melhor] > 0:
+                    nova = int(cand[melhor])
+            if nova != atual:
+                salas[i] = nova
+                if atual >= 0:
+                    ocupacao[atual] -= p
+                ocupacao[nova] += p
+
+    def repair(self, genes):
+        """Reparo de capacidade (in place) das linhas de `genes` com sala superlotada."""
+        ocupacao = self.occupancy(genes)
+        for linha in np.flatnonzero((ocupacao > self.sala_vagas).any(axis=1)).tolist():
+            repair_capacity(genes[linha], self.sala_vagas, self.candidatas,
+                            self.custo_candidatas, ocupacao[linha], self.peso)
+        return genes
+
+
+def select_tournament(rng, fitness, k, tournsize=3):
+    """Índices de `k` vencedores de torneios de `tournsize` (menor fitness)."""
+    competidores = rng.integers(len(fitness), size=(k, tournsize))
+    return competidores[np.arange(k), fitness[competidores].argmin(axis=1)]
+
+
+def vary(rng, problema, genes, lambda_, cxpb, mutpb, indpb, reparo=False):
+    """
+    Filhos como em algorithms.varOr: cada um vem de crossover (prob. cxpb),
+    mutação (mutpb) ou cópia de um pai sorteado. Com `reparo`, os filhos
+    cruzados e mutados passam pelo reparo de capacidade.
+    """
+    sorteio = rng.random(lambda_)
+    cruzados = sorteio < cxpb
+    mutados = ~cruzados & (sorteio < cxpb + mutpb)
+    n_cx = int(cruzados.sum())
+
+    filhos = genes[rng.integers(len(genes), size=lambda_)]
+    pais = rng.integers(len(genes), size=(n_cx, 2))
+    filhos[cruzados] = problema.crossover(rng, genes[pais[:, 0]], genes[pais[:, 1]])
+    if mutados.any():
+        filhos[mutados] = problema.mutate(rng, filhos[mutados], indpb)
+    if reparo and (cruzados | mutados).any():
+        filhos[cruzados | mutados] = problema.repair(filhos[cruzados | mutados])
+    return filhos
+
+
+def ea_mu_plus_lambda_batch(problema, genes, mu, lambda_, cxpb, mutpb, ngen, rng,
+                            indpb=0.03, reparo=False, parada=None, telemetria=None, violations=None,
+                            verbose=True):
+    """
+    (mu + lambda) sobre a população `genes`. Retorna (genes, fitness,
+    melhor, logbook), com `melhor` a linha de menor fitness já vista.
+    """
+    fitness = problema.evaluate(genes)
+    melhor_i = int(fitness.argmin())
+    melhor, melhor_fit = genes[melhor_i].copy(), fitness[melhor_i]
+
+    logbook = tools.Logbook()
+    logbook.header = ["gen", "nevals", "avg", "min"] + (
+        ["gap"] if parada is not None and parada.limite_inferior is not None else [])
+    ultimo = (time.perf_counter(), problema.avaliacoes)
+
+    for gen in range(ngen + 1):
+        if gen > 0:
+            filhos = vary(rng, problema, genes, lambda_, cxpb, mutpb, indpb, reparo)
+            todos = np.concatenate([genes, filhos])
+            todos_fit = np.concatenate([fitness, problema.evaluate(filhos)])
+            escolhidos = select_tournament(rng, todos_fit, mu)
+            genes, fitness = todos[escolhidos], todos_fit[escolhidos]
+            i = int(todos_fit.argmin())
+            if todos_fit[i] < melhor_fit:
+                melhor, melhor_fit = todos[i].copy(), todos_fit[i]
+
+        registro = {"avg": float(fitness.mean()), "min": float(fitness.min())}
+        if parada is not None:
+            parada.update(float(melhor_fit))
+            if parada.limite_inferior is not None:
+                registro["gap"] = parada.gap()
+        logbook.record(gen=gen, nevals=len(genes) if gen == 0 else lambda_, **registro)
+        if verbose:
+            print(logbook.stream)
+
+        if telemetria is not None and telemetria.ativa:
+            agora = time.perf_counter()
+            t0, n0 = ultimo
+            ultimo = (agora, problema.avaliacoes)
+            campos = {"geracao": gen, "melhor": float(melhor_fit), "media": registro["avg"],
+                      "avaliacoes": problema.avaliacoes - n0,
+                      "avaliacoes_s": round((problema.avaliacoes - n0) / max(agora - t0, 1e-9), 1)}
+            if violations is not None:
+                campos["violacoes"] = violations(melhor)
+            telemetria.emit("geracao", **campos)
+
+        if parada is not None and parada.motivo is not None:
+            break
+
+    return genes, fitness, melhor, logbook
@@ -0,0 +1,92 @@
+"""
+Backend opcional de avaliação paralela para o AG de main2.py.
+
+Os processos do pool recebem os dados estáticos uma única vez (no
+inicializador) e montam seu próprio IncrementalEvaluator. A cada geração só
+os cromossomos atravessam a fronteira entre processos, agrupados em blocos e
+serializados como buffers int32 compactos.
+
+Como o avaliador acumula as distâncias em ponto fixo, o fitness calculado nos
+workers é idêntico ao calculado no processo principal: para uma semente fixa,
+a evolução é a mesma com ou sem paralelismo.
+
+Os workers devolvem também o EstadoAvaliacao de cada cromossomo (ocupação
+por sala e parcelas, bem menor que os genes), que vira o `avaliacao` do
+indivíduo no processo principal, com `alterados` zerado: mutação, reparo e
+duplicatas do cache continuam usando o estado como na avaliação serial.
+"""
+import multiprocessing
+
+import numpy as np
+
+from avaliador import IncrementalEvaluator
+
+# Blocos por worker em cada geração (equilibra carga x custo de IPC).
+BLOCOS_POR_WORKER = 4
+
+_EVALUATOR = None
+
+
+def _init_worker(modelo, unassigned_id, penalidades):
+    global _EVALUATOR
+    _EVALUATOR = IncrementalEvaluator(modelo, unassigned_id, penalidades)
+
+
+def _evaluate_chunk(tarefa):
+    buffer, n_genes = tarefa
+    genes = np.frombuffer(buffer, dtype=np.int32).reshape(-1, n_genes)
+    resultados = []
+    for linha in genes.tolist():
+        estado = _EVALUATOR.full_state(linha)
+        resultados.append(((_EVALUATOR.score(estado),), estado))
+    return resultados
+
+
+class ParallelEvaluator:
+    """
+    Pool de avaliação compatível com toolbox.register("map", ...).
+
+    A função recebida em `map` é ignorada: os workers sempre avaliam com o
+    IncrementalEvaluator montado a partir de `initargs`, e `map` grava o
+    estado de avaliação devolvido em cada indivíduo. `avaliacoes` conta os
+    cromossomos avaliados nos workers.
+    """
+
+    def __init__(self, n_workers, initargs, chunksize=None):
+        self.n_workers = n_workers
+        self.chunksize = chunksize
+        self.avaliacoes = 0
+        self.pool = multiprocessing.Pool(n_workers, initializer=_init_worker,
+                                         initargs=initargs)
+
+    def map(self, func, individuals):
+        individuals = list(individuals)
+        if not individuals:
+            return []
+        n_genes = len(individuals[0])
+        chunksize = self.chunksize or max(
+            1, -(-len(individuals) // (self.n_workers * BLOCOS_POR_WORKER)))
+
+        tarefas = []
+        for ini in range(0, len(individuals), chunksize):
+            bloco = np.array(individuals[ini:ini + chunksize], dtype=np.int32)
+            tarefas.append((bloco.tobytes(), n_genes))
+
+        fitnesses = []
+        resultados = (r for parcial in self.pool.map(_evaluate_chunk, tarefas) for r in parcial)
+        for ind, (fitness, estado) in zip(individuals, resultados):
+            ind.avaliacao = estado
+            ind.alterados = {}
+            fitnesses.append(fitness)
+        self.avaliacoes += len(fitnesses)
+        return fitnesses
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,187 @@
+"""
+Avaliação incremental (delta) de fitness para o AG de main2.py.
+
+Cada indivíduo avaliado carrega um EstadoAvaliacao com a ocupação por sala e
+as parcelas do fitness (excesso de vagas, soma de distâncias, penalidade de
+longa distância, contagens de não alocados e incompatibilidades). Os
+operadores de variação registram as posições alteradas em
+`individual.alterados` (posição -> sala anterior) e a próxima avaliação
+atualiza o estado em O(genes alterados), recalculando tudo apenas quando não
+há estado ou quando a maior parte do cromossomo mudou.
+
+As distâncias são acumuladas em inteiros (ponto fixo, ESCALA_DISTANCIA
+unidades por km), de modo que atualizações incrementais e recálculos
+completos produzem exatamente o mesmo fitness, em qualquer ordem e em
+qualquer processo.
+"""
+import random
+
+# Acima desta fração de genes alterados, o recálculo completo é mais barato.
+FRACAO_RECALCULO = 0.5
+
+# Resolução das distâncias acumuladas: 1e-6 km (1 mm).
+ESCALA_DISTANCIA = 1_000_000
+
+
+class EstadoAvaliacao:
+    """Parcelas do fitness de um indivíduo."""
+
+    __slots__ = ("ocupacao", "excesso", "distancia", "longa",
+                 "mismatch", "unassigned_special", "unassigned_normal")
+
+    def __init__(self):
+        self.ocupacao = {}
+        self.excesso = 0
+        self.distancia = 0  # em 1/ESCALA_DISTANCIA km
+        self.longa = 0      # em (1/ESCALA_DISTANCIA km)² × multiplicador
+        self.mismatch = 0
+        self.unassigned_special = 0
+        self.unassigned_normal = 0
+
+    def copy(self):
+        """Cópia independente (só o dicionário de ocupação é duplicado)."""
+        novo = EstadoAvaliacao.__new__(EstadoAvaliacao)
+        for campo in self.__slots__:
+            setattr(novo, campo, getattr(self, campo))
+        novo.ocupacao = dict(self.ocupacao)
+        return novo
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
+def mark_changed(individual, pos):
+    """Registra que o gene `pos` vai mudar (chamar ANTES da atribuição)."""
+    alterados = getattr(individual, "alterados", None)
+    if alterados is not None:
+        alterados.setdefault(pos, individual[pos])
+
+
+def cx_uniform_tracked(ind1, ind2, indpb):
+    """
+    Igual a tools.cxUniform (mesma sequência de números aleatórios), mas
+    registra as posições efetivamente trocadas para a avaliação incremental.
+    """
+    size = min(len(ind1), len(ind2))
+    for i in range(size):
+        if random.random() < indpb and ind1[i] != ind2[i]:
+            mark_changed(ind1, i)
+            mark_changed(ind2, i)
+            ind1[i], ind2[i] = ind2[i], ind1[i]
+    return ind1, ind2
+
+
+class IncrementalEvaluator:
+    """
+    Fitness de main2.py com atualização incremental.
+
+    Os dados vêm de um modelo.CompactModel: a distância do aluno i à escola
+    de uma sala do seu grupo é `dist_blocos[inicio[i] + col]`, com `col` a
+    coluna da escola no bloco do grupo; `penalidades` traz os pesos usados
+    em main2.py.
+    """
+
+    def __init__(self, modelo, unassigned_id, penalidades):
+        self.dist = modelo.dist_blocos
+        self.inicio = modelo.inicio_unidade[modelo.unidade].tolist()
+        self.unassigned_id = unassigned_id
+        self.special = modelo.alunos["especial"].tolist()
+        self.grupo = modelo.alunos["grupo"].tolist()
+        self.n = modelo.n_alunos
+
+        # id_sala -> (vagas, código do grupo, coluna da escola no bloco do grupo ou None)
+        salas = modelo.salas
+        self.salas = {
+            id_sala: (vagas, grupo, col if col >= 0 else None)
+            for id_sala, vagas, grupo, col in zip(salas["id"].tolist(), salas["vagas"].tolist(),
+                                                  salas["grupo"].tolist(),
+                                                  salas["col_bloco"].tolist())
+        }
+
+        self.p_mismatch = penalidades["mismatch"]
+        self.p_unassigned_special = penalidades["unassigned_special"]
+        self.p_unassigned_normal = penalidades["unassigned_normal"]
+        self.p_overcapacity = penalidades["overcapacity"]
+        self.target = round(penalidades["distance_target_km"] * ESCALA_DISTANCIA)
+        self.p_distance = penalidades["distance_multiplier"]
+
+        self.full_evaluations = 0
+        self.delta_evaluations = 0
+
+    def _apply(self, est, i, id_sala, sinal):
+        """Soma (sinal=+1) ou remove (sinal=-1) a contribuição do aluno i."""
+        sala = self.salas.get(id_sala) if id_sala != self.unassigned_id else None
+        if sala is None:
+            if self.special[i]:
+                est.unassigned_special += sinal
+            else:
+                est.unassigned_normal += sinal
+            return
+
+        vagas, grupo, col = sala
+        antes = est.ocupacao.get(id_sala, 0)
+        depois = antes + sinal
+        est.ocupacao[id_sala] = depois
+        est.excesso += max(0, depois - vagas) - max(0, antes - vagas)
+
+        if grupo != self.grupo[i] or col is None:
+            est.mismatch += sinal
+            return
+
+        dist = round(float(self.dist[self.inicio[i] + col]) * ESCALA_DISTANCIA)
+        est.distancia += sinal * dist
+        if dist > self.target:
+            est.longa += sinal * (dist - self.target) ** 2 * self.p_distance
+
+    def _recompute(self, individual):
+        est = EstadoAvaliacao()
+        for i, id_sala in enumerate(individual):
+            self._apply(est, i, id_sala, 1)
+        return est
+
+    def full_state(self, individual):
+        """Recalcula o estado do zero."""
+        self.full_evaluations += 1
+        return self._recompute(individual)
+
+    def score(self, est):
+        return (
+            est.mismatch * self.p_mismatch +
+            est.unassigned_special * self.p_unassigned_special +
+            est.unassigned_normal * self.p_unassigned_normal +
+            est.excesso * self.p_overcapacity +
+            est.longa / ESCALA_DISTANCIA ** 2 +
+            est.distancia / ESCALA_DISTANCIA
+        )
+
+    def sync(self, individual):
+        """
+        Atualiza `individual.avaliacao` com as posições alteradas (ou do zero,
+        quando não há estado ou a maior parte mudou) e zera `alterados`, sem
+        contar como avaliação. Retorna True se a atualização foi incremental.
+        """
+        est = getattr(individual, "avaliacao", None)
+        alterados = getattr(individual, "alterados", None)
+
+        incremental = not (est is None or alterados is None
+                           or len(alterados) > FRACAO_RECALCULO * self.n)
+        if incremental:
+            for i, anterior in alterados.items():
+                atual = individual[i]
+                if atual != anterior:
+                    self._apply(est, i, anterior, -1)
+                    self._apply(est, i, atual, 1)
+        else:
+            est = self._recompute(individual)
+
+        individual.avaliacao = est
+        individual.alterados = {}
+        return incremental
+
+    def evaluate(self, individual):
+        """Avalia `individual`, atualizando incrementalmente quando possível."""
+        if self.sync(individual):
+            self.delta_evaluations += 1
+        else:
+            self.full_evaluations += 1
+        return (self.score(individual.avaliacao),)
@@ -0,0 +1,383 @@
+"""
+Suíte de benchmark dos motores de alocação em instâncias sintéticas.
+
+Para cada escala gera uma instância (gerador_dados.py) e mede, em processos
+separados (para que o pico de RSS seja de cada caso):
+
+- fases de main.py e main2.py: carga (fria e com cache), pré-processamento,
+  população inicial, avaliação por geração e escrita da saída;
+- execução completa de main.py e main2.py com cada motor (e de main.c, se
+  houver compilador): tempo de parede, pico de RSS, fitness final e
+  distância total.
+
+Cada caso vira uma linha JSON em `--saida` (JSONL, acumulativo), com a data e
+o commit, para acompanhar regressões e ver onde cada motor deixa de escalar.
+Casos que estouram `--timeout` ou o limite de memória são registrados com o
+status correspondente.
+
+Uso: python benchmark.py --escalas 10000 100000 --programas main2 main
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import gerador_dados
+
+DIR_REPO = os.path.dirname(os.path.abspath(__file__))
+
+ESCALAS = [10000, 50000, 100000]
+PROGRAMAS = ["main2", "main", "main_c"]
+MOTORES = ["ag", "fluxo", "regret"]
+GERACOES_MEDIDAS = 3
+TIMEOUT_S = 1800
+
+# Prefixo da linha com o resultado JSON de um processo de medição
+MARCADOR = "@@BENCH "
+
+
+def _peak_rss_mb(quem):
+    return resource.getrusage(quem).ru_maxrss / 1024.0
+
+
+def _limit_memory(limite_mb):
+    if limite_mb:
+        limite = int(limite_mb * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+
+def _report(resultado):
+    print(MARCADOR + json.dumps(resultado), flush=True)
+
+
+def _clear_cache(pasta_models):
+    for nome in os.listdir(pasta_models):
+        if ".cache." in nome:
+            os.remove(os.path.join(pasta_models, nome))
+
+
+# --- Fases (executadas dentro de um processo filho) ---
+
+def _phases_main2(pasta, geracoes):
+    from deap import algorithms, tools
+    import main2
+    from parada import evaluate_invalid
+    from cache_fitness import FitnessCache
+
+    models = os.path.join(pasta, "Models")
+    params = main2.DEFAULT_PARAMS
+    fases = {}
+
+    _clear_cache(models)
+    t = time.perf_counter()
+    main2.load_alunos(os.path.join(models, "alunos.txt"))
+    main2.load_escolas(os.path.join(models, "escolas.txt"))
+    main2.load_salas(os.path.join(models, "salas.txt"))
+    fases["carga"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    alunos = main2.load_alunos(os.path.join(models, "alunos.txt"))
+    escolas = main2.load_escolas(os.path.join(models, "escolas.txt"))
+    salas = main2.load_salas(os.path.join(models, "salas.txt"))
+    fases["carga_cache"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    problem = main2.Problem(alunos, escolas, salas)
+    fases["preprocessamento"] = time.perf_counter() - t
+
+    toolbox = main2.build_toolbox(problem, FitnessCache(maxsize=main2.FITNESS_CACHE_SIZE))
+    t = time.perf_counter()
+    pop = toolbox.population(n=params["mu"])
+    evaluate_invalid(pop, toolbox)
+    fases["populacao_inicial"] = time.perf_counter() - t
+
+    tempos = []
+    for _ in range(geracoes):
+        t = time.perf_counter()
+        filhos = algorithms.varOr(pop, toolbox, params["lambda_"], params["cxpb"], params["mutpb"])
+        evaluate_invalid(filhos, toolbox)
+        pop[:] = toolbox.select(pop + filhos, params["mu"])
+        tempos.append(time.perf_counter() - t)
+    fases["geracao"] = sum(tempos) / len(tempos) if tempos else None
+
+    best = tools.selBest(pop, 1)[0]
+    t = time.perf_counter()
+    main2.write_results(problem, best, os.path.join(pasta, "bench_alocacao_final.txt"))
+    fases["escrita"] = time.perf_counter() - t
+    return fases, best.fitness.values[0]
+
+
+def _phases_main(pasta, geracoes):
+    from deap import algorithms, tools
+    import main
+    from parada import evaluate_invalid
+
+    models = os.path.join(pasta, "Models")
+    fases = {}
+
+    def load():
+        escolas = main.load_escolas(os.path.join(models, "escolas.txt"))
+        salas = main.load_salas(os.path.join(models, "salas.txt"))
+        alunos_por_grupo, alunos = main.load_and_group_alunos(os.path.join(models, "alunos.txt"))
+        return escolas, salas, alunos_por_grupo, alunos
+
+    _clear_cache(models)
+    t = time.perf_counter()
+    load()
+    fases["carga"] = time.perf_counter() - t
+    t = time.perf_counter()
+    escolas, salas, alunos_por_grupo, alunos_array = load()
+    salas_por_grupo = main.group_salas(salas, escolas)
+    fases["carga_cache"] = time.perf_counter() - t
+    main.init_worker(escolas, salas, salas_por_grupo)
+
+    # Soma sobre os grupos, resolvidos em sequência (a execução real usa um pool)
+    t = time.perf_counter()
+    toolboxes = {g: main.build_group_toolbox(alunos, salas_por_grupo[g])
+                 for g, alunos in alunos_por_grupo.items() if salas_por_grupo.get(g)}
+    fases["preprocessamento"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    pops = {}
+    for g, toolbox in toolboxes.items():
+        pops[g] = toolbox.population(n=main.N_POP_LOCAL)
+        evaluate_invalid(pops[g], toolbox)
+    fases["populacao_inicial"] = time.perf_counter() - t
+
+    tempos = []
+    for _ in range(geracoes):
+        t = time.perf_counter()
+        for g, toolbox in toolboxes.items():
+            filhos = algorithms.varAnd(toolbox.select(pops[g], len(pops[g])), toolbox,
+                                       main.CXPB_LOCAL, main.MUTPB_LOCAL)
+            evaluate_invalid(filhos, toolbox)
+            pops[g][:] = filhos
+        tempos.append(time.perf_counter() - t)
+    fases["geracao"] = sum(tempos) / len(tempos) if tempos else None
+
+    resultados = []
+    fitness = 0.0
+    for g, alunos in alunos_por_grupo.items():
+        if g in pops:
+            best = tools.selBest(pops[g], 1)[0]
+            fitness += best.fitness.values[0]
+        else:
+            best = [main.UNASSIGNED_SALA_ID] * len(alunos)
+        resultados.append((g, best, alunos))
+    t = time.perf_counter()
+    main.write_results(resultados, alunos_array, os.path.join(pasta, "bench_resultado_alocacao.txt"))
+    fases["escrita"] = time.perf_counter() - t
+    return fases, fitness
+
+
+def run_phases(programa, pasta, geracoes, limite_mb):
+    """Processo filho: mede as fases e reporta o resultado JSON na saída padrão."""
+    _limit_memory(limite_mb)
+    sys.path.insert(0, DIR_REPO)
+    resultado = {"status": "ok"}
+    try:
+        fases, fitness = {"main2": _phases_main2, "main": _phases_main}[programa](pasta, geracoes)
+        resultado.update(fases=fases, fitness=fitness)
+    except MemoryError:
+        resultado["status"] = "erro: MemoryError"
+    resultado["pico_rss_mb"] = max(_peak_rss_mb(resource.RUSAGE_SELF),
+                                   _peak_rss_mb(resource.RUSAGE_CHILDREN))
+    _report(resultado)
+
+
+def run_measured(comando, pasta, log, timeout, limite_mb):
+    """Processo filho: executa `comando` em `pasta` e reporta tempo e pico de RSS."""
+    _limit_memory(limite_mb)
+    t = time.perf_counter()
+    with open(log, "w", encoding="utf-8") as f:
+        proc = subprocess.Popen(comando, cwd=pasta, stdout=f, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+        try:
+            proc.wait(timeout=timeout)
+            status = "ok" if proc.returncode == 0 else f"erro: código {proc.returncode}"
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+            status = "timeout"
+    _report({"status": status, "tempo_s": time.perf_counter() - t,
+             "pico_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN)})
+
+
+# --- Orquestração ---
+
+def _child(args_filho, timeout=None):
+    """Executa este script como processo filho e devolve o JSON reportado."""
+    comando = [sys.executable, os.path.abspath(__file__)] + args_filho
+    try:
+        proc = subprocess.run(comando, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout"}
+    for linha in reversed(proc.stdout.splitlines()):
+        if linha.startswith(MARCADOR):
+            return json.loads(linha[len(MARCADOR):])
+    erro = (proc.stderr.strip().splitlines() or ["sem saída"])[-1]
+    return {"status": f"erro: {erro}"}
+
+
+def _search(padrao, texto, tipo=float):
+    m = re.search(padrao, texto)
+    return tipo(m.group(1)) if m else None
+
+
+def parse_result(programa, pasta, log):
+    """Extrai fitness, distância total e não alocados da saída de cada programa."""
+    with open(log, "r", encoding="utf-8", errors="replace") as f:
+        texto = f.read()
+    if programa == "main2":
+        especiais = _search(r"especiais não alocados: (\d+)", texto, int)
+        normais = _search(r"normais não alocados: (\d+)", texto, int)
+        return {"fitness": _search(r"Fitness total: ([\d.]+)", texto),
+                "distancia_total_km": _search(r"Total: ([\d.]+) km", texto),
+                "nao_alocados": None if especiais is None else especiais + normais}
+    if programa == "main":
+        return {"distancia_total_km": _search(r"Percorrida \(Real\): ([\d.]+) km", texto),
+                "nao_alocados": _search(r"Alunos Não Alocados: (\d+)", texto, int)}
+    return {"fitness": _search(r"Melhor Fitness \(Custo\) encontrado: ([\d.]+)", texto),
+            "nao_alocados": _search(r"Total Nao Alocados: (\d+)", texto, int)}
+
+
+def compile_c(trabalho):
+    """Compila main.c em `trabalho`. Retorna o executável ou None."""
+    compilador = shutil.which("cc") or shutil.which("gcc")
+    if compilador is None:
+        return None
+    executavel = os.path.join(trabalho, "main_c")
+    proc = subprocess.run([compilador, "-O2", "-o", executavel,
+                           os.path.join(DIR_REPO, "main.c"), "-lm"],
+                          capture_output=True, text=True)
+    return executavel if proc.returncode == 0 else None
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIR_REPO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _default_memory_limit_mb():
+    try:
+        return 0.8 * os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2**20
+    except (ValueError, OSError):
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de alocação.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=ESCALAS,
+                        help=f"Números de alunos (padrão: {' '.join(map(str, ESCALAS))}).")
+    parser.add_argument("--programas", nargs="+", choices=PROGRAMAS, default=PROGRAMAS)
+    parser.add_argument("--motores", nargs="+", choices=MOTORES, default=MOTORES,
+                        help="Motores das execuções completas de main.py e main2.py.")
+    parser.add_argument("--sem-fases", action="store_true",
+                        help="Mede só as execuções completas.")
+    parser.add_argument("--sem-execucao", action="store_true",
+                        help="Mede só as fases.")
+    parser.add_argument("--geracoes", type=int, default=GERACOES_MEDIDAS,
+                        help=f"Gerações medidas na fase de evolução (padrão: {GERACOES_MEDIDAS}).")
+    parser.add_argument("--folga", type=float, default=1.3,
+                        help="Aperto de capacidade das instâncias (ver gerador_dados.py).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Repassado a main.py e main2.py.")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_S,
+                        help=f"Limite por caso, em segundos (padrão: {TIMEOUT_S}).")
+    parser.add_argument("--limite-memoria-mb", type=float, default=_default_memory_limit_mb(),
+                        help="Limite de memória por caso (padrão: 80%% da RAM).")
+    parser.add_argument("--trabalho", default="bench_trabalho",
+                        help="Pasta das instâncias e saídas (padrão: bench_trabalho).")
+    parser.add_argument("--saida", default="benchmark_resultados.jsonl",
+                        help="Arquivo JSONL de resultados (padrão: benchmark_resultados.jsonl).")
+    return parser.parse_args()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--_fases":
+        programa, pasta, geracoes, limite = sys.argv[2:6]
+        run_phases(programa, pasta, int(geracoes), float(limite) or None)
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--_medir":
+        pasta, log, timeout, limite = sys.argv[2:6]
+        run_measured(sys.argv[7:], pasta, log, float(timeout), float(limite) or None)
+        return
+
+    args = parse_args()
+    os.makedirs(args.trabalho, exist_ok=True)
+    limite = str(args.limite_memoria_mb or 0)
+    base = {"data": datetime.datetime.now().isoformat(timespec="seconds"), "commit": _commit(),
+            "folga": args.folga, "seed": args.seed}
+
+    executavel_c = None
+    if "main_c" in args.programas:
+        executavel_c = compile_c(os.path.abspath(args.trabalho))
+        if executavel_c is None:
+            print("⚠ main.c: compilador indisponível ou falha na compilação; ignorado.")
+
+    linhas = []
+    with open(args.saida, "a", encoding="utf-8") as saida:
+        def record(registro):
+            registro = {**base, **registro}
+            saida.write(json.dumps(registro) + "\n")
+            saida.flush()
+            linhas.append(registro)
+            tempo = registro.get("tempo_s")
+            print(f"  {registro['programa']:<7} {registro['tipo']:<8} {registro.get('motor') or '-':<7} "
+                  f"{registro['status']:<10} "
+                  f"{'' if tempo is None else f'{tempo:.2f}s':>10} "
+                  f"{registro.get('pico_rss_mb') or 0:>9.0f} MB  "
+                  f"fitness={registro.get('fitness')} dist={registro.get('distancia_total_km')}")
+            for fase, segundos in (registro.get("fases") or {}).items():
+                if segundos is not None:
+                    print(f"      {fase:<18} {segundos:>9.3f}s")
+
+        for escala in args.escalas:
+            pasta = os.path.abspath(os.path.join(args.trabalho, f"n{escala}"))
+            t = time.perf_counter()
+            gerador_dados.write_instance(os.path.join(pasta, "Models"),
+                                         *gerador_dados.generate(escala, folga=args.folga,
+                                                                 seed=args.seed))
+            print(f"\n📦 Escala {escala}: instância gerada em {time.perf_counter() - t:.1f}s ({pasta})")
+            caso = {"escala": escala}
+
+            for programa in args.programas:
+                if programa == "main_c":
+                    if executavel_c is None or args.sem_execucao:
+                        continue
+                    comandos = {"ag": [executavel_c]}
+                else:
+                    if not args.sem_fases:
+                        r = _child(["--_fases", programa, pasta, str(args.geracoes), limite],
+                                   timeout=args.timeout)
+                        record({**caso, "programa": programa, "tipo": "fases", **r})
+                    if args.sem_execucao:
+                        continue
+                    script = os.path.join(DIR_REPO, f"{programa}.py")
+                    extra = ["--workers", str(args.workers)] if args.workers else []
+                    comandos = {m: [sys.executable, script, "--engine", m] + extra
+                                for m in args.motores}
+
+                for motor, comando in comandos.items():
+                    log = os.path.join(pasta, f"log_{programa}_{motor}.txt")
+                    r = _child(["--_medir", pasta, log, str(args.timeout), limite, "--"] + comando)
+                    if r["status"] == "ok":
+                        r.update(parse_result(programa, pasta, log))
+                    record({**caso, "programa": programa, "tipo": "execucao", "motor": motor, **r})
+
+    print(f"\n✓ {len(linhas)} resultados adicionados a {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Cache de fitness limitado, indexado por impressão digital do cromossomo.
+
+A chave é um hash BLAKE2b de 128 bits dos genes (como int32), em vez de uma
+tupla com o cromossomo inteiro. As entradas são descartadas por LRU quando o
+limite é atingido, e as estatísticas de acertos/falhas/descartes ficam
+disponíveis para calibrar o tamanho.
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+def fingerprint(individual):
+    """Hash de 128 bits do cromossomo."""
+    genes = np.asarray(individual, dtype=np.int32)
+    return hashlib.blake2b(genes.tobytes(), digest_size=16).digest()
+
+
+class FitnessCache:
+    """Cache LRU de fitness com limite de entradas."""
+
+    def __init__(self, maxsize=20000):
+        self.maxsize = maxsize
+        self._dados = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    def get(self, chave):
+        valor = self._dados.get(chave)
+        if valor is None:
+            self.misses += 1
+            return None
+        self._dados.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def put(self, chave, valor):
+        self._dados[chave] = valor
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.maxsize:
+            self._dados.popitem(last=False)
+            self.evictions += 1
+
+    def wrap(self, evaluate):
+        """Envolve uma função de avaliação com consulta ao cache."""
+        def evaluate_cached(individual):
+            chave = fingerprint(individual)
+            valor = self.get(chave)
+            if valor is None:
+                valor = evaluate(individual)
+                self.put(chave, valor)
+            return valor
+        return evaluate_cached
+
+    def map(self, evaluate, individuals, inner_map=map, on_duplicate=None):
+        """
+        Avalia uma geração inteira: consulta o cache e avalia apenas uma vez
+        cada cromossomo distinto (duplicatas exatas reaproveitam o resultado).
+        `inner_map` permite delegar as avaliações a outro backend e
+        `on_duplicate(avaliado, duplicata)` é chamado para cada duplicata,
+        permitindo copiar estado auxiliar do indivíduo avaliado.
+        """
+        individuals = list(individuals)
+        chaves = [fingerprint(ind) for ind in individuals]
+        resultados = [None] * len(individuals)
+        pendentes = {}
+
+        for pos, chave in enumerate(chaves):
+            if chave in pendentes:
+                pendentes[chave].append(pos)
+                self.hits += 1
+                continue
+            valor = self.get(chave)
+            if valor is None:
+                pendentes[chave] = [pos]
+            else:
+                resultados[pos] = valor
+
+        primeiros = [individuals[posicoes[0]] for posicoes in pendentes.values()]
+        for (chave, posicoes), valor in zip(pendentes.items(), inner_map(evaluate, primeiros)):
+            self.put(chave, valor)
+            for pos in posicoes:
+                resultados[pos] = valor
+            if on_duplicate is not None:
+                for pos in posicoes[1:]:
+                    on_duplicate(individuals[posicoes[0]], individuals[pos])
+        return resultados
+
+    def stats(self):
+        total = self.hits + self.misses
+        taxa = 100.0 * self.hits / total if total else 0.0
+        return (f"{len(self)}/{self.maxsize} entradas | hits {self.hits} | "
+                f"misses {self.misses} | evictions {self.evictions} | "
+                f"taxa de acerto {taxa:.1f}%")
+
+    def snapshot(self):
+        """Contadores do cache como dicionário (para telemetria)."""
+        total = self.hits + self.misses
+        return {"entradas": len(self), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "taxa_acerto": round(self.hits / total, 4) if total else 0.0}
@@ -0,0 +1,128 @@
+"""
+Carregamento colunar dos arquivos de entrada com cache binário.
+
+Os arquivos de texto (alunos.txt, escolas.txt, salas.txt e a malha viária
+opcional de rede_viaria.py) são lidos com o
+leitor vetorizado do NumPy para arrays estruturados tipados e gravados ao lado
+do arquivo de origem como `<arquivo>.cache.npy` (mapeável em memória) mais
+`<arquivo>.cache.json` com os metadados. O cache é invalidado quando muda o
+tamanho do arquivo; se só o mtime mudou, o hash do conteúdo decide.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Colunas de cada formato, na ordem do arquivo
+DTYPE_ALUNOS = np.dtype([("id", np.int64), ("lat", np.float64), ("lon", np.float64),
+                         ("etapa", np.int32), ("horario", np.int32), ("special", np.int8)])
+DTYPE_ESCOLAS = np.dtype([("id", np.int64), ("lat", np.float64), ("lon", np.float64)])
+DTYPE_SALAS = np.dtype([("escola_id", np.int64), ("id", np.int64), ("etapa", np.int32),
+                        ("horario", np.int32), ("vagas", np.int32)])
+DTYPE_ARESTAS = np.dtype([("lat_a", np.float64), ("lon_a", np.float64), ("lat_b", np.float64),
+                          ("lon_b", np.float64), ("km", np.float64)])
+
+VERSAO_CACHE = 1
+
+
+def _file_hash(filepath):
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _parse_text(filepath, dtype):
+    """Lê o arquivo de texto. Retorna (array, total_declarado)."""
+    n_cols = len(dtype.names)
+    with open(filepath, "r", encoding="utf-8") as f:
+        total = int(f.readline().strip())
+        try:
+            dados = np.loadtxt(f, dtype=dtype, usecols=range(n_cols), ndmin=1)
+        except ValueError:
+            # Caminho lento: linhas incompletas são ignoradas, como nos loaders antigos
+            f.seek(0)
+            f.readline()
+            linhas = [" ".join(p[:n_cols]) for p in (l.split() for l in f) if len(p) >= n_cols]
+            dados = np.loadtxt(linhas, dtype=dtype, ndmin=1)
+    return dados, total
+
+
+def _write_cache(filepath, dados, meta):
+    npy = filepath + ".cache.npy"
+    tmp = npy + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, dados)
+    os.replace(tmp, npy)
+    tmp = filepath + ".cache.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, filepath + ".cache.json")
+
+
+def load_table(filepath, dtype, nome):
+    """
+    Carrega um arquivo de entrada como array estruturado, usando o cache
+    binário quando válido. Avisa se o total declarado no cabeçalho não bate
+    com o número de linhas lidas. Retorna (array, total_declarado).
+    """
+    st = os.stat(filepath)
+    meta_path = filepath + ".cache.json"
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(filepath + ".cache.npy"):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+
+    valido = (meta is not None and meta.get("versao") == VERSAO_CACHE
+              and meta.get("dtype") == str(dtype.descr)
+              and meta.get("size") == st.st_size)
+    if valido and meta.get("mtime_ns") != st.st_mtime_ns:
+        valido = meta.get("hash") == _file_hash(filepath)
+        if valido:
+            meta["mtime_ns"] = st.st_mtime_ns
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+    if valido:
+        dados = np.load(filepath + ".cache.npy", mmap_mode="r")
+    else:
+        dados, total = _parse_text(filepath, dtype)
+        meta = {"versao": VERSAO_CACHE, "dtype": str(dtype.descr),
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                "hash": _file_hash(filepath), "total_declarado": total,
+                "linhas": int(len(dados))}
+        try:
+            _write_cache(filepath, dados, meta)
+        except OSError as e:
+            print(f"⚠ Não foi possível gravar o cache de {nome}: {e}")
+
+    if meta["total_declarado"] != meta["linhas"]:
+        print(f"⚠ {os.path.basename(filepath)}: cabeçalho declara {meta['total_declarado']} "
+              f"{nome}, mas o arquivo contém {meta['linhas']}")
+    return dados, meta["total_declarado"]
+
+
+def load_alunos_array(filepath):
+    return load_table(filepath, DTYPE_ALUNOS, "alunos")
+
+
+def load_escolas_array(filepath):
+    return load_table(filepath, DTYPE_ESCOLAS, "escolas")
+
+
+def load_salas_array(filepath):
+    return load_table(filepath, DTYPE_SALAS, "salas")
+
+
+def load_arestas_array(filepath):
+    return load_table(filepath, DTYPE_ARESTAS, "arestas")
+
+
+def columns(dados):
+    """Colunas do array como listas de tipos nativos do Python (para montar dicts)."""
+    return [dados[nome].tolist() for nome in dados.dtype.names]
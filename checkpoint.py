@@ -0,0 +1,132 @@
+"""
+Checkpoints periódicos do AG de main2.py, para retomar execuções longas.
+
+Um checkpoint guarda a população e o hall da fama (genes int32 + fitness,
+como na migração de ilhas.py), o número da geração, os estados dos geradores
+aleatórios (random e numpy), o logbook e o histórico do critério de parada.
+A gravação é atômica: o arquivo é escrito ao lado do destino e trocado por
+os.replace, então um processo interrompido no meio deixa o checkpoint
+anterior intacto.
+
+`Checkpointer` é o callback de geração de parada.ea_mu_plus_lambda; a cada
+checkpoint ele também chama `ao_salvar(melhor)`, que grava a melhor
+alocação até o momento (alocacao_parcial.txt em main2.py, separada da
+alocacao_final.txt), e o operador sempre tem um resultado utilizável.
+"""
+import hashlib
+import os
+import pickle
+import random
+import time
+
+import numpy as np
+
+from ilhas import decode_individuals, encode_individuals
+from telemetria import DESATIVADA
+
+VERSAO = 1
+
+
+def fingerprint(*arrays):
+    """Hash das entradas do problema: um checkpoint só retoma sobre os mesmos dados."""
+    h = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        h.update(np.ascontiguousarray(array).tobytes())
+    return h.hexdigest()
+
+
+def write_atomic(caminho, escrever):
+    """Chama `escrever(arquivo)` sobre um temporário e o move para `caminho`."""
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    try:
+        with open(temporario, "wb") as f:
+            escrever(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def save_checkpoint(caminho, estado):
+    write_atomic(caminho, lambda f: pickle.dump({"versao": VERSAO, **estado}, f,
+                                                protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_checkpoint(caminho, assinatura=None):
+    """
+    Lê um checkpoint. Levanta ValueError se ele é de outra versão ou, com
+    `assinatura`, de outras entradas.
+    """
+    with open(caminho, "rb") as f:
+        estado = pickle.load(f)
+    if estado.get("versao") != VERSAO:
+        raise ValueError(f"{caminho}: versão de checkpoint não suportada")
+    if assinatura is not None and estado["assinatura"] != assinatura:
+        raise ValueError(f"{caminho}: checkpoint de outras entradas (alunos/salas mudaram)")
+    return estado
+
+
+def restore_individuals(estado, cls):
+    """(população, hall da fama) de um checkpoint como instâncias de `cls`."""
+    return (decode_individuals(estado["populacao"], cls),
+            decode_individuals(estado["hall_da_fama"], cls))
+
+
+def restore_rng(estado):
+    random.setstate(estado["random"])
+    np.random.set_state(estado["numpy_random"])
+
+
+class Checkpointer:
+    """
+    Callback de geração que grava um checkpoint a cada `intervalo` gerações
+    (e no fim, com `flush`). `logbook` e `parada` são os objetos da execução,
+    salvos junto com a população; `geracao_inicial` é a geração de um
+    checkpoint retomado (que não é regravada).
+    """
+
+    def __init__(self, caminho, intervalo, assinatura, logbook, parada=None,
+                 ao_salvar=None, telemetria=DESATIVADA, geracao_inicial=None):
+        self.caminho = caminho
+        self.intervalo = max(1, intervalo)
+        self.assinatura = assinatura
+        self.logbook = logbook
+        self.parada = parada
+        self.ao_salvar = ao_salvar
+        self.telemetria = telemetria
+        self.salva = geracao_inicial
+        self.ultima = None
+
+    def __call__(self, gen, population, halloffame=None):
+        self.ultima = (gen, population, halloffame)
+        if gen % self.intervalo == 0 and gen != self.salva:
+            self.save(gen, population, halloffame)
+        return False
+
+    def flush(self):
+        """Grava a última geração vista, se ela ainda não tem checkpoint."""
+        if self.ultima is not None and self.ultima[0] != self.salva:
+            self.save(*self.ultima)
+
+    def save(self, gen, population, halloffame):
+        inicio = time.perf_counter()
+        estado = {
+            "assinatura": self.assinatura,
+            "geracao": gen,
+            "populacao": encode_individuals(population),
+            "hall_da_fama": encode_individuals(halloffame or []),
+            "random": random.getstate(),
+            "numpy_random": np.random.get_state(),
+            "logbook": self.logbook,
+            "parada": None if self.parada is None else {
+                "historico": self.parada.historico, "melhor": self.parada.melhor},
+        }
+        save_checkpoint(self.caminho, estado)
+        self.salva = gen
+        if self.ao_salvar is not None and halloffame:
+            self.ao_salvar(halloffame[0])
+        self.telemetria.emit("checkpoint", geracao=gen, arquivo=self.caminho,
+                             bytes=os.path.getsize(self.caminho),
+                             duracao_s=round(time.perf_counter() - inicio, 6))
@@ -0,0 +1,157 @@
+"""
+Decomposição geográfica de grupos (etapa, horario) grandes em regiões.
+
+As escolas do grupo são divididas por bissecção recursiva de coordenadas
+(no plano projetado localmente): em cada passo cortamos o eixo mais largo no
+ponto que melhor equilibra a taxa de ocupação (alunos / vagas) dos dois
+lados, até que cada região tenha no máximo `max_alunos` alunos. Cada região
+é resolvida de forma independente e, ao final, `boundary_repair` move (ou
+troca) alunos entre regiões quando isso reduz o custo.
+"""
+import numpy as np
+
+from indice_espacial import project_local
+
+# Alunos por região (tamanho máximo do cromossomo de cada sub-problema)
+MAX_ALUNOS_REGIAO = 250
+
+# Limite de passadas do reparo de fronteira
+MAX_PASSADAS_REPARO = 10
+
+
+def _bisect(xy_a, xy_e, cap_e, idx_a, idx_e, max_alunos, regioes):
+    if len(idx_a) <= max_alunos or len(idx_e) < 2:
+        regioes.append((idx_a, idx_e))
+        return
+
+    spread = xy_e[idx_e].max(axis=0) - xy_e[idx_e].min(axis=0)
+    eixo = int(np.argmax(spread))
+
+    ordem_e = idx_e[np.argsort(xy_e[idx_e, eixo], kind="stable")]
+    coord_e = xy_e[ordem_e, eixo]
+    cortes = (coord_e[:-1] + coord_e[1:]) / 2
+
+    coord_a = np.sort(xy_a[idx_a, eixo])
+    dem_esq = np.searchsorted(coord_a, cortes).astype(np.float64)
+    dem_dir = len(idx_a) - dem_esq
+    cap_acum = np.cumsum(cap_e[ordem_e]).astype(np.float64)
+    cap_esq = cap_acum[:-1]
+    cap_dir = cap_acum[-1] - cap_esq
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        carga = np.maximum(np.where(cap_esq > 0, dem_esq / cap_esq, np.inf),
+                           np.where(cap_dir > 0, dem_dir / cap_dir, np.inf))
+    # Empate: prefere o corte que divide os alunos mais ao meio
+    desequilibrio = np.abs(dem_esq - dem_dir)
+    k = int(np.lexsort((desequilibrio, carga))[0])
+
+    lado_a = xy_a[idx_a, eixo] < cortes[k]
+    if lado_a.all() or not lado_a.any():
+        regioes.append((idx_a, idx_e))
+        return
+
+    _bisect(xy_a, xy_e, cap_e, idx_a[lado_a], ordem_e[:k + 1], max_alunos, regioes)
+    _bisect(xy_a, xy_e, cap_e, idx_a[~lado_a], ordem_e[k + 1:], max_alunos, regioes)
+
+
+def split_regions(lat_alunos, lon_alunos, lat_escolas, lon_escolas, vagas_escolas,
+                  max_alunos=MAX_ALUNOS_REGIAO):
+    """
+    Divide alunos e escolas de um grupo em regiões espaciais.
+
+    Retorna uma lista de (indices_alunos, indices_escolas), arrays de
+    posições nas listas de entrada.
+    """
+    lat0 = float(np.mean(lat_escolas))
+    lon0 = float(np.mean(lon_escolas))
+    xy_a = project_local(lat_alunos, lon_alunos, lat0, lon0)
+    xy_e = project_local(lat_escolas, lon_escolas, lat0, lon0)
+    regioes = []
+    _bisect(xy_a, xy_e, np.asarray(vagas_escolas), np.arange(len(xy_a)),
+            np.arange(len(xy_e)), max_alunos, regioes)
+    return regioes
+
+
+def split_group(alunos_do_grupo, ids_salas, salas, escolas, max_alunos=MAX_ALUNOS_REGIAO):
+    """
+    Decompõe um grupo. Retorna uma lista de (indices_alunos, ids_salas_regiao).
+    """
+    salas_por_escola = {}
+    for id_sala in ids_salas:
+        id_e = salas[id_sala]["escola_id"]
+        if id_e in escolas:
+            salas_por_escola.setdefault(id_e, []).append(id_sala)
+    escola_ids = sorted(salas_por_escola)
+    if len(alunos_do_grupo) <= max_alunos or len(escola_ids) < 2:
+        return [(list(range(len(alunos_do_grupo))), list(ids_salas))]
+
+    regioes = split_regions(
+        [a["lat"] for a in alunos_do_grupo], [a["lon"] for a in alunos_do_grupo],
+        [escolas[e]["lat"] for e in escola_ids], [escolas[e]["lon"] for e in escola_ids],
+        [sum(salas[s]["vagas"] for s in salas_por_escola[e]) for e in escola_ids],
+        max_alunos)
+    return [(idx_a.tolist(), [s for j in idx_e.tolist() for s in salas_por_escola[escola_ids[j]]])
+            for idx_a, idx_e in regioes]
+
+
+def boundary_repair(solucao, opcoes, vagas, unassigned_id=-1,
+                    max_passadas=MAX_PASSADAS_REPARO):
+    """
+    Reparo de fronteira após a resolução independente das regiões.
+
+    `opcoes[i]` é a lista de (id_sala, custo) do aluno i sobre o grupo
+    inteiro. Um aluno é movido para uma sala candidata mais barata que tenha
+    vaga; se a sala estiver cheia, tenta-se trocar com um ocupante para quem
+    a troca também compense (ganho total positivo). Altera `solucao` no
+    lugar e retorna o número de alunos movidos.
+    """
+    custo = [dict(ops) for ops in opcoes]
+    ocupantes = {}
+    for i, s in enumerate(solucao):
+        if s != unassigned_id:
+            ocupantes.setdefault(s, set()).add(i)
+
+    def custo_atual(i):
+        return custo[i].get(solucao[i], float("inf"))
+
+    movidos = 0
+    for _ in range(max_passadas):
+        melhorou = False
+        for i, ops in enumerate(opcoes):
+            atual = solucao[i]
+            c_atual = custo_atual(i)
+            for s, c in ops:
+                if c >= c_atual:
+                    break
+                livres = vagas.get(s, 0) - len(ocupantes.get(s, ()))
+                if livres > 0:
+                    if atual != unassigned_id:
+                        ocupantes[atual].discard(i)
+                    ocupantes.setdefault(s, set()).add(i)
+                    solucao[i] = s
+                    movidos += 1
+                    melhorou = True
+                    break
+                if atual == unassigned_id:
+                    continue
+                # Troca: algum ocupante de s ganha (ou perde menos) indo para a sala atual
+                troca = None
+                for j in ocupantes.get(s, ()):
+                    c_j_atual = custo[j].get(atual)
+                    if c_j_atual is None:
+                        continue
+                    if c + c_j_atual < c_atual + custo_atual(j):
+                        troca = j
+                        break
+                if troca is not None:
+                    ocupantes[atual].discard(i)
+                    ocupantes[s].discard(troca)
+                    ocupantes[s].add(i)
+                    ocupantes[atual].add(troca)
+                    solucao[i], solucao[troca] = s, atual
+                    movidos += 2
+                    melhorou = True
+                    break
+        if not melhorou:
+            break
+    return movidos
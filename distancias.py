@@ -0,0 +1,109 @@
+"""
+Motor vetorizado de distâncias (Haversine em lote).
+
+A distância de um aluno a uma sala depende apenas da escola da sala, então
+calculamos uma matriz densa float32 aluno × escola por grupo (etapa, horario)
+e resolvemos as salas através de um índice sala -> coluna da escola.
+
+A métrica é plugável: os motores recebem um objeto com `matrix` (aluno ×
+escola) e `pairs` (elemento a elemento). HAVERSINE, a linha reta, é o
+padrão; rede_viaria.RoadNetwork mede pela malha viária.
+"""
+import numpy as np
+
+RAIO_TERRA_KM = 6371.0
+
+# Número de linhas (alunos) processadas por bloco. Limita a memória temporária
+# em float64 independentemente do tamanho do grupo.
+BLOCO_LINHAS = 4096
+
+
+def haversine_matrix(lat_alunos, lon_alunos, lat_escolas, lon_escolas, out=None):
+    """
+    Calcula a matriz (n_alunos × n_escolas) de distâncias Haversine em km.
+
+    Os cálculos são feitos em float64 por blocos de BLOCO_LINHAS linhas e o
+    resultado é gravado em float32 (em `out`, se fornecido).
+    """
+    lat_a = np.radians(np.asarray(lat_alunos, dtype=np.float64))[:, None]
+    lon_a = np.radians(np.asarray(lon_alunos, dtype=np.float64))[:, None]
+    lat_e = np.radians(np.asarray(lat_escolas, dtype=np.float64))[None, :]
+    lon_e = np.radians(np.asarray(lon_escolas, dtype=np.float64))[None, :]
+    cos_lat_e = np.cos(lat_e)
+
+    n, m = lat_a.shape[0], lat_e.shape[1]
+    if out is None:
+        out = np.empty((n, m), dtype=np.float32)
+
+    for ini in range(0, n, BLOCO_LINHAS):
+        fim = min(ini + BLOCO_LINHAS, n)
+        la = lat_a[ini:fim]
+        a = (np.sin((lat_e - la) / 2) ** 2
+             + np.cos(la) * cos_lat_e * np.sin((lon_e - lon_a[ini:fim]) / 2) ** 2)
+        np.clip(a, 0.0, 1.0, out=a)
+        out[ini:fim] = 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(a))
+    return out
+
+
+def haversine_pairs(lat1, lon1, lat2, lon2):
+    """Haversine elemento a elemento (arrays de mesmo formato), em float32."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64))
+                              for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return (2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))).astype(np.float32)
+
+
+class HaversineMetric:
+    """
+    Métrica padrão: distância em linha reta. `linha_reta` indica que o
+    índice espacial (KD-tree sobre a projeção local) pode pré-filtrar as
+    escolas candidatas; `assinatura` entra no hash dos caches derivados.
+    """
+    nome = "haversine"
+    linha_reta = True
+    assinatura = "haversine"
+
+    def matrix(self, lat_alunos, lon_alunos, lat_escolas, lon_escolas, out=None):
+        return haversine_matrix(lat_alunos, lon_alunos, lat_escolas, lon_escolas, out)
+
+    def pairs(self, lat1, lon1, lat2, lon2):
+        return haversine_pairs(lat1, lon1, lat2, lon2)
+
+    def prepare(self, lat_escolas, lon_escolas):
+        """Nada a pré-calcular. Retorna (buscas feitas, segundos)."""
+        return 0, 0.0
+
+    def describe(self):
+        return "Haversine (linha reta)"
+
+
+HAVERSINE = HaversineMetric()
+
+
+def build_escola_index(escolas, ids_salas, salas):
+    """
+    Monta o índice sala -> escola para um conjunto de salas.
+
+    Retorna (escola_ids, sala_col), onde escola_ids é o array das escolas
+    distintas (colunas da matriz) e sala_col[k] é a coluna da escola da
+    sala ids_salas[k]. Salas cuja escola não existe recebem coluna -1.
+    """
+    escola_ids = sorted({salas[s]["escola_id"] for s in ids_salas
+                         if salas[s]["escola_id"] in escolas})
+    col = {id_e: j for j, id_e in enumerate(escola_ids)}
+    sala_col = np.array([col.get(salas[s]["escola_id"], -1) for s in ids_salas],
+                        dtype=np.int32)
+    return np.array(escola_ids, dtype=np.int64), sala_col
+
+
+def group_distance_matrix(alunos_do_grupo, escolas, escola_ids, out=None, metrica=HAVERSINE):
+    """Matriz float32 (alunos do grupo × escolas do grupo) em uma única chamada."""
+    lat_a = np.fromiter((a["lat"] for a in alunos_do_grupo), dtype=np.float64,
+                        count=len(alunos_do_grupo))
+    lon_a = np.fromiter((a["lon"] for a in alunos_do_grupo), dtype=np.float64,
+                        count=len(alunos_do_grupo))
+    lat_e = np.array([escolas[e]["lat"] for e in escola_ids], dtype=np.float64)
+    lon_e = np.array([escolas[e]["lon"] for e in escola_ids], dtype=np.float64)
+    return metrica.matrix(lat_a, lon_a, lat_e, lon_e, out=out)
+
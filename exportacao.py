@@ -0,0 +1,179 @@
+"""
+Exportação colunar dos resultados da alocação.
+
+`allocation_columns` resolve, em uma passada vetorizada, todas as colunas por
+aluno (escola, sala, etapa/horário da sala, coordenadas e distância) a partir
+de tabelas em arrays estruturados (dtypes de carregamento.py). Os resumos
+(`summarize`) e os arquivos de saída saem desses mesmos arrays:
+
+- `write_csv` grava CSV separado por ';' em blocos, formatando cada coluna de
+  uma vez (com substituições para marcadores como NAO_ALOCADO);
+- `write_columnar` grava um .npz com uma coluna por array (tipos compactos),
+  para análise posterior sem reparsear texto; `load_columnar` o lê de volta.
+"""
+import os
+
+import numpy as np
+
+from distancias import HAVERSINE
+
+# Linhas formatadas e gravadas por vez no CSV
+BLOCO_LINHAS = 65536
+
+
+def table_from_dict(registros, dtype, chave="id"):
+    """Tabela estruturada a partir de um dicionário id -> campos (ordenada por id)."""
+    tabela = np.zeros(len(registros), dtype=dtype)
+    ids = sorted(registros)
+    tabela[chave] = ids
+    for nome in dtype.names:
+        if nome != chave:
+            tabela[nome] = [registros[i][nome] for i in ids]
+    return tabela
+
+
+def _lookup(ids_tabela, ids):
+    """Posição de cada id em `ids_tabela` (-1 se ausente)."""
+    if len(ids_tabela) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    ordem = np.argsort(ids_tabela, kind="stable")
+    pos = np.minimum(np.searchsorted(ids_tabela[ordem], ids), len(ordem) - 1)
+    return np.where(ids_tabela[ordem][pos] == ids, ordem[pos], -1)
+
+
+def allocation_columns(alunos, salas, escolas, sala_por_aluno, unassigned_id=-1,
+                       distancia=None, metrica=HAVERSINE):
+    """
+    Colunas por aluno de uma solução (`sala_por_aluno[i]` = id da sala do
+    aluno i, na ordem de `alunos`).
+
+    Ids de sala inexistentes contam como não alocados. Sem `distancia`
+    (função (alunos, posições de escola em `escolas`) -> km, como
+    modelo.CompactModel.distance), as distâncias são calculadas pela
+    `metrica` (padrão: Haversine). Distância é NaN
+    para não alocados e -1 quando a escola da sala não existe.
+    """
+    sala = np.asarray(sala_por_aluno, dtype=np.int64)
+    n = len(sala)
+    pos_sala = _lookup(salas["id"], sala)
+    pos_sala[sala == unassigned_id] = -1
+    alocado = pos_sala >= 0
+    ps = np.where(alocado, pos_sala, 0)
+
+    escola_id = np.where(alocado, salas["escola_id"][ps], -1)
+    pos_escola = np.where(alocado, _lookup(escolas["id"], escola_id), -1)
+    com_escola = pos_escola >= 0
+    pe = np.where(com_escola, pos_escola, 0)
+
+    etapa_sala = np.where(alocado, salas["etapa"][ps], -1)
+    horario_sala = np.where(alocado, salas["horario"][ps], -1)
+
+    lat_escola = np.where(com_escola, escolas["lat"][pe], np.nan)
+    lon_escola = np.where(com_escola, escolas["lon"][pe], np.nan)
+    dist = np.full(n, np.nan)
+    idx = np.flatnonzero(com_escola)
+    if distancia is not None:
+        dist[idx] = distancia(idx, pos_escola[idx])
+    else:
+        dist[idx] = metrica.pairs(alunos["lat"][idx], alunos["lon"][idx],
+                                  lat_escola[idx], lon_escola[idx])
+    dist[alocado & ~com_escola] = -1.0
+
+    return {
+        "id_aluno": alunos["id"], "necessidade_especial": alunos["special"],
+        "lat_aluno": alunos["lat"], "lon_aluno": alunos["lon"],
+        "etapa_desejada": alunos["etapa"], "horario_desejado": alunos["horario"],
+        "id_escola": escola_id, "id_sala": np.where(alocado, sala, -1),
+        "etapa_sala": etapa_sala, "horario_sala": horario_sala,
+        "lat_escola": lat_escola, "lon_escola": lon_escola, "distancia_km": dist,
+        "alocado": alocado, "com_escola": com_escola, "pos_sala": pos_sala,
+    }
+
+
+def summarize(colunas, salas, distance_target_km=None):
+    """Contagens de violações e estatísticas de distância das colunas."""
+    alocado = colunas["alocado"]
+    especial = colunas["necessidade_especial"] == 1
+    mismatch = alocado & ((colunas["etapa_sala"] != colunas["etapa_desejada"])
+                          | (colunas["horario_sala"] != colunas["horario_desejado"]))
+    ocupacao = np.bincount(colunas["pos_sala"][alocado], minlength=len(salas))
+    dist = colunas["distancia_km"][colunas["com_escola"]].astype(np.float64)
+
+    resumo = {
+        "alunos": int(len(alocado)),
+        "mismatch": int(mismatch.sum()),
+        "unassigned_special": int((~alocado & especial).sum()),
+        "unassigned_normal": int((~alocado & ~especial).sum()),
+        "overcapacity": int(np.maximum(0, ocupacao - salas["vagas"]).sum()),
+        "distancia_total_km": float(dist.sum()),
+        "distancia_media_km": float(dist.mean()) if len(dist) else 0.0,
+        "distancia_mediana_km": float(np.median(dist)) if len(dist) else 0.0,
+        "distancia_maxima_km": float(dist.max()) if len(dist) else 0.0,
+    }
+    if distance_target_km is not None:
+        resumo["long_distance"] = int((dist > distance_target_km).sum())
+    return resumo
+
+
+def _format(valores, formato):
+    conv = ("{:" + formato + "}").format if formato else str
+    return np.array(list(map(conv, valores.tolist())), dtype=object)
+
+
+def write_csv(caminho, colunas, bloco=BLOCO_LINHAS):
+    """
+    Grava CSV separado por ';'. `colunas` é uma lista de
+    (cabecalho, valores, formato, substituicoes): `formato` é uma
+    especificação de str.format ("" para str) e `substituicoes` uma lista de
+    (mascara, texto); um texto com "{}" recebe o valor já formatado.
+
+    A gravação é atômica (temporário + os.replace): quem lê `caminho` nunca
+    vê um arquivo pela metade.
+    """
+    n = len(colunas[0][1]) if colunas else 0
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    try:
+        with open(temporario, "w", encoding="utf-8", newline="") as f:
+            f.write(";".join(c[0] for c in colunas) + "\n")
+            for ini in range(0, n, bloco):
+                fim = min(n, ini + bloco)
+                partes = []
+                for _, valores, formato, substituicoes in colunas:
+                    textos = _format(np.asarray(valores[ini:fim]), formato)
+                    for mascara, texto in substituicoes:
+                        m = np.asarray(mascara[ini:fim])
+                        if not m.any():
+                            continue
+                        if "{}" in texto:
+                            textos[m] = [texto.format(v) for v in textos[m]]
+                        else:
+                            textos[m] = texto
+                    partes.append(textos.tolist())
+                f.write("\n".join(map(";".join, zip(*partes))) + "\n")
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+# Tipos compactos das colunas no formato binário
+TIPOS_COLUNAR = {
+    "id_aluno": np.int64, "necessidade_especial": np.int8,
+    "lat_aluno": np.float64, "lon_aluno": np.float64,
+    "etapa_desejada": np.int16, "horario_desejado": np.int16,
+    "id_escola": np.int64, "id_sala": np.int64,
+    "etapa_sala": np.int16, "horario_sala": np.int16,
+    "lat_escola": np.float64, "lon_escola": np.float64, "distancia_km": np.float32,
+}
+
+
+def write_columnar(caminho, colunas):
+    """Grava as colunas em um .npz (uma entrada por coluna, -1/NaN = ausente)."""
+    np.savez(caminho, **{nome: np.asarray(colunas[nome]).astype(tipo, copy=False)
+                         for nome, tipo in TIPOS_COLUNAR.items()})
+
+
+def load_columnar(caminho):
+    """Lê um arquivo gravado por write_columnar como dicionário de arrays."""
+    with np.load(caminho, allow_pickle=False) as dados:
+        return {nome: dados[nome] for nome in dados.files}
@@ -0,0 +1,143 @@
+"""
+Motor exato de alocação por fluxo de custo mínimo.
+
+Cada grupo (etapa, horario) é um problema de transporte capacitado: alunos
+(agregados por coordenadas e necessidade especial) enviam fluxo para salas
+com capacidade `vagas`, ou para um nó "não alocado" com penalidade maior para
+alunos especiais. A rede usa apenas os K arcos candidatos mais próximos de
+cada unidade; o problema é resolvido como PL (matriz de rede, totalmente
+unimodular, portanto o simplex devolve solução inteira) e os duais são usados
+para precificar TODOS os arcos podados. Arcos com custo reduzido negativo são
+adicionados e o problema é resolvido de novo, até que nenhum arco melhore a
+solução: o resultado é ótimo também para a rede completa. Se MAX_RODADAS
+esgotar antes disso, a solução é viável mas pode não ser ótima
+(`info["otimo"]` False, com aviso).
+"""
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+from distancias import HAVERSINE
+from indice_espacial import candidate_rooms
+from unidades import aggregate, expand_splits
+
+# Arcos candidatos iniciais por unidade de alunos
+N_CANDIDATOS_FLUXO = 10
+
+# Tolerância para custos reduzidos negativos na precificação
+TOL_CUSTO_REDUZIDO = 1e-6
+
+# Limite de rodadas de precificação (cada rodada só adiciona arcos)
+MAX_RODADAS = 50
+
+
+def aggregate_units(lat, lon, special):
+    """
+    Agrupa alunos idênticos (lat, lon, special) em unidades.
+
+    Retorna (unidade_de_cada_aluno, lat_u, lon_u, special_u, contagem_u).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    special = np.asarray(special, dtype=np.int8)
+    unidade, primeiro, contagem = aggregate(lat, lon, special)
+    return unidade, lat[primeiro], lon[primeiro], special[primeiro], contagem
+
+
+def _solve_lp(arcos_u, arcos_r, custos, contagem, vagas, penal_u):
+    """PL de transporte sobre os arcos dados. Retorna (x, y, duais_u, duais_r, custo)."""
+    n_u, n_r, n_a = len(contagem), len(vagas), len(arcos_u)
+
+    # Variáveis: [x_arcos (n_a), y_nao_alocado (n_u)]
+    c = np.concatenate([custos, penal_u])
+    linhas_eq = np.concatenate([arcos_u, np.arange(n_u)])
+    a_eq = coo_matrix((np.ones(n_a + n_u), (linhas_eq, np.arange(n_a + n_u))),
+                      shape=(n_u, n_a + n_u)).tocsr()
+    a_ub = coo_matrix((np.ones(n_a), (arcos_r, np.arange(n_a))),
+                      shape=(n_r, n_a + n_u)).tocsr()
+
+    res = linprog(c, A_ub=a_ub, b_ub=vagas, A_eq=a_eq, b_eq=contagem,
+                  bounds=(0, None), method="highs-ds")
+    if res.status != 0:
+        raise RuntimeError(f"Fluxo de custo mínimo falhou: {res.message}")
+
+    x = np.rint(res.x[:n_a]).astype(np.int64)
+    y = np.rint(res.x[n_a:]).astype(np.int64)
+    return x, y, res.eqlin.marginals, res.ineqlin.marginals, res.fun
+
+
+def solve_group(alunos_do_grupo, ids_salas, salas, escolas, arc_cost,
+                penalty_special, penalty_normal, unassigned_id=-1,
+                k=N_CANDIDATOS_FLUXO, metrica=HAVERSINE):
+    """
+    Resolve um grupo (etapa, horario) de forma exata.
+
+    `arc_cost(dist_km)` converte um array de distâncias (da `metrica`) em
+    custos por aluno.
+    Retorna (solucao, info): a sala de cada aluno (ou `unassigned_id`) e um
+    dicionário com o custo, unidades, arcos, rodadas de precificação e
+    `otimo` (False se a precificação parou em MAX_RODADAS).
+    """
+    n = len(alunos_do_grupo)
+    salas_validas = [s for s in ids_salas if salas[s]["escola_id"] in escolas]
+    if not salas_validas:
+        return [unassigned_id] * n, {"custo": None, "unidades": 0, "arcos": 0, "rodadas": 0,
+                                     "otimo": True}
+
+    lat = [a["lat"] for a in alunos_do_grupo]
+    lon = [a["lon"] for a in alunos_do_grupo]
+    special = [a["special"] for a in alunos_do_grupo]
+    unidade, lat_u, lon_u, special_u, contagem = aggregate_units(lat, lon, special)
+    n_u = len(contagem)
+
+    pos_sala = {s: j for j, s in enumerate(salas_validas)}
+    vagas = np.array([salas[s]["vagas"] for s in salas_validas], dtype=np.float64)
+    penal_u = np.where(special_u == 1, penalty_special, penalty_normal).astype(np.float64)
+
+    # Arcos candidatos podados: K salas mais próximas de cada unidade
+    opcoes = candidate_rooms(lat_u, lon_u, escolas, salas_validas, salas, k, metrica=metrica)
+    arcos_u = np.array([u for u, ops in enumerate(opcoes) for _ in ops], dtype=np.int64)
+    arcos_r = np.array([pos_sala[s] for ops in opcoes for s, _ in ops], dtype=np.int64)
+
+    # Custos completos unidade × sala, usados na precificação dos arcos podados
+    escola_ids = sorted({salas[s]["escola_id"] for s in salas_validas})
+    col = {e: j for j, e in enumerate(escola_ids)}
+    sala_col = np.array([col[salas[s]["escola_id"]] for s in salas_validas])
+    dist_escolas = metrica.matrix(lat_u, lon_u,
+                                  [escolas[e]["lat"] for e in escola_ids],
+                                  [escolas[e]["lon"] for e in escola_ids])
+    custo_total = arc_cost(dist_escolas[:, sala_col].astype(np.float64))
+
+    presentes = np.zeros((n_u, len(salas_validas)), dtype=bool)
+    presentes[arcos_u, arcos_r] = True
+
+    otimo = False
+    for rodada in range(1, MAX_RODADAS + 1):
+        x, y, dual_u, dual_r, custo = _solve_lp(
+            arcos_u, arcos_r, custo_total[arcos_u, arcos_r], contagem, vagas, penal_u)
+
+        # Precificação: custo reduzido c_ur - pi_u - pi_r dos arcos ausentes
+        reduzido = custo_total - dual_u[:, None] - dual_r[None, :]
+        novos = (~presentes) & (reduzido < -TOL_CUSTO_REDUZIDO)
+        if not novos.any():
+            otimo = True
+            break
+        nu, nr = np.nonzero(novos)
+        arcos_u = np.concatenate([arcos_u, nu])
+        arcos_r = np.concatenate([arcos_r, nr])
+        presentes[nu, nr] = True
+    else:
+        print(f"⚠ Fluxo: precificação parou em {MAX_RODADAS} rodadas com "
+              f"{int(novos.sum())} arcos ainda melhorando; a solução pode não ser ótima.")
+
+    # Desagrega: distribui o fluxo de cada unidade entre seus alunos
+    divisoes = [[] for _ in range(n_u)]
+    for u, r, qtd in zip(arcos_u.tolist(), arcos_r.tolist(), x.tolist()):
+        if qtd:
+            divisoes[u].append((salas_validas[r], qtd))
+    solucao = expand_splits(unidade, divisoes, unassigned_id).tolist()
+
+    # Os arcos da última rodada sem ótimo entraram depois do PL: ficam fora do zip acima
+    info = {"custo": custo, "unidades": n_u, "arcos": len(x), "rodadas": rodada,
+            "nao_alocados": int(y.sum()), "otimo": otimo}
+    return solucao, info
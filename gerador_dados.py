@@ -0,0 +1,251 @@
+"""
+Gerador de instâncias sintéticas nos formatos de Models/.
+
+Produz alunos.txt (tabulado: id lat lon etapa horario special), escolas.txt
+(id lat lon) e salas.txt (escola_id id_sala etapa horario vagas), cada um com
+o total de linhas no cabeçalho, em escalas de 10 mil a 1 milhão de alunos.
+
+- Geografia: alunos concentrados em núcleos urbanos (gaussianas) dentro de
+  um raio em torno do centro, mais uma fração dispersa de forma uniforme;
+  as escolas seguem a mesma distribuição.
+- Mistura de grupos: pesos por etapa e por horário (padrão: proporções do
+  conjunto real de Models/) e fração de alunos com necessidade especial.
+- Aperto de capacidade: cada escola oferece um subconjunto dos grupos (uma
+  sala por grupo) e as vagas de cada sala são a demanda local do grupo (os
+  alunos cuja escola ofertante mais próxima é ela) vezes `folga`.
+- Malha viária (opcional, --rede-viaria): grade com espaçamento `passo_km`
+  sobre a região, nós deslocados ao acaso, uma fração das vias removida e
+  comprimentos com desvio sobre a linha reta, gravada em rede_viaria.txt no
+  formato de rede_viaria.py.
+
+Uso: python gerador_dados.py 100000 --saida /tmp/instancia/Models
+"""
+import argparse
+import os
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from carregamento import DTYPE_ALUNOS, DTYPE_ARESTAS, DTYPE_ESCOLAS, DTYPE_SALAS
+from distancias import haversine_pairs
+from indice_espacial import project_local
+
+# Centro e raio do conjunto real (Maceió)
+CENTRO = (-9.60, -35.72)
+RAIO_KM = 25.0
+
+# Proporções do conjunto real de Models/
+PESOS_ETAPA = {1: 266, 2: 936, 3: 2231, 4: 2847, 5: 2529, 6: 2902, 7: 2906,
+               8: 2823, 9: 2942, 10: 1239, 11: 989, 12: 773, 13: 614}
+PESOS_HORARIO = {0: 11474, 1: 12523}
+FRACAO_ESPECIAL = 0.072
+ALUNOS_POR_ESCOLA = 170
+GRUPOS_POR_ESCOLA = 8.4
+
+KM_POR_GRAU = 111.195
+
+
+def _points(rng, n, centro, raio_km, n_nucleos, fracao_dispersa, nucleos):
+    """n pontos (lat, lon): misturas gaussianas nos núcleos + uniforme no disco."""
+    lat0, lon0 = centro
+    n_disp = int(round(n * fracao_dispersa))
+    xy = np.empty((n, 2))
+
+    # Dispersos: uniformes no disco de raio `raio_km`
+    r = raio_km * np.sqrt(rng.random(n_disp))
+    t = rng.random(n_disp) * 2 * np.pi
+    xy[:n_disp, 0] = r * np.cos(t)
+    xy[:n_disp, 1] = r * np.sin(t)
+
+    # Núcleos: cada ponto sorteia um núcleo (ponderado pelo peso) e um desvio gaussiano
+    centros, desvios, pesos = nucleos
+    escolha = rng.choice(n_nucleos, size=n - n_disp, p=pesos)
+    xy[n_disp:] = centros[escolha] + rng.normal(size=(n - n_disp, 2)) * desvios[escolha, None]
+
+    lat = lat0 + xy[:, 1] / KM_POR_GRAU
+    lon = lon0 + xy[:, 0] / (KM_POR_GRAU * np.cos(np.radians(lat0)))
+    return lat, lon
+
+
+def _nuclei(rng, n_nucleos, raio_km):
+    """Centros (km), desvios (km) e pesos dos núcleos urbanos."""
+    r = raio_km * 0.8 * np.sqrt(rng.random(n_nucleos))
+    t = rng.random(n_nucleos) * 2 * np.pi
+    centros = np.column_stack([r * np.cos(t), r * np.sin(t)])
+    desvios = rng.uniform(0.05, 0.2, n_nucleos) * raio_km
+    pesos = rng.pareto(1.5, n_nucleos) + 1.0
+    return centros, desvios, pesos / pesos.sum()
+
+
+def _weights(pesos):
+    chaves = np.array(sorted(pesos))
+    p = np.array([pesos[k] for k in chaves], dtype=np.float64)
+    return chaves, p / p.sum()
+
+
+def generate(n_alunos, n_escolas=None, centro=CENTRO, raio_km=RAIO_KM, n_nucleos=12,
+             fracao_dispersa=0.15, pesos_etapa=PESOS_ETAPA, pesos_horario=PESOS_HORARIO,
+             fracao_especial=FRACAO_ESPECIAL, grupos_por_escola=GRUPOS_POR_ESCOLA,
+             folga=1.3, seed=0):
+    """
+    Gera uma instância. Retorna (alunos, escolas, salas) como arrays
+    estruturados nos dtypes de carregamento.py.
+    """
+    rng = np.random.default_rng(seed)
+    if n_escolas is None:
+        n_escolas = max(2, n_alunos // ALUNOS_POR_ESCOLA)
+    nucleos = _nuclei(rng, n_nucleos, raio_km)
+
+    alunos = np.empty(n_alunos, dtype=DTYPE_ALUNOS)
+    alunos["id"] = np.arange(1, n_alunos + 1)
+    alunos["lat"], alunos["lon"] = _points(rng, n_alunos, centro, raio_km, n_nucleos,
+                                           fracao_dispersa, nucleos)
+    etapas, p_etapa = _weights(pesos_etapa)
+    horarios, p_horario = _weights(pesos_horario)
+    alunos["etapa"] = rng.choice(etapas, size=n_alunos, p=p_etapa)
+    alunos["horario"] = rng.choice(horarios, size=n_alunos, p=p_horario)
+    alunos["special"] = rng.random(n_alunos) < fracao_especial
+
+    # Escolas com ids 0..n-1 (main.c usa o id como índice)
+    escolas = np.empty(n_escolas, dtype=DTYPE_ESCOLAS)
+    escolas["id"] = np.arange(n_escolas)
+    escolas["lat"], escolas["lon"] = _points(rng, n_escolas, centro, raio_km, n_nucleos,
+                                             fracao_dispersa, nucleos)
+
+    xy_a = project_local(alunos["lat"], alunos["lon"], *centro)
+    xy_e = project_local(escolas["lat"], escolas["lon"], *centro)
+    grupos = [(e, h) for e in etapas.tolist() for h in horarios.tolist()]
+    p_oferta = min(1.0, grupos_por_escola / len(grupos))
+
+    partes = []
+    for etapa, horario in grupos:
+        no_grupo = (alunos["etapa"] == etapa) & (alunos["horario"] == horario)
+        ofertantes = np.flatnonzero(rng.random(n_escolas) < p_oferta)
+        if len(ofertantes) == 0:
+            ofertantes = rng.choice(n_escolas, size=1)
+
+        # Demanda local: alunos do grupo cuja escola ofertante mais próxima é esta
+        _, mais_proxima = cKDTree(xy_e[ofertantes]).query(xy_a[no_grupo])
+        demanda = np.bincount(np.atleast_1d(mais_proxima), minlength=len(ofertantes))
+        vagas = np.maximum(1, np.ceil(demanda * folga)).astype(np.int32)
+
+        parte = np.empty(len(ofertantes), dtype=DTYPE_SALAS)
+        parte["escola_id"] = escolas["id"][ofertantes]
+        parte["etapa"] = etapa
+        parte["horario"] = horario
+        parte["vagas"] = vagas
+        partes.append(parte)
+
+    salas = np.concatenate(partes)
+    salas.sort(order=["escola_id", "etapa", "horario"])
+    salas["id"] = np.arange(1, len(salas) + 1)
+    return alunos, escolas, salas
+
+
+def road_grid(centro=CENTRO, raio_km=RAIO_KM, passo_km=0.25, fracao_removida=0.15,
+              desvio=0.3, seed=0):
+    """
+    Malha viária sintética: grade de passo `passo_km` no disco de raio
+    `raio_km` (mais uma margem de um passo), com os nós deslocados até 30%
+    do passo, `fracao_removida` das vias sorteadas fora e comprimento = linha
+    reta × U(1, 1 + desvio). Retorna as arestas no dtype DTYPE_ARESTAS.
+    """
+    rng = np.random.default_rng(seed)
+    lat0, lon0 = centro
+    n = int(np.ceil(raio_km / passo_km)) + 1
+    eixo = np.arange(-n, n + 1) * passo_km
+    x, y = np.meshgrid(eixo, eixo, indexing="ij")
+    x = x + rng.uniform(-0.3, 0.3, x.shape) * passo_km
+    y = y + rng.uniform(-0.3, 0.3, y.shape) * passo_km
+    dentro = np.hypot(x, y) <= raio_km + passo_km
+    lat = lat0 + y / KM_POR_GRAU
+    lon = lon0 + x / (KM_POR_GRAU * np.cos(np.radians(lat0)))
+
+    # Vias para o vizinho da direita e de cima, com as duas pontas dentro do disco
+    i, j = np.nonzero(dentro)
+    pares = []
+    for di, dj in ((1, 0), (0, 1)):
+        ok = (i + di < len(eixo)) & (j + dj < len(eixo))
+        ok[ok] &= dentro[i[ok] + di, j[ok] + dj]
+        pares.append((i[ok], j[ok], i[ok] + di, j[ok] + dj))
+    ia, ja, ib, jb = (np.concatenate(c) for c in zip(*pares))
+    mantidas = rng.random(len(ia)) >= fracao_removida
+    ia, ja, ib, jb = ia[mantidas], ja[mantidas], ib[mantidas], jb[mantidas]
+
+    arestas = np.empty(len(ia), dtype=DTYPE_ARESTAS)
+    arestas["lat_a"], arestas["lon_a"] = lat[ia, ja], lon[ia, ja]
+    arestas["lat_b"], arestas["lon_b"] = lat[ib, jb], lon[ib, jb]
+    reta = haversine_pairs(arestas["lat_a"], arestas["lon_a"], arestas["lat_b"], arestas["lon_b"])
+    arestas["km"] = reta * rng.uniform(1.0, 1.0 + desvio, len(arestas))
+    return arestas
+
+
+def write_road_graph(caminho, arestas):
+    """Grava a malha viária no formato de rede_viaria.py."""
+    np.savetxt(caminho, arestas, fmt=["%.7f", "%.7f", "%.7f", "%.7f", "%.4f"],
+               header=str(len(arestas)), comments="")
+
+
+def write_instance(pasta, alunos, escolas, salas):
+    """Grava alunos.txt, escolas.txt e salas.txt em `pasta`."""
+    os.makedirs(pasta, exist_ok=True)
+    np.savetxt(os.path.join(pasta, "alunos.txt"), alunos,
+               fmt=["%d", "%.7f", "%.7f", "%d", "%d", "%d"], delimiter="\t",
+               header=str(len(alunos)), comments="")
+    np.savetxt(os.path.join(pasta, "escolas.txt"), escolas, fmt=["%d", "%.6f", "%.6f"],
+               header=str(len(escolas)), comments="")
+    np.savetxt(os.path.join(pasta, "salas.txt"), salas, fmt="%d",
+               header=str(len(salas)), comments="")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera instâncias sintéticas de alocação.")
+    parser.add_argument("n_alunos", type=int, help="Número de alunos (ex.: 10000 a 1000000).")
+    parser.add_argument("--saida", default="Models_sintetico",
+                        help="Pasta de saída (padrão: Models_sintetico).")
+    parser.add_argument("--escolas", type=int, default=None,
+                        help=f"Número de escolas (padrão: 1 a cada {ALUNOS_POR_ESCOLA} alunos).")
+    parser.add_argument("--centro", type=float, nargs=2, default=CENTRO, metavar=("LAT", "LON"))
+    parser.add_argument("--raio-km", type=float, default=RAIO_KM,
+                        help=f"Raio da região (padrão: {RAIO_KM} km).")
+    parser.add_argument("--nucleos", type=int, default=12, help="Núcleos urbanos (padrão: 12).")
+    parser.add_argument("--dispersos", type=float, default=0.15,
+                        help="Fração de alunos/escolas fora dos núcleos (padrão: 0.15).")
+    parser.add_argument("--etapas", type=int, default=None,
+                        help="Usa as etapas 1..N com pesos iguais (padrão: mistura real).")
+    parser.add_argument("--horarios", type=int, default=None,
+                        help="Usa os horários 0..N-1 com pesos iguais (padrão: mistura real).")
+    parser.add_argument("--especiais", type=float, default=FRACAO_ESPECIAL,
+                        help=f"Fração de alunos especiais (padrão: {FRACAO_ESPECIAL}).")
+    parser.add_argument("--grupos-por-escola", type=float, default=GRUPOS_POR_ESCOLA,
+                        help=f"Grupos ofertados por escola, em média (padrão: {GRUPOS_POR_ESCOLA}).")
+    parser.add_argument("--folga", type=float, default=1.3,
+                        help="Vagas / demanda local de cada sala (1.0 = apertado; padrão: 1.3).")
+    parser.add_argument("--rede-viaria", action="store_true",
+                        help="Gera também uma malha viária sintética (rede_viaria.txt).")
+    parser.add_argument("--passo-rede", type=float, default=0.25,
+                        help="Espaçamento da grade da malha viária em km (padrão: 0.25).")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pesos_etapa = ({e: 1 for e in range(1, args.etapas + 1)} if args.etapas else PESOS_ETAPA)
+    pesos_horario = ({h: 1 for h in range(args.horarios)} if args.horarios else PESOS_HORARIO)
+    alunos, escolas, salas = generate(
+        args.n_alunos, args.escolas, tuple(args.centro), args.raio_km, args.nucleos,
+        args.dispersos, pesos_etapa, pesos_horario, args.especiais,
+        args.grupos_por_escola, args.folga, args.seed)
+    write_instance(args.saida, alunos, escolas, salas)
+    print(f"✓ {len(alunos)} alunos, {len(escolas)} escolas, {len(salas)} salas "
+          f"({int(salas['vagas'].sum())} vagas) gravados em {args.saida}")
+    if args.rede_viaria:
+        arestas = road_grid(tuple(args.centro), args.raio_km, args.passo_rede, seed=args.seed)
+        write_road_graph(os.path.join(args.saida, "rede_viaria.txt"), arestas)
+        print(f"✓ Malha viária com {len(arestas)} arestas gravada em "
+              f"{os.path.join(args.saida, 'rede_viaria.txt')}")
+
+
+if __name__ == "__main__":
+    main()
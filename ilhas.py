@@ -0,0 +1,221 @@
+"""
+Modelo de ilhas: N populações evoluindo em processos separados, com migração
+periódica dos melhores indivíduos.
+
+Cada ilha é um processo que roda seu próprio laço evolutivo e recebe um
+`Migracao` como callback de geração (ver parada.ea_mu_plus_lambda). A cada
+`intervalo` gerações a ilha envia cópias dos seus `migrantes` melhores
+indivíduos (genes int32 + fitness, sem reavaliação) para a próxima ilha do
+anel ("anel") ou para uma ilha sorteada ("aleatoria") e troca os piores
+indivíduos da população pelos migrantes que tiver recebido. A migração é
+assíncrona: ninguém espera pelas outras ilhas, e uma ilha que terminou
+simplesmente deixa de enviar.
+
+Quando uma ilha atinge o gap alvo, ela sinaliza as demais, que param na
+geração seguinte. O resultado de cada ilha volta ao processo principal, que
+monta o hall da fama global.
+
+Um lote de migrantes é maior que o buffer do pipe, então uma ilha não pode
+sair com migrantes ainda sendo escritos (o vizinho ficaria preso lendo uma
+mensagem pela metade). Ao terminar, cada ilha descarrega as suas filas de
+saída enquanto esvazia a de entrada, e só sai quando todas as ilhas
+descarregaram (`Migracao.shutdown`). O processo principal ainda encerra, após
+PRAZO_ENCERRAMENTO segundos, ilhas que não saírem sozinhas.
+"""
+import multiprocessing
+import queue
+import random
+import threading
+import time
+import traceback
+
+import numpy as np
+from deap import tools
+
+TOPOLOGIAS = ("anel", "aleatoria")
+
+# Espera (s) por cada mensagem ao esvaziar a fila de entrada no encerramento
+ESPERA_DRENAGEM = 0.05
+
+# Tempo (s) que o processo principal espera as ilhas saírem antes de encerrá-las
+PRAZO_ENCERRAMENTO = 30.0
+
+
+def encode_individuals(individuals):
+    """Indivíduos avaliados -> [(genes int32 em bytes, fitness)], para IPC."""
+    return [(np.asarray(ind, dtype=np.int32).tobytes(), tuple(ind.fitness.values))
+            for ind in individuals]
+
+
+def decode_individuals(pacotes, cls):
+    """Inverso de encode_individuals: cria instâncias de `cls` com o fitness."""
+    individuals = []
+    for genes, fitness in pacotes:
+        ind = cls(np.frombuffer(genes, dtype=np.int32).tolist())
+        ind.fitness.values = fitness
+        individuals.append(ind)
+    return individuals
+
+
+class Migracao:
+    """
+    Ponto de migração de uma ilha, chamado ao fim de cada geração como
+    `callback(gen, population, halloffame)`. Retorna True quando outra ilha
+    pediu o fim da evolução.
+    """
+
+    def __init__(self, indice, entradas, topologia, intervalo, migrantes, fim, finalizadas=None):
+        self.indice = indice
+        self.entradas = entradas
+        self.topologia = topologia
+        self.intervalo = intervalo
+        self.migrantes = migrantes
+        self.fim = fim
+        self.finalizadas = finalizadas
+        self.enviados = 0
+        self.recebidos = 0
+
+    def destination(self):
+        n = len(self.entradas)
+        if self.topologia == "anel":
+            return (self.indice + 1) % n
+        return random.choice([i for i in range(n) if i != self.indice])
+
+    def __call__(self, gen, population, halloffame=None):
+        if (len(self.entradas) > 1 and self.migrantes > 0 and gen > 0
+                and gen % self.intervalo == 0):
+            self.emigrate(population)
+            self.immigrate(population)
+        return self.fim.is_set()
+
+    def emigrate(self, population):
+        melhores = tools.selBest(population, self.migrantes)
+        self.entradas[self.destination()].put(encode_individuals(melhores))
+        self.enviados += len(melhores)
+
+    def immigrate(self, population):
+        chegados = []
+        while True:
+            try:
+                chegados.extend(self.entradas[self.indice].get_nowait())
+            except queue.Empty:
+                break
+        if not chegados:
+            return
+        # Os `migrantes` mais recentes entram no lugar dos piores
+        novos = decode_individuals(chegados[-self.migrantes:], type(population[0]))
+        population[:] = tools.selBest(population, len(population) - len(novos)) + novos
+        self.recebidos += len(novos)
+
+    def finish(self):
+        """Sinaliza às outras ilhas que a evolução pode terminar."""
+        self.fim.set()
+
+    def shutdown(self):
+        """
+        Encerramento da ilha (não envia mais nada): descarrega as filas de
+        saída em uma thread enquanto esvazia a de entrada, avisa que
+        descarregou e continua esvaziando até todas as ilhas avisarem.
+        """
+        saidas = [q for i, q in enumerate(self.entradas) if i != self.indice]
+        descarga = threading.Thread(target=_flush, args=(saidas,), daemon=True)
+        descarga.start()
+        avisou = False
+        while True:
+            self._discard_incoming()
+            if not avisou and not descarga.is_alive():
+                with self.finalizadas.get_lock():
+                    self.finalizadas.value += 1
+                avisou = True
+            if avisou and self.finalizadas.value >= len(self.entradas):
+                return
+
+    def _discard_incoming(self):
+        try:
+            while True:
+                self.entradas[self.indice].get(timeout=ESPERA_DRENAGEM)
+        except queue.Empty:
+            pass
+
+
+def _flush(filas):
+    """Espera os dados já enviados a `filas` chegarem aos pipes."""
+    for fila in filas:
+        fila.close()
+        fila.join_thread()
+
+
+def _island_main(alvo, indice, migracao, resultados, args):
+    try:
+        resultados.put((indice, alvo(indice, migracao, *args), None))
+    except Exception:
+        resultados.put((indice, None, traceback.format_exc()))
+    migracao.shutdown()
+
+
+def run_islands(n_ilhas, alvo, args=(), topologia="anel", intervalo=10, migrantes=5):
+    """
+    Roda `alvo(indice, migracao, *args)` em `n_ilhas` processos e retorna a
+    lista dos seus resultados (na ordem das ilhas). Uma ilha que falhou
+    levanta RuntimeError com o traceback dela; depois de uma falha, as ilhas
+    que não responderem em PRAZO_ENCERRAMENTO segundos são encerradas.
+    """
+    if topologia not in TOPOLOGIAS:
+        raise ValueError(f"Topologia desconhecida: {topologia!r} (opções: {', '.join(TOPOLOGIAS)})")
+    entradas = [multiprocessing.Queue() for _ in range(n_ilhas)]
+    fim = multiprocessing.Event()
+    finalizadas = multiprocessing.Value("i", 0)
+    resultados = multiprocessing.Queue()
+
+    processos = []
+    for indice in range(n_ilhas):
+        migracao = Migracao(indice, entradas, topologia, intervalo, migrantes, fim, finalizadas)
+        processo = multiprocessing.Process(target=_island_main,
+                                           args=(alvo, indice, migracao, resultados, args))
+        processo.start()
+        processos.append(processo)
+
+    # Lê os resultados antes do join (a fila só esvazia quando é lida)
+    por_ilha = [None] * n_ilhas
+    pendentes = set(range(n_ilhas))
+    erros = []
+    prazo_erro = None
+    try:
+        while pendentes:
+            try:
+                indice, resultado, erro = resultados.get(timeout=1.0)
+            except queue.Empty:
+                # Ilhas mortas sem resultado (sinal, falta de memória)
+                for indice in [i for i in pendentes if processos[i].exitcode not in (None, 0)]:
+                    pendentes.discard(indice)
+                    erros.append(f"ilha {indice}: processo terminou com código "
+                                 f"{processos[indice].exitcode}")
+                    fim.set()
+                    # As outras ilhas não esperam pela descarga de uma ilha morta
+                    with finalizadas.get_lock():
+                        finalizadas.value += 1
+                if erros and prazo_erro is None:
+                    prazo_erro = time.monotonic() + PRAZO_ENCERRAMENTO
+                # Depois de uma falha, vizinhas podem ficar presas lendo migrantes pela metade
+                if prazo_erro is not None and time.monotonic() > prazo_erro:
+                    erros.extend(f"ilha {i}: sem resposta {PRAZO_ENCERRAMENTO:.0f}s após a falha"
+                                 for i in sorted(pendentes))
+                    break
+                continue
+            pendentes.discard(indice)
+            por_ilha[indice] = resultado
+            if erro is not None:
+                erros.append(f"ilha {indice}:\n{erro}")
+                fim.set()
+    finally:
+        prazo = time.monotonic() + PRAZO_ENCERRAMENTO
+        for indice, processo in enumerate(processos):
+            processo.join(max(0.0, prazo - time.monotonic()))
+            if processo.is_alive():
+                # Presa no encerramento (migrantes pela metade de uma ilha morta)
+                processo.terminate()
+                processo.join()
+                print(f"⚠ Ilha {indice} não encerrou em {PRAZO_ENCERRAMENTO:.0f}s; processo terminado.")
+    if erros:
+        raise RuntimeError("Falha no modelo de ilhas\n" + "\n".join(erros))
+    return por_ilha
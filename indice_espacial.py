@@ -0,0 +1,167 @@
+"""
+Índice espacial de escolas para geração de candidatos (top-K / raio).
+
+As coordenadas são projetadas localmente (equiretangular, em km, centrada no
+conjunto de escolas) e indexadas em uma KD-tree. As consultas retornam as
+escolas candidatas de cada aluno; as distâncias finais são sempre recalculadas
+com Haversine, então a projeção só afeta quais escolas entram na lista.
+
+Com uma métrica que não é linha reta (rede_viaria.RoadNetwork), a KD-tree não
+serve de pré-filtro: as consultas ordenam a linha inteira da matriz
+aluno × escola da métrica (poucas centenas de escolas por grupo).
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from distancias import HAVERSINE, RAIO_TERRA_KM, haversine_pairs
+
+# Escolas extras consultadas além de K antes de reordenar por Haversine,
+# para absorver a pequena distorção da projeção local.
+MARGEM_KNN = 4
+
+# Fator de expansão do raio para alunos sem nenhuma escola no raio pedido.
+FATOR_EXPANSAO_RAIO = 2.0
+
+
+def project_local(lat, lon, lat0, lon0):
+    """Projeção equiretangular (km) em torno de (lat0, lon0)."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    k = np.pi / 180.0 * RAIO_TERRA_KM
+    x = (lon - lon0) * k * np.cos(np.radians(lat0))
+    y = (lat - lat0) * k
+    return np.column_stack((x, y))
+
+
+class SchoolIndex:
+    """KD-tree sobre as escolas de um grupo (etapa, horario), na `metrica` dada."""
+
+    def __init__(self, lat_escolas, lon_escolas, metrica=HAVERSINE):
+        self.lat = np.asarray(lat_escolas, dtype=np.float64)
+        self.lon = np.asarray(lon_escolas, dtype=np.float64)
+        self.metrica = metrica
+        self.lat0 = float(self.lat.mean())
+        self.lon0 = float(self.lon.mean())
+        self.tree = cKDTree(project_local(self.lat, self.lon, self.lat0, self.lon0))
+
+    def __len__(self):
+        return self.lat.shape[0]
+
+    def nearest(self, lat, lon, k):
+        """
+        As k escolas mais próximas de cada aluno, ordenadas pela métrica.
+
+        Retorna (cols, dists), matrizes n_alunos × k com as posições das
+        escolas no índice e as distâncias em km.
+        """
+        k = min(k, len(self))
+        if not self.metrica.linha_reta:
+            dists = self.metrica.matrix(lat, lon, self.lat, self.lon)
+            cols = np.argsort(dists, axis=1, kind="stable")[:, :k]
+            return cols, np.take_along_axis(dists, cols, axis=1)
+        k_busca = min(k + MARGEM_KNN, len(self))
+        xy = project_local(lat, lon, self.lat0, self.lon0)
+        _, cols = self.tree.query(xy, k=k_busca)
+        cols = cols.reshape(len(xy), k_busca)
+
+        dists = haversine_pairs(np.asarray(lat)[:, None], np.asarray(lon)[:, None],
+                                self.lat[cols], self.lon[cols])
+        ordem = np.argsort(dists, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(cols, ordem, axis=1), np.take_along_axis(dists, ordem, axis=1)
+
+    def within(self, lat, lon, raio_km, min_hits=1, max_raio_km=None):
+        """
+        Escolas dentro de `raio_km` de cada aluno, ordenadas pela métrica.
+
+        Alunos com menos de `min_hits` escolas no raio têm a busca ampliada
+        por FATOR_EXPANSAO_RAIO até atingirem o mínimo (ou `max_raio_km`);
+        se ainda assim faltar, recebem as `min_hits` escolas mais próximas.
+        Retorna uma lista de pares (cols, dists) por aluno.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        min_hits = min(min_hits, len(self))
+        if not self.metrica.linha_reta:
+            return self._within_matrix(lat, lon, raio_km, min_hits, max_raio_km)
+        xy = project_local(lat, lon, self.lat0, self.lon0)
+        resultado = [None] * len(xy)
+
+        pendentes = np.arange(len(xy))
+        raio = raio_km
+        while len(pendentes) and (max_raio_km is None or raio <= max_raio_km):
+            hits = self.tree.query_ball_point(xy[pendentes], r=raio)
+            ainda = []
+            for i, cols in zip(pendentes.tolist(), hits):
+                if len(cols) >= min_hits:
+                    cols = np.asarray(cols, dtype=np.int64)
+                    d = haversine_pairs(lat[i], lon[i], self.lat[cols], self.lon[cols])
+                    ordem = np.argsort(d, kind="stable")
+                    resultado[i] = (cols[ordem], d[ordem])
+                else:
+                    ainda.append(i)
+            pendentes = np.asarray(ainda, dtype=np.int64)
+            raio *= FATOR_EXPANSAO_RAIO
+            if raio > 4 * RAIO_TERRA_KM:
+                break
+
+        if len(pendentes):
+            cols, dists = self.nearest(lat[pendentes], lon[pendentes], min_hits)
+            for i, c, d in zip(pendentes.tolist(), cols, dists):
+                resultado[i] = (c, d)
+        return resultado
+
+    def _within_matrix(self, lat, lon, raio_km, min_hits, max_raio_km):
+        """`within` sobre a matriz completa da métrica (mesma regra de ampliação)."""
+        dists = self.metrica.matrix(lat, lon, self.lat, self.lon)
+        ordem = np.argsort(dists, axis=1, kind="stable")
+        ordenadas = np.take_along_axis(dists, ordem, axis=1)
+        resultado = []
+        for cols, d in zip(ordem, ordenadas):
+            raio = raio_km
+            if min_hits:
+                # Raio ampliado até cobrir a min_hits-ésima escola mais próxima
+                while d[min_hits - 1] > raio and raio <= 4 * RAIO_TERRA_KM:
+                    raio *= FATOR_EXPANSAO_RAIO
+            n = int(np.searchsorted(d, raio, side="right"))
+            if max_raio_km is not None and raio > max_raio_km or n < min_hits:
+                n = min_hits
+            resultado.append((cols[:n], d[:n]))
+        return resultado
+
+
+def candidate_rooms(lat_alunos, lon_alunos, escolas, ids_salas, salas, k, raio_km=None,
+                    metrica=HAVERSINE):
+    """
+    Gera as opções de sala de cada aluno de um grupo via índice espacial.
+
+    Sem `raio_km`, retorna as salas das K escolas mais próximas; com raio,
+    as salas das escolas no raio (ampliado automaticamente para alunos sem
+    nenhuma escola). Em ambos os casos as listas são ordenadas por distância
+    e truncadas em K salas, com as distâncias da `metrica`. Retorna uma
+    lista de listas de (id_sala, dist).
+    """
+    salas_por_escola = {}
+    for id_sala in ids_salas:
+        id_e = salas[id_sala]["escola_id"]
+        if id_e in escolas:
+            salas_por_escola.setdefault(id_e, []).append(id_sala)
+    if not salas_por_escola:
+        return [[] for _ in range(len(lat_alunos))]
+
+    escola_ids = sorted(salas_por_escola)
+    salas_col = [salas_por_escola[e] for e in escola_ids]
+    index = SchoolIndex([escolas[e]["lat"] for e in escola_ids],
+                        [escolas[e]["lon"] for e in escola_ids], metrica)
+
+    # Cada escola do grupo tem ao menos uma sala: K escolas cobrem K salas.
+    if raio_km is None:
+        cols, dists = index.nearest(lat_alunos, lon_alunos, k)
+        pares = zip(cols.tolist(), dists.tolist())
+    else:
+        pares = ((c.tolist(), d.tolist())
+                 for c, d in index.within(lat_alunos, lon_alunos, raio_km))
+
+    return [
+        [(id_sala, d) for c, d in zip(cs, ds) for id_sala in salas_col[c]][:k]
+        for cs, ds in pares
+    ]
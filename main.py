@@ -1,56 +1,81 @@
 import random
-import math
-from collections import Counter, defaultdict
+from collections import defaultdict
 import time
 import concurrent.futures
+import argparse
+import os
 
-from deap import base, creator, tools, algorithms
+from deap import base, creator, tools
+import numpy as np
+
+from carregamento import (DTYPE_ESCOLAS, DTYPE_SALAS, columns, load_alunos_array,
+                          load_escolas_array, load_salas_array)
+from indice_espacial import candidate_rooms
+from distancias import HAVERSINE
+from rede_viaria import RoadNetwork
+from fluxo import aggregate_units, solve_group
+from regret import regret_split
+from unidades import expand_splits
+from decomposicao import MAX_ALUNOS_REGIAO, boundary_repair, split_group
+from telemetria import DESATIVADA, GenerationStats, Telemetria
+from parada import EarlyStopping, ea_simple, lower_bound
+from reparo import repair_capacity
+from mutacao import sample_positions
+from semeadura import partial_restart
+from exportacao import (allocation_columns, summarize, table_from_dict, write_columnar,
+                        write_csv)
 
 # --- Constantes de Penalidade ---
 PENALTY_OVERCAPACITY = 10000.0
 PENALTY_UNASSIGNED = 1000000.0
+PENALTY_UNASSIGNED_SPECIAL = 10 * PENALTY_UNASSIGNED  # motor de fluxo: especiais primeiro
 UNASSIGNED_SALA_ID = -1
 
-# --- 1. Cálculo de Distância (Haversine) ---
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    dLat = math.radians(lat2 - lat1)
-    dLon = math.radians(lon2 - lon1)
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    a = math.sin(dLat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dLon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
-
-# --- 2. Funções de Carregamento de Dados ---
+# Número de salas candidatas (mais próximas) por aluno
+N_OPCOES_LOCAL = 10
+N_OPCOES_REGRET = 30
+
+# Parâmetros do AG de cada grupo
+N_POP_LOCAL = 100
+N_GEN_LOCAL = 50
+CXPB_LOCAL = 0.7
+MUTPB_LOCAL = 0.2
+REPARO_CAPACIDADE = True  # Reparo de capacidade dos filhos (crossover e mutação)
+RUIDO_SEMENTE_LOCAL = 1.0  # Ruído (em posições) do greedy nas perturbações da semente
+
+# Parada antecipada do AG de cada grupo (None desativa cada critério):
+# estagnação, orçamento de tempo por grupo e por execução (prazo absoluto,
+# time.time()) e gap até o limite inferior (sala mais próxima, sem capacidade)
+PARADA = {
+    "janela": None,
+    "melhora_minima": 1e-4,
+    "limite_grupo_s": None,
+    "prazo": None,
+    "gap_alvo": 0.0,
+}
+
+# Distância acima da qual um aluno conta como "longa distância" na telemetria
+DISTANCIA_LONGA_KM = 1.2
+
+# Telemetria JSONL (--telemetria); desativada por padrão
+TELEMETRIA = DESATIVADA
+
+# Métrica das distâncias: Haversine ou malha viária (--rede-viaria)
+METRICA = HAVERSINE
+
+# --- 1. Funções de Carregamento de Dados ---
 def load_escolas(filepath="escolas.txt"):
-    escolas = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        f.readline()
-        for line in f:
-            parts = line.split()
-            if len(parts) >= 3:
-                escolas[int(parts[0])] = {
-                    "lat": float(parts[1]),
-                    "lon": float(parts[2])
-                }
+    dados, _ = load_escolas_array(filepath)
+    escolas = {id_e: {"lat": lat, "lon": lon} for id_e, lat, lon in zip(*columns(dados))}
     print(f"✓ Carregadas {len(escolas)} escolas.")
     return escolas
 
 def load_salas(filepath="salas.txt"):
-    salas = {}
-    with open(filepath, 'r', encoding='utf-8') as f:
-        f.readline()
-        for line in f:
-            parts = line.split()
-            if len(parts) >= 5:
-                id_sala = int(parts[1])
-                salas[id_sala] = {
-                    "escola_id": int(parts[0]),
-                    "etapa": int(parts[2]),
-                    "horario": int(parts[3]),
-                    "vagas": int(parts[4])
-                }
+    dados, _ = load_salas_array(filepath)
+    salas = {
+        id_sala: {"escola_id": escola_id, "etapa": etapa, "horario": horario, "vagas": vagas}
+        for escola_id, id_sala, etapa, horario, vagas in zip(*columns(dados))
+    }
     print(f"✓ Carregadas {len(salas)} salas.")
     return salas
 
@@ -58,234 +83,501 @@ def load_and_group_alunos(filepath):
     """
     Carrega TODOS os alunos e os separa em grupos por (etapa, horario).
     Não há mais filtro de etapas.
+
+    Retorna (alunos_por_grupo, dados): os grupos de dicionários (com a
+    posição do aluno no arquivo em "indice") e o array colunar de alunos.
     """
     alunos_por_grupo = defaultdict(list)
-    total_carregados = 0
-    with open(filepath, 'r', encoding='utf-8') as f:
-        f.readline() # Pula contador
-        for line in f:
-            parts = line.split()
-            if len(parts) >= 6:
-                aluno_etapa = int(parts[3])
-                aluno_horario = int(parts[4])
-                
-                # Adiciona o aluno ao seu grupo (etapa, horario)
-                alunos_por_grupo[(aluno_etapa, aluno_horario)].append({
-                    "id": parts[0],
-                    "lat": float(parts[1]),
-                    "lon": float(parts[2]),
-                    "etapa": aluno_etapa,
-                    "horario": aluno_horario,
-                    "special": int(parts[5])
-                })
-                total_carregados += 1
+    dados, _ = load_alunos_array(filepath)
+    for indice, (id_a, lat, lon, etapa, horario, special) in enumerate(zip(*columns(dados))):
+        # Adiciona o aluno ao seu grupo (etapa, horario)
+        alunos_por_grupo[(etapa, horario)].append({
+            "id": str(id_a),
+            "lat": lat,
+            "lon": lon,
+            "etapa": etapa,
+            "horario": horario,
+            "special": special,
+            "indice": indice
+        })
     
-    print(f"✓ Carregados {total_carregados} alunos (TODAS AS ETAPAS).")
+    print(f"✓ Carregados {len(dados)} alunos (TODAS AS ETAPAS).")
     print(f"✓ Separados em {len(alunos_por_grupo)} grupos (tarefas).")
-    return alunos_por_grupo
+    return alunos_por_grupo, dados
 
-def group_salas(salas):
+def group_salas(salas, escolas):
     """Agrupa IDs de salas por (etapa, horario) para consulta rápida."""
     salas_por_grupo = defaultdict(list)
     for id_sala, sala in salas.items():
-        if sala["escola_id"] in ESCOLAS: # Valida se escola existe
+        if sala["escola_id"] in escolas: # Valida se escola existe
             salas_por_grupo[(sala["etapa"], sala["horario"])].append(id_sala)
     return salas_por_grupo
 
-# --- 3. Configuração Global DEAP ---
+def init_worker(escolas, salas, salas_por_grupo, caminho_telemetria=None, parada=None,
+                reparo=None, metrica=None):
+    """
+    Inicializador dos processos do pool: recebe os dados estáticos uma única
+    vez por processo, em vez de serializá-los a cada tarefa.
+    """
+    global ESCOLAS, SALAS, SALAS_POR_GRUPO, TELEMETRIA, PARADA, REPARO_CAPACIDADE, METRICA
+    ESCOLAS = escolas
+    SALAS = salas
+    SALAS_POR_GRUPO = salas_por_grupo
+    if caminho_telemetria:
+        TELEMETRIA = Telemetria(caminho_telemetria, programa="main")
+    if parada is not None:
+        PARADA = parada
+    if reparo is not None:
+        REPARO_CAPACIDADE = reparo
+    if metrica is not None:
+        METRICA = metrica
+
+# --- 2. Configuração Global DEAP ---
 creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
 creator.create("Individual", list, fitness=creator.FitnessMin)
 
-# --- 4. Motor da Thread ---
+# --- 3. Motor de cada Grupo (thread ou processo) ---
 
-def run_evolution_for_group(task_data):
+def unpack_task(task_data):
     """
-    Recebe um grupo de alunos, roda um AG completo para eles,
-    e retorna a melhor solução encontrada.
+    Uma tarefa é (grupo_key, alunos) ou, quando o grupo foi decomposto em
+    regiões, (grupo_key, alunos_da_regiao, ids_salas_da_regiao).
     """
-    grupo_key, alunos_do_grupo = task_data
-    etapa, horario = grupo_key
+    if len(task_data) == 3:
+        return task_data
+    grupo_key, alunos = task_data
+    return grupo_key, alunos, SALAS_POR_GRUPO.get(grupo_key, [])
+
+def build_group_toolbox(alunos_do_grupo, ids_salas_do_grupo):
+    """Toolbox DEAP local de um grupo (ou região), com seus operadores."""
     n_alunos_grupo = len(alunos_do_grupo)
-    
-    print(f"  [Thread {etapa}-{horario}] Iniciando. {n_alunos_grupo} alunos...")
 
-    # 1. Pré-processamento LOCAL (só para este grupo)
-    ids_salas_do_grupo = SALAS_POR_GRUPO.get(grupo_key, [])
-    
-    if not ids_salas_do_grupo:
-        print(f"  [Thread {etapa}-{horario}] AVISO: Nenhuma sala encontrada. {n_alunos_grupo} alunos não serão alocados.")
-        return (grupo_key, [UNASSIGNED_SALA_ID] * n_alunos_grupo, alunos_do_grupo)
+    # Opções de cada aluno via índice espacial: só as N_OPCOES_LOCAL salas
+    # mais próximas são usadas pelo AG, então não ordenamos todas as salas.
+    local_aluno_opcoes = candidate_rooms(
+        [a["lat"] for a in alunos_do_grupo], [a["lon"] for a in alunos_do_grupo],
+        ESCOLAS, ids_salas_do_grupo, SALAS, N_OPCOES_LOCAL, metrica=METRICA)
+
+    # Modelo compacto do grupo: candidatas em matriz (alunos × K) de ids e de
+    # índices densos locais, distâncias paralelas e vagas por índice denso
+    ids_salas_locais = sorted({s for opcoes in local_aluno_opcoes for s, _ in opcoes})
+    pos_local = {s: j for j, s in enumerate(ids_salas_locais)}
+    candidatas = np.full((n_alunos_grupo, N_OPCOES_LOCAL), -1, dtype=np.int32)
+    ids_candidatas = np.full((n_alunos_grupo, N_OPCOES_LOCAL), UNASSIGNED_SALA_ID, dtype=np.int64)
+    dist_candidatas = np.zeros((n_alunos_grupo, N_OPCOES_LOCAL))
+    for i, opcoes in enumerate(local_aluno_opcoes):
+        candidatas[i, :len(opcoes)] = [pos_local[s] for s, _ in opcoes]
+        ids_candidatas[i, :len(opcoes)] = [s for s, _ in opcoes]
+        dist_candidatas[i, :len(opcoes)] = [d for _, d in opcoes]
+    vagas_locais = np.array([SALAS[s]["vagas"] for s in ids_salas_locais], dtype=np.int64)
+    n_opcoes = [len(opcoes) for opcoes in local_aluno_opcoes]
+    linhas = np.arange(n_alunos_grupo)
 
-    local_aluno_opcoes = []
-    local_dist_map = defaultdict(dict)
-
-    for i, aluno in enumerate(alunos_do_grupo):
-        opcoes = []
-        for id_sala in ids_salas_do_grupo:
-            sala = SALAS[id_sala]
-            escola = ESCOLAS[sala["escola_id"]]
-            dist = haversine(aluno["lat"], aluno["lon"], escola["lat"], escola["lon"])
-            opcoes.append((id_sala, dist))
-            local_dist_map[i][id_sala] = dist
-        opcoes.sort(key=lambda x: x[1])
-        local_aluno_opcoes.append(opcoes)
-
-    # 2. Configuração de Toolbox LOCAL (para esta thread)
     toolbox = base.Toolbox()
     
+    # Semente (uma vez por grupo) e perturbações dela. O fitness daqui é só
+    # distância + penalidades: cada aluno na sala mais próxima, com o reparo de
+    # capacidade tirando das salas cheias os alunos de alternativa mais barata
+    candidatas_l = candidatas.tolist()
+    vagas_l = vagas_locais.tolist()
+    especial = [a["special"] == 1 for a in alunos_do_grupo]
+    semente = candidatas[:, 0].astype(np.int64)
+    if REPARO_CAPACIDADE:
+        repair_capacity(semente, vagas_locais, candidatas, dist_candidatas)
+    # Índice denso -> id de sala; o -1 (não alocado) cai no último elemento
+    ids_por_indice = np.array(ids_salas_locais + [UNASSIGNED_SALA_ID], dtype=np.int64)
+
     def create_individual_local():
-        ind = []
-        for i in range(n_alunos_grupo):
-            if local_aluno_opcoes[i]:
-                ind.append(local_aluno_opcoes[i][0][0])
-            else:
-                ind.append(UNASSIGNED_SALA_ID)
-        return creator.Individual(ind)
+        return creator.Individual(ids_por_indice[semente].tolist())
+
+    def population_local(n):
+        if not ids_salas_locais:
+            return [create_individual_local() for _ in range(n)]
+        pop = [create_individual_local()]
+        for _ in range(n - 1):
+            solucao, _ = partial_restart(semente, candidatas_l, n_opcoes, vagas_l, especial,
+                                         ruido=RUIDO_SEMENTE_LOCAL, peso_ocupacao=0)
+            ind = creator.Individual(ids_por_indice[solucao].tolist())
+            if REPARO_CAPACIDADE:
+                repair_local(ind)
+            pop.append(ind)
+        return pop[:n]
+
+    def decode_local(individual):
+        """(alocado, sala densa, distância) por aluno; os genes são sempre candidatas."""
+        genes = np.asarray(individual, dtype=np.int64)
+        alocado = genes != UNASSIGNED_SALA_ID
+        col = (ids_candidatas == genes[:, None]).argmax(axis=1)
+        return alocado, candidatas[linhas, col], dist_candidatas[linhas, col]
+
+    def repair_local(individual):
+        alocado, sala, _ = decode_local(individual)
+        sala = np.where(alocado, sala, -1)
+        for i in repair_capacity(sala, vagas_locais, candidatas, dist_candidatas):
+            individual[i] = ids_salas_locais[sala[i]]
+        return individual
 
     def evaluate_local(individual):
-        total_distance = 0
-        penalty = 0
-        sala_counts = Counter(individual)
-        
-        for id_sala, count in sala_counts.items():
-            if id_sala == UNASSIGNED_SALA_ID:
-                penalty += count * PENALTY_UNASSIGNED
-                continue
-            vagas = SALAS[id_sala]["vagas"]
-            if count > vagas:
-                penalty += (count - vagas) * PENALTY_OVERCAPACITY
-                
-        for i, id_sala in enumerate(individual):
-            if id_sala != UNASSIGNED_SALA_ID:
-                total_distance += local_dist_map[i][id_sala]
-        return (total_distance + penalty,)
+        alocado, sala, dist = decode_local(individual)
+        ocupacao = np.bincount(sala[alocado], minlength=len(vagas_locais))
+        penalty = ((~alocado).sum() * PENALTY_UNASSIGNED
+                   + np.maximum(0, ocupacao - vagas_locais).sum() * PENALTY_OVERCAPACITY)
+        return (float(dist[alocado].sum() + penalty),)
+
+    def lower_bound_local():
+        # Sala mais próxima de cada aluno (as opções vêm ordenadas), sem capacidade
+        return lower_bound([opcoes[0][1] if opcoes else float("inf")
+                            for opcoes in local_aluno_opcoes],
+                           [PENALTY_UNASSIGNED] * n_alunos_grupo)
+
+    def violations_local(individual):
+        alocado, sala, dist = decode_local(individual)
+        ocupacao = np.bincount(sala[alocado], minlength=len(vagas_locais))
+        special = np.array(especial, dtype=bool)
+        return {"mismatch": 0,
+                "unassigned_special": int((~alocado & special).sum()),
+                "unassigned_normal": int((~alocado & ~special).sum()),
+                "overcapacity": int(np.maximum(0, ocupacao - vagas_locais).sum()),
+                "long_distance": int((alocado & (dist > DISTANCIA_LONGA_KM)).sum())}
 
     def mutate_local(individual, indpb):
-        for i in range(n_alunos_grupo):
-            if random.random() < indpb:
-                top_opcoes = [s for s,d in local_aluno_opcoes[i][:10]]
-                if top_opcoes:
-                    individual[i] = random.choice(top_opcoes)
+        # Só as posições sorteadas; a nova sala sai da matriz de candidatas
+        for i in sample_positions(n_alunos_grupo, indpb):
+            if n_opcoes[i]:
+                individual[i] = int(ids_candidatas[i, random.randrange(n_opcoes[i])])
         return individual,
 
     toolbox.register("individual", create_individual_local)
-    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("population", population_local)
     toolbox.register("evaluate", evaluate_local)
+    toolbox.register("violations", violations_local)
+    toolbox.register("lower_bound", lower_bound_local)
     toolbox.register("mate", tools.cxTwoPoint)
     toolbox.register("mutate", mutate_local, indpb=0.05)
     toolbox.register("select", tools.selTournament, tournsize=3)
+    if REPARO_CAPACIDADE:
+        toolbox.register("repair", repair_local)
+    return toolbox
+
+def run_evolution_for_group(task_data):
+    """
+    Recebe um grupo de alunos, roda um AG completo para eles,
+    e retorna a melhor solução encontrada.
+    """
+    grupo_key, alunos_do_grupo, ids_salas_do_grupo = unpack_task(task_data)
+    etapa, horario = grupo_key
+    n_alunos_grupo = len(alunos_do_grupo)
     
+    print(f"  [Grupo {etapa}-{horario}] Iniciando. {n_alunos_grupo} alunos...")
+
+    if not ids_salas_do_grupo:
+        print(f"  [Grupo {etapa}-{horario}] AVISO: Nenhuma sala encontrada. {n_alunos_grupo} alunos não serão alocados.")
+        return (grupo_key, [UNASSIGNED_SALA_ID] * n_alunos_grupo, alunos_do_grupo)
+
+    telemetria = TELEMETRIA.with_context(grupo=f"{etapa}-{horario}", alunos=n_alunos_grupo)
+
+    # 1-2. Pré-processamento e toolbox LOCAIS (só para este grupo/região)
+    with telemetria.fase("preprocessamento"):
+        toolbox = build_group_toolbox(alunos_do_grupo, ids_salas_do_grupo)
+
+    stats = None
+    if telemetria.ativa:
+        stats = GenerationStats(telemetria, toolbox.violations)
+        toolbox.register("evaluate", stats.counted(toolbox.evaluate))
+
     # 3. Execução do AG LOCAL
-    N_POP_LOCAL = 100
-    N_GEN_LOCAL = 50
-    
-    pop = toolbox.population(n=N_POP_LOCAL)
+    parada = EarlyStopping(PARADA["janela"], PARADA["melhora_minima"], PARADA["limite_grupo_s"],
+                           PARADA["prazo"], toolbox.lower_bound(), PARADA["gap_alvo"])
+    with telemetria.fase("semente", populacao=N_POP_LOCAL):
+        pop = toolbox.population(n=N_POP_LOCAL)
     hof = tools.HallOfFame(1)
     
-    algorithms.eaSimple(pop, toolbox, 
-                         cxpb=0.7, mutpb=0.2, ngen=N_GEN_LOCAL, 
-                         halloffame=hof, verbose=False)
+    with telemetria.fase("evolucao", geracoes=N_GEN_LOCAL):
+        ea_simple(pop, toolbox, 
+                  cxpb=CXPB_LOCAL, mutpb=MUTPB_LOCAL, ngen=N_GEN_LOCAL, parada=parada,
+                  stats=stats, halloffame=hof, verbose=False)
     
     best_fitness = hof[0].fitness.values[0]
-    print(f"  [Thread {etapa}-{horario}] Concluído. Fitness: {best_fitness:.2f}")
+    print(f"  [Grupo {etapa}-{horario}] Concluído. Fitness: {best_fitness:.2f} "
+          f"({parada.describe()})")
+    telemetria.emit("parada", motivo=parada.motivo, geracoes=len(parada.historico) - 1,
+                    gap=parada.gap(), limite_inferior=parada.limite_inferior)
+    telemetria.emit("resultado", motor="ag", fitness=best_fitness, gap=parada.gap(),
+                    violacoes=toolbox.violations(hof[0]))
     
     return (grupo_key, hof[0], alunos_do_grupo)
 
 
-# --- 5. Execução Principal (Thread Mestra) ---
+def run_min_cost_flow_for_group(task_data):
+    """
+    Resolve um grupo de forma exata (fluxo de custo mínimo, custo = distância)
+    e retorna no mesmo formato de run_evolution_for_group.
+    """
+    grupo_key, alunos_do_grupo, ids_salas_do_grupo = unpack_task(task_data)
+    etapa, horario = grupo_key
+
+    telemetria = TELEMETRIA.with_context(grupo=f"{etapa}-{horario}", alunos=len(alunos_do_grupo))
+    with telemetria.fase("resolucao", motor="fluxo"):
+        solucao, info = solve_group(
+            alunos_do_grupo, ids_salas_do_grupo, SALAS, ESCOLAS,
+            arc_cost=lambda dist: dist, penalty_special=PENALTY_UNASSIGNED_SPECIAL,
+            penalty_normal=PENALTY_UNASSIGNED, unassigned_id=UNASSIGNED_SALA_ID, metrica=METRICA)
+
+    if info["custo"] is None:
+        print(f"  [Grupo {etapa}-{horario}] AVISO: Nenhuma sala encontrada. {len(alunos_do_grupo)} alunos não serão alocados.")
+    else:
+        rotulo = "Fluxo ótimo" if info["otimo"] else "Fluxo (limite de rodadas, pode não ser ótimo)"
+        print(f"  [Grupo {etapa}-{horario}] {rotulo}: {info['custo']:.2f} "
+              f"({info['unidades']} unidades, {info['arcos']} arcos)")
+    return (grupo_key, solucao, alunos_do_grupo)
+
+
+def run_regret_for_group(task_data):
+    """
+    Modo rápido: heurística construtiva por arrependimento (sem AG), no
+    mesmo formato de retorno de run_evolution_for_group.
+    """
+    grupo_key, alunos_do_grupo, ids_salas_do_grupo = unpack_task(task_data)
+    etapa, horario = grupo_key
+
+    if not ids_salas_do_grupo:
+        print(f"  [Grupo {etapa}-{horario}] AVISO: Nenhuma sala encontrada. {len(alunos_do_grupo)} alunos não serão alocados.")
+        return (grupo_key, [UNASSIGNED_SALA_ID] * len(alunos_do_grupo), alunos_do_grupo)
+
+    telemetria = TELEMETRIA.with_context(grupo=f"{etapa}-{horario}", alunos=len(alunos_do_grupo))
+    with telemetria.fase("resolucao", motor="regret"):
+        # Alunos idênticos (coordenadas e necessidade especial) viram uma unidade
+        unidade, lat_u, lon_u, special_u, contagem = aggregate_units(
+            [a["lat"] for a in alunos_do_grupo], [a["lon"] for a in alunos_do_grupo],
+            [a["special"] for a in alunos_do_grupo])
+        especiais = (special_u == 1).tolist()
+        custo_nao_alocado = [PENALTY_UNASSIGNED_SPECIAL if sp else PENALTY_UNASSIGNED
+                             for sp in especiais]
+        vagas = {id_sala: SALAS[id_sala]["vagas"] for id_sala in ids_salas_do_grupo}
+        opcoes = candidate_rooms(lat_u, lon_u, ESCOLAS, ids_salas_do_grupo, SALAS,
+                                 N_OPCOES_REGRET, metrica=METRICA)
+        divisoes = regret_split(opcoes, especiais, contagem.tolist(), vagas, custo_nao_alocado)
+
+        # Candidatas lotadas: quem sobrou tenta as demais salas do grupo com vaga
+        for id_sala, quantidade in (d for divisao in divisoes for d in divisao):
+            vagas[id_sala] -= quantidade
+        faltam = [c - sum(q for _, q in divisao) for c, divisao in zip(contagem.tolist(), divisoes)]
+        pendentes = [u for u, f in enumerate(faltam) if f > 0]
+        com_vaga = [id_sala for id_sala in ids_salas_do_grupo if vagas[id_sala] > 0]
+        if pendentes and com_vaga:
+            extras = regret_split(
+                candidate_rooms(lat_u[pendentes], lon_u[pendentes], ESCOLAS, com_vaga, SALAS,
+                                len(com_vaga), metrica=METRICA),
+                [especiais[u] for u in pendentes], [faltam[u] for u in pendentes], vagas,
+                [custo_nao_alocado[u] for u in pendentes])
+            for u, divisao in zip(pendentes, extras):
+                divisoes[u].extend(divisao)
+        solucao = expand_splits(unidade, divisoes, UNASSIGNED_SALA_ID).tolist()
+
+    print(f"  [Grupo {etapa}-{horario}] Regret concluído. {len(alunos_do_grupo)} alunos.")
+    return (grupo_key, solucao, alunos_do_grupo)
+
+
+def write_results(resultados_finais, alunos, output_filename="resultado_alocacao.txt",
+                  binario=None):
+    """
+    Grava o relatório de verificação (aluno -> escola, com distâncias) como
+    CSV ';' na ordem do arquivo de alunos e, com `binario`, as mesmas colunas
+    em .npz. Retorna (total_alunos, total_nao_alocados, distancia_total_km).
+    """
+    sala_por_aluno = np.full(len(alunos), UNASSIGNED_SALA_ID, dtype=np.int64)
+    for _, best_solution, alunos_do_grupo in resultados_finais:
+        sala_por_aluno[[a["indice"] for a in alunos_do_grupo]] = best_solution
+
+    tabela_salas = table_from_dict(SALAS, DTYPE_SALAS)
+    col = allocation_columns(alunos, tabela_salas, table_from_dict(ESCOLAS, DTYPE_ESCOLAS),
+                             sala_por_aluno, UNASSIGNED_SALA_ID, metrica=METRICA)
+    resumo = summarize(col, tabela_salas)
+
+    nao_alocado = ~col["alocado"]
+    write_csv(output_filename, [
+        ("id_aluno", col["id_aluno"], "", []),
+        ("etapa", col["etapa_desejada"], "", []),
+        ("horario", col["horario_desejado"], "", []),
+        ("lat_aluno", col["lat_aluno"], ".6f", []),
+        ("lon_aluno", col["lon_aluno"], ".6f", []),
+        ("id_escola", col["id_escola"], "", [(nao_alocado, "NAO_ALOCADO")]),
+        ("lat_escola", col["lat_escola"], ".6f", [(nao_alocado, "N/A")]),
+        ("lon_escola", col["lon_escola"], ".6f", [(nao_alocado, "N/A")]),
+        ("distancia_km", col["distancia_km"], ".3f", [(nao_alocado, "N/A")]),
+    ])
+    if binario:
+        write_columnar(binario, col)
+
+    total_nao_alocados = resumo["unassigned_special"] + resumo["unassigned_normal"]
+    print(f"Alunos Totais (TODAS AS ETAPAS): {resumo['alunos']}")
+    print(f"Alunos Não Alocados: {total_nao_alocados}")
+    print(f"Distância Total Percorrida (Real): {resumo['distancia_total_km']:.2f} km")
+    print(f"Distância Média por Aluno (Alocados): {resumo['distancia_media_km']:.3f} km")
+
+    return resumo["alunos"], total_nao_alocados, resumo["distancia_total_km"]
+
+
+# --- 4. Execução Principal ---
+def parse_args():
+    parser = argparse.ArgumentParser(description="Alocador de alunos por grupo (etapa, horario).")
+    parser.add_argument("--engine", choices=["ag", "fluxo", "regret"], default="ag",
+                        help="Motor por grupo: AG (padrão), fluxo de custo mínimo exato "
+                             "ou heurística rápida por arrependimento.")
+    parser.add_argument("--regioes", action="store_true",
+                        help="Decompõe grupos grandes em regiões resolvidas independentemente.")
+    parser.add_argument("--max-alunos-regiao", type=int, default=MAX_ALUNOS_REGIAO,
+                        help=f"Alunos por região com --regioes (padrão: {MAX_ALUNOS_REGIAO}).")
+    parser.add_argument("--executor", choices=["processos", "threads"], default="processos",
+                        help="Pool de execução dos AGs por grupo (padrão: processos).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Número de workers (padrão: número de CPUs).")
+    parser.add_argument("--janela", type=int, default=PARADA["janela"],
+                        help="Para o AG de um grupo após N gerações sem melhora relativa "
+                             "acima de --melhora-minima (padrão: desativado).")
+    parser.add_argument("--melhora-minima", type=float, default=PARADA["melhora_minima"],
+                        help=f"Melhora relativa mínima na janela (padrão: {PARADA['melhora_minima']}).")
+    parser.add_argument("--limite-grupo", type=float, default=PARADA["limite_grupo_s"],
+                        metavar="SEGUNDOS", help="Orçamento de tempo do AG de cada grupo.")
+    parser.add_argument("--limite-tempo", type=float, default=None, metavar="SEGUNDOS",
+                        help="Orçamento de tempo da execução inteira: grupos que chegam ao "
+                             "prazo param na geração atual.")
+    parser.add_argument("--gap-alvo", type=float, default=PARADA["gap_alvo"],
+                        help="Para o AG de um grupo quando o gap até o limite inferior (sala "
+                             "mais próxima, sem capacidade) fica abaixo deste valor "
+                             "(ex.: 0.01 = 1%%; padrão: 0, só no ótimo).")
+    parser.add_argument("--sem-reparo", action="store_true",
+                        help="Desativa o reparo de capacidade dos filhos do AG de cada grupo.")
+    parser.add_argument("--binario", metavar="ARQUIVO", default=None,
+                        help="Grava também as colunas do resultado em formato binário (.npz).")
+    parser.add_argument("--telemetria", metavar="ARQUIVO", default=None,
+                        help="Grava telemetria estruturada (JSONL) por fase e por geração de cada grupo.")
+    parser.add_argument("--rede-viaria", metavar="ARQUIVO", default=None,
+                        help="Mede as distâncias pela malha viária deste arquivo (ver "
+                             "rede_viaria.py) em vez da linha reta; as buscas por escola "
+                             "ficam em cache em Models/.")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     
     print("="*60)
-    print("Iniciando Alocador de Alunos (Foco: TODAS AS ETAPAS com Threads)")
+    print(f"Iniciando Alocador de Alunos (Foco: TODAS AS ETAPAS com {args.executor.capitalize()})")
     print("="*60)
 
     start_time_total = time.time()
+    TELEMETRIA = Telemetria(args.telemetria, programa="main")
+    PARADA = {"janela": args.janela or None, "melhora_minima": args.melhora_minima,
+              "limite_grupo_s": args.limite_grupo, "gap_alvo": args.gap_alvo,
+              "prazo": None if args.limite_tempo is None else start_time_total + args.limite_tempo}
+    REPARO_CAPACIDADE = not args.sem_reparo
 
     # Carrega dados
-    ESCOLAS = load_escolas("Models/escolas.txt")
-    SALAS = load_salas("Models/salas.txt")
-    
-    # Agrupa salas globalmente
-    SALAS_POR_GRUPO = group_salas(SALAS)
-    
-    # Carrega TODOS os alunos.
-    alunos_por_grupo = load_and_group_alunos("Models/alunos.txt")
+    with TELEMETRIA.fase("carga"):
+        ESCOLAS = load_escolas("Models/escolas.txt")
+        SALAS = load_salas("Models/salas.txt")
+        
+        # Agrupa salas globalmente
+        SALAS_POR_GRUPO = group_salas(SALAS, ESCOLAS)
+        
+        # Carrega TODOS os alunos.
+        alunos_por_grupo, ALUNOS = load_and_group_alunos("Models/alunos.txt")
+
+        # Malha viária: uma busca de caminho mínimo por escola, antes do pool
+        if args.rede_viaria:
+            METRICA = RoadNetwork(args.rede_viaria, pasta_cache="Models")
+            buscas, segundos = METRICA.prepare([e["lat"] for e in ESCOLAS.values()],
+                                               [e["lon"] for e in ESCOLAS.values()])
+            print(f"✓ Distâncias pela {METRICA.describe()}: {buscas} buscas em {segundos:.2f}s"
+                  + (" (cache em disco)" if buscas == 0 else ""))
 
     if not alunos_por_grupo:
         print("\n✗ Nenhum aluno encontrado. Encerrando.")
         exit()
         
-    tarefas = list(alunos_por_grupo.items())
+    # Decomposição geográfica opcional: cada região vira uma tarefa
+    tarefas = []
+    regiao_da_tarefa = {}
+    for grupo_key, alunos_do_grupo in alunos_por_grupo.items():
+        if not args.regioes:
+            tarefas.append((grupo_key, alunos_do_grupo))
+            continue
+        regioes = split_group(alunos_do_grupo, SALAS_POR_GRUPO.get(grupo_key, []),
+                              SALAS, ESCOLAS, args.max_alunos_regiao)
+        for indices, ids_salas in regioes:
+            tarefa = (grupo_key, [alunos_do_grupo[i] for i in indices], ids_salas)
+            regiao_da_tarefa[id(tarefa)] = indices
+            tarefas.append(tarefa)
+    if args.regioes:
+        print(f"✓ {len(alunos_por_grupo)} grupos decompostos em {len(tarefas)} regiões.")
+
+    # Maiores tarefas primeiro, para que não sejam as últimas a terminar
+    tarefas.sort(key=lambda t: len(t[1]), reverse=True)
     
-    print(f"\n🚀 Iniciando ThreadPoolExecutor com {len(tarefas)} tarefas (threads)...")
+    n_workers = args.workers or os.cpu_count()
+    if args.executor == "processos":
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=n_workers, initializer=init_worker,
+            initargs=(ESCOLAS, SALAS, SALAS_POR_GRUPO, args.telemetria, PARADA,
+                      REPARO_CAPACIDADE, METRICA))
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=n_workers)
+
+    print(f"\n🚀 Iniciando pool de {args.executor} com {len(tarefas)} tarefas "
+          f"({n_workers} workers)...")
     print(f"   (Isso pode demorar vários minutos, dependendo do n° de grupos)")
     
     resultados_finais = []
+    resultados_regioes = defaultdict(list)
     
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_task = {executor.submit(run_evolution_for_group, task): task for task in tarefas}
+    with executor:
+        motor = {"ag": run_evolution_for_group, "fluxo": run_min_cost_flow_for_group,
+                 "regret": run_regret_for_group}[args.engine]
+        future_to_task = {executor.submit(motor, task): task for task in tarefas}
         
         for future in concurrent.futures.as_completed(future_to_task):
             try:
                 result = future.result()
-                resultados_finais.append(result)
+                tarefa = future_to_task[future]
+                if id(tarefa) in regiao_da_tarefa:
+                    resultados_regioes[tarefa[0]].append((regiao_da_tarefa[id(tarefa)], result[1]))
+                else:
+                    resultados_finais.append(result)
             except Exception as e:
                 # Mostra qual grupo falhou
                 task_key = future_to_task[future][0]
-                print(f"  [ERRO GRAVE] Thread {task_key} falhou: {e}")
+                print(f"  [ERRO GRAVE] Grupo {task_key} falhou: {e}")
+
+    # Junta as regiões de cada grupo e faz o reparo de fronteira
+    for grupo_key, partes in resultados_regioes.items():
+        alunos_do_grupo = alunos_por_grupo[grupo_key]
+        ids_salas = SALAS_POR_GRUPO.get(grupo_key, [])
+        solucao = [UNASSIGNED_SALA_ID] * len(alunos_do_grupo)
+        for indices, parcial in partes:
+            for i, id_sala in zip(indices, parcial):
+                solucao[i] = id_sala
+        if len(partes) > 1 and ids_salas:
+            opcoes = candidate_rooms(
+                [a["lat"] for a in alunos_do_grupo], [a["lon"] for a in alunos_do_grupo],
+                ESCOLAS, ids_salas, SALAS, N_OPCOES_LOCAL, metrica=METRICA)
+            movidos = boundary_repair(solucao, opcoes,
+                                      {s: SALAS[s]["vagas"] for s in ids_salas},
+                                      unassigned_id=UNASSIGNED_SALA_ID)
+            print(f"  [Grupo {grupo_key[0]}-{grupo_key[1]}] {len(partes)} regiões, "
+                  f"reparo de fronteira moveu {movidos} alunos.")
+        resultados_finais.append((grupo_key, solucao, alunos_do_grupo))
 
     print("\n" + "="*60)
-    print("Todas as threads concluídas. Consolidando resultados...")
+    print("Todos os grupos concluídos. Consolidando resultados...")
     print("="*60)
 
     # --- 6. Resultados e Verificação ---
     
     output_filename = "resultado_alocacao.txt"
-    total_dist_geral = 0
-    total_alunos_geral = 0
-    total_nao_alocados = 0
-    
     try:
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            header = f"{'ID Aluno':<10} | {'Etapa':<5} | {'Horario':<7} | {'Lat Aluno':<12} | {'Lon Aluno':<12} | {'-> ID Escola':<12} | {'Lat Escola':<12} | {'Lon Escola':<12} | {'Dist (km)':<10}\n"
-            separator = "-" * len(header.strip()) + "\n"
-            
-            f.write("VERIFICAÇÃO (Aluno LAT/LON -> Escola LAT/LON) - TODAS AS ETAPAS (THREADS)\n")
-            f.write(separator)
-            f.write(header)
-            f.write(separator)
-
-            # Ordena os resultados para o arquivo ficar organizado por etapa/horario
-            resultados_finais.sort(key=lambda x: x[0]) # Ordena por (etapa, horario)
-
-            for grupo_key, best_solution, alunos_do_grupo in resultados_finais:
-                etapa, horario = grupo_key
-                total_alunos_geral += len(alunos_do_grupo)
-                
-                for i, id_sala in enumerate(best_solution):
-                    aluno = alunos_do_grupo[i]
-                    
-                    if id_sala == UNASSIGNED_SALA_ID:
-                        total_nao_alocados += 1
-                        f.write(f"{aluno['id']:<10} | {aluno['etapa']:<5} | {aluno['horario']:<7} | {aluno['lat']:<12.6f} | {aluno['lon']:<12.6f} | {'NAO ALOCADO':<12} | {'-':<12} | {'-':<12} | {'-':<10}\n")
-                    else:
-                        sala = SALAS[id_sala]
-                        escola = ESCOLAS[sala["escola_id"]]
-                        dist = haversine(aluno["lat"], aluno["lon"], escola["lat"], escola["lon"])
-                        
-                        total_dist_geral += dist
-                        
-                        f.write(f"{aluno['id']:<10} | {aluno['etapa']:<5} | {aluno['horario']:<7} | {aluno['lat']:<12.6f} | {aluno['lon']:<12.6f} | {sala['escola_id']:<12} | {escola['lat']:<12.6f} | {escola['lon']:<12.6f} | {dist:<10.3f}\n")
-
-            f.write(separator)
-            
-            total_alocados = total_alunos_geral - total_nao_alocados
-            media_dist = total_dist_geral / total_alocados if total_alocados > 0 else 0
-            
-            f.write(f"Alunos Totais (TODAS AS ETAPAS): {total_alunos_geral}\n")
-            f.write(f"Alunos Não Alocados: {total_nao_alocados}\n")
-            f.write(f"Distância Total Percorrida (Real): {total_dist_geral:.2f} km\n")
-            f.write(f"Distância Média por Aluno (Alocados): {media_dist:.3f} km\n")
+        with TELEMETRIA.fase("escrita", arquivo=output_filename):
+            write_results(resultados_finais, ALUNOS, output_filename, binario=args.binario)
+        TELEMETRIA.close()
 
         elapsed_total = time.time() - start_time_total
         print(f"\nTempo total de execução: {elapsed_total:.2f} segundos.")
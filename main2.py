@@ -1,13 +1,41 @@
+import argparse
+import copy
+import functools
+import itertools
+import os
 import random
-import math
 import time
 from collections import Counter, defaultdict
-from deap import base, creator, tools, algorithms
+from deap import base, creator, tools
 import numpy as np
 
+from carregamento import load_alunos_array, load_escolas_array, load_salas_array
+from modelo import CompactModel, last_by_id
+from distancias import HAVERSINE
+from rede_viaria import RoadNetwork
+from avaliador import IncrementalEvaluator, cx_uniform_tracked, mark_changed
+from cache_fitness import FitnessCache
+from avaliacao_paralela import ParallelEvaluator
+from fluxo import solve_group
+from regret import regret_split
+from realocacao import load_previous_allocation, plan_reallocation, residual_capacity
+from telemetria import DESATIVADA, GenerationStats, Telemetria
+from parada import EarlyStopping, ea_mu_plus_lambda, lower_bound
+from ilhas import TOPOLOGIAS, decode_individuals, encode_individuals, run_islands
+from ag_vetorizado import BatchProblem, ea_mu_plus_lambda_batch
+from reparo import repair_capacity
+from mutacao import sample_positions
+from semeadura import cached_seed, greedy_fill, partial_restart, priority_order
+from unidades import expand_splits
+from checkpoint import (Checkpointer, fingerprint, load_checkpoint, restore_individuals,
+                        restore_rng)
+from exportacao import allocation_columns, summarize, write_columnar, write_csv
+
 # --- OTIMIZAÇÕES PRINCIPAIS ---
-# 1. Cache de distâncias (evita recalcular Haversine milhares de vezes)
-# 2. Estruturas de dados otimizadas (defaultdict, arrays numpy)
+# 1. Matriz de distâncias vetorizada aluno × escola (Haversine em lote, ou
+#    caminhos mínimos na malha viária: uma busca por escola)
+# 2. Modelo compacto: colunas numpy tipadas, índices densos, candidatas em matriz int32
+#    (calculadas uma vez por unidade de alunos idênticos)
 # 3. Pré-filtro de salas válidas por etapa/horário
 # 4. Algoritmo greedy melhorado com balanceamento de carga
 # 5. Avaliação fitness otimizada (cálculo incremental)
@@ -23,42 +51,12 @@ PENALTY_DISTANCE_MULTIPLIER = 10000
 
 N_CLOSEST_OPTIONS = 30  # Reduzido de 50 para 30 (mais focado)
 
-# --- 2. Cache de Distâncias (OTIMIZAÇÃO CRÍTICA) ---
-_distance_cache = {}
-
-def haversine(lat1, lon1, lat2, lon2):
-    """Calcula distância com cache para evitar recálculos."""
-    key = (round(lat1, 6), round(lon1, 6), round(lat2, 6), round(lon2, 6))
-    if key not in _distance_cache:
-        R = 6371
-        dLat = math.radians(lat2 - lat1)
-        dLon = math.radians(lon2 - lon1)
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        a = math.sin(dLat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dLon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        _distance_cache[key] = R * c
-    return _distance_cache[key]
-
-# --- 3. Funções de Carregamento Otimizadas ---
+# --- 2. Funções de Carregamento Otimizadas ---
 
 def load_alunos(filepath="alunos.txt"):
-    """Carrega alunos de forma otimizada."""
-    alunos = []
+    """Carrega alunos em tabela colunar (com cache binário)."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            total = int(f.readline().strip())
-            for line in f:
-                parts = line.split()
-                if len(parts) >= 6:
-                    alunos.append({
-                        "id": parts[0],
-                        "lat": float(parts[1]),
-                        "lon": float(parts[2]),
-                        "etapa": int(parts[3]),
-                        "horario": int(parts[4]),
-                        "special": int(parts[5])
-                    })
+        alunos, total = load_alunos_array(filepath)
         print(f"✓ Carregados {len(alunos)} alunos (esperado: {total})")
         return alunos
     except Exception as e:
@@ -66,429 +64,1067 @@ def load_alunos(filepath="alunos.txt"):
         return None
 
 def load_escolas(filepath="escolas.txt"):
-    """Carrega escolas de forma otimizada."""
-    escolas = {}
+    """Carrega escolas em tabela colunar (com cache binário)."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            total = int(f.readline().strip())
-            for line in f:
-                parts = line.split()
-                if len(parts) >= 3:
-                    escolas[int(parts[0])] = {
-                        "lat": float(parts[1]),
-                        "lon": float(parts[2])
-                    }
-        print(f"✓ Carregadas {len(escolas)} escolas (esperado: {total})")
+        escolas, total = load_escolas_array(filepath)
+        print(f"✓ Carregadas {len(np.unique(escolas['id']))} escolas (esperado: {total})")
         return escolas
     except Exception as e:
         print(f"✗ ERRO ao carregar escolas: {e}")
         return None
 
 def load_salas(filepath="salas.txt"):
-    """Carrega salas de forma otimizada com índice por etapa/horário."""
-    salas = {}
-    salas_por_etapa_horario = defaultdict(list)  # NOVO: índice rápido
-    total_vagas = 0
-
+    """Carrega salas em tabela colunar (com cache binário)."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            total = int(f.readline().strip())
-            for line in f:
-                parts = line.split()
-                if len(parts) >= 5:
-                    id_sala = int(parts[1])
-                    escola_id = int(parts[0])
-                    etapa = int(parts[2])
-                    horario = int(parts[3])
-                    vagas = int(parts[4])
-
-                    salas[id_sala] = {
-                        "escola_id": escola_id,
-                        "etapa": etapa,
-                        "horario": horario,
-                        "vagas": vagas
-                    }
-
-                    # Índice para busca rápida
-                    salas_por_etapa_horario[(etapa, horario)].append(id_sala)
-                    total_vagas += vagas
-
-        print(f"✓ Carregadas {len(salas)} salas com {total_vagas} vagas (esperado: {total})")
-        return salas, salas_por_etapa_horario
+        salas, total = load_salas_array(filepath)
+        total_vagas = int(salas["vagas"].sum())
+        print(f"✓ Carregadas {len(np.unique(salas['id']))} salas com {total_vagas} vagas "
+              f"(esperado: {total})")
+        return salas
     except Exception as e:
         print(f"✗ ERRO ao carregar salas: {e}")
-        return None, None
+        return None
 
-def preprocess_aluno_salas_proximas(alunos, escolas, salas, salas_por_etapa_horario):
+def build_model(alunos, escolas, salas, metrica=HAVERSINE):
     """
-    OTIMIZADO: Usa o índice de salas_por_etapa_horario para busca O(1)
-    e pré-calcula todas as distâncias necessárias.
+    Monta o modelo compacto (modelo.CompactModel): colunas tipadas com
+    índices densos, as N_CLOSEST_OPTIONS salas válidas mais próximas de cada
+    aluno (matriz int32, via índice espacial) e um bloco float32
+    unidades × escolas por grupo (etapa, horario), calculado em uma única
+    chamada vetorizada, uma vez por unidade de alunos idênticos. As distâncias vêm
+    de `metrica` (Haversine ou rede_viaria.RoadNetwork).
     """
     print("⏳ Pré-processando distâncias e opções de alocação...")
     start = time.time()
 
-    aluno_sala_map = []
-    alunos_sem_opcoes = 0
-    unfound_combos = Counter()
-
-    # Pré-calcula distâncias escola-sala (evita duplicatas)
-    escola_coords = {id_e: (e["lat"], e["lon"]) for id_e, e in escolas.items()}
-
-    for idx, aluno in enumerate(alunos):
-        if idx % 500 == 0 and idx > 0:
-            print(f"  Processados {idx}/{len(alunos)} alunos...")
-
-        aluno_etapa = aluno["etapa"]
-        aluno_horario = aluno["horario"]
-        aluno_coords = (aluno["lat"], aluno["lon"])
-
-        # Busca rápida: apenas salas com a etapa/horário corretos
-        salas_validas_ids = salas_por_etapa_horario.get((aluno_etapa, aluno_horario), [])
-
-        if not salas_validas_ids:
-            alunos_sem_opcoes += 1
-            unfound_combos[(aluno_etapa, aluno_horario)] += 1
-            aluno_sala_map.append([])
-            continue
-
-        # Calcula distâncias apenas para salas válidas
-        salas_com_dist = []
-        for id_sala in salas_validas_ids:
-            escola_id = salas[id_sala]["escola_id"]
-            if escola_id in escola_coords:
-                escola_lat, escola_lon = escola_coords[escola_id]
-                dist = haversine(aluno_coords[0], aluno_coords[1], escola_lat, escola_lon)
-                salas_com_dist.append((id_sala, dist))
-
-        # Ordena por distância (crescente)
-        salas_com_dist.sort(key=lambda x: x[1])
-        aluno_sala_map.append([id_sala for id_sala, _ in salas_com_dist])
+    print(f"  Métrica: {metrica.describe()}")
+    buscas, segundos = metrica.prepare(escolas["lat"], escolas["lon"])
+    if not metrica.linha_reta:
+        print(f"  Caminhos mínimos: {buscas} buscas em {segundos:.2f}s"
+              + (" (cache em disco)" if buscas == 0 else ""))
+    modelo = CompactModel(alunos, escolas, salas, N_CLOSEST_OPTIONS, metrica)
 
     elapsed = time.time() - start
     print(f"✓ Pré-processamento concluído em {elapsed:.2f}s")
-    print(f"  Cache de distâncias: {len(_distance_cache)} entradas")
-
-    if alunos_sem_opcoes > 0:
-        print(f"\n⚠ {alunos_sem_opcoes} alunos SEM opções de sala:")
-        for (etapa, horario), count in unfound_combos.most_common(5):
+    print(f"  Distâncias por grupo: {modelo.dist_blocos.size} células "
+          f"({modelo.dist_blocos.nbytes / 2**20:.1f} MB, contra "
+          f"{modelo.n_alunos * modelo.n_escolas * 4 / 2**20:.1f} MB da matriz aluno × escola); "
+          f"modelo completo: {modelo.nbytes() / 2**20:.1f} MB")
+    print(f"  Unidades (alunos idênticos agregados): {modelo.n_unidades} para "
+          f"{modelo.n_alunos} alunos ({modelo.n_alunos / max(1, modelo.n_unidades):.2f}×)")
+
+    if modelo.sem_opcoes:
+        print(f"\n⚠ {sum(modelo.sem_opcoes.values())} alunos SEM opções de sala:")
+        for (etapa, horario), count in Counter(modelo.sem_opcoes).most_common(5):
             print(f"  • Etapa {etapa}, Horário {horario}: {count} alunos")
 
-    return aluno_sala_map
+    return modelo
 
-# --- 4. Configuração DEAP ---
-
-print("\n" + "="*60)
-print("SISTEMA DE ALOCAÇÃO DE ALUNOS - VERSÃO OTIMIZADA")
-print("="*60 + "\n")
-
-ALUNOS = load_alunos("Models/alunos.txt")
-ESCOLAS = load_escolas("Models/escolas.txt")
-SALAS, SALAS_POR_ETAPA_HORARIO = load_salas("Models/salas.txt")
-
-if not ALUNOS or not ESCOLAS or not SALAS:
-    print("\n✗ Encerrando devido a erros no carregamento.")
-    exit()
-
-ALUNO_SALA_MAP = preprocess_aluno_salas_proximas(ALUNOS, ESCOLAS, SALAS, SALAS_POR_ETAPA_HORARIO)
+# --- 3. Problema e Configuração DEAP ---
 
 UNASSIGNED_ID = -1
-N_ALUNOS = len(ALUNOS)
-
-# Análise de viabilidade
-total_vagas = sum(s["vagas"] for s in SALAS.values())
-print(f"\n📊 Análise de Viabilidade:")
-print(f"  Total de alunos: {N_ALUNOS}")
-print(f"  Total de vagas: {total_vagas}")
-print(f"  Taxa de ocupação: {(N_ALUNOS/total_vagas)*100:.1f}%")
 
-creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-creator.create("Individual", list, fitness=creator.FitnessMin)
+# Pesos do fitness, repassados ao avaliador incremental (e aos workers)
+PENALIDADES = {
+    "mismatch": PENALTY_MISMATCH,
+    "unassigned_special": PENALTY_UNASSIGNED_SPECIAL,
+    "unassigned_normal": PENALTY_UNASSIGNED_NORMAL,
+    "overcapacity": PENALTY_OVERCAPACITY,
+    "distance_target_km": DISTANCE_TARGET_KM,
+    "distance_multiplier": PENALTY_DISTANCE_MULTIPLIER,
+}
+
+# Cache LRU de fitness, indexado por hash de 128 bits do cromossomo
+FITNESS_CACHE_SIZE = 20000
+
+def ensure_deap_types():
+    """Cria FitnessMin/Individual no creator do DEAP (uma vez por processo)."""
+    if not hasattr(creator, "FitnessMin"):
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", list, fitness=creator.FitnessMin)
+
+class Problem:
+    """
+    Instância carregada e pré-processada do problema de alocação.
 
-toolbox = base.Toolbox()
+    Carregue uma vez (Problem.load) e chame solve() quantas vezes quiser:
+    modelo compacto (colunas, candidatas e distâncias por grupo) e o
+    avaliador incremental ficam no objeto, e importar este módulo não tem
+    custo. `alunos`, `escolas` e `salas` são tabelas nos dtypes de
+    carregamento.py; `metrica` mede as distâncias (padrão: Haversine).
+    """
 
-def create_individual_balanced_greedy():
+    def __init__(self, alunos, escolas, salas, telemetria=None, metrica=None):
+        ensure_deap_types()
+        self.telemetria = telemetria or DESATIVADA
+        self.metrica = metrica or HAVERSINE
+
+        with self.telemetria.fase("preprocessamento", alunos=len(alunos)):
+            self.modelo = build_model(alunos, escolas, salas, self.metrica)
+            self.evaluator = IncrementalEvaluator(self.modelo, UNASSIGNED_ID, PENALIDADES)
+
+        m = self.modelo
+        self.n_alunos = m.n_alunos
+        self.total_vagas = int(m.salas["vagas"].sum())
+        # Genes dos indivíduos DEAP são ids de sala: candidatas e vagas por id
+        self.candidatas = m.room_ids(m.candidatas, UNASSIGNED_ID).astype(np.int32)
+        self.n_opcoes = m.n_opcoes.tolist()
+        self.vagas = dict(zip(m.salas["id"].tolist(), m.salas["vagas"].tolist()))
+        self.custo_candidatas = arc_cost(m.dist_candidatas.astype(np.float64))
+
+        # Tabelas colunares (ordenadas por id; escolas na ordem das colunas da matriz)
+        self.tabela_alunos = alunos
+        self.tabela_escolas = last_by_id(escolas)
+        self.tabela_salas = last_by_id(salas)
+        self._registros = None
+        self._semente = {}
+        self._limite_inferior = None
+        self._lote = {}
+
+    @classmethod
+    def load(cls, pasta="Models", telemetria=None, rede=None):
+        """
+        Carrega alunos.txt, escolas.txt e salas.txt de `pasta`. Com `rede`
+        (arquivo da malha viária), as distâncias são pela malha, com as
+        buscas por escola em cache em `pasta`.
+        """
+        with (telemetria or DESATIVADA).fase("carga"):
+            alunos = load_alunos(os.path.join(pasta, "alunos.txt"))
+            escolas = load_escolas(os.path.join(pasta, "escolas.txt"))
+            salas = load_salas(os.path.join(pasta, "salas.txt"))
+            metrica = RoadNetwork(rede, pasta_cache=pasta) if rede else None
+        if any(tabela is None or not len(tabela) for tabela in (alunos, escolas, salas)):
+            raise ValueError(f"Erro no carregamento dos dados de {pasta}")
+        return cls(alunos, escolas, salas, telemetria, metrica)
+
+    def records(self):
+        """
+        Visões em dicionários (alunos, escolas, salas, salas_por_etapa_horario)
+        para as interfaces por grupo de fluxo.py e realocacao.py; montadas na
+        primeira chamada.
+        """
+        if self._registros is None:
+            m = self.modelo
+            a, e, s = m.alunos, m.escolas, m.salas
+            alunos = [{"id": str(id_a), "lat": lat, "lon": lon, "etapa": etapa,
+                       "horario": horario, "special": special}
+                      for id_a, lat, lon, etapa, horario, special in zip(
+                          *(a[c].tolist() for c in ("id", "lat", "lon", "etapa", "horario",
+                                                    "special")))]
+            escolas = {id_e: {"lat": lat, "lon": lon}
+                       for id_e, lat, lon in zip(*(e[c].tolist() for c in ("id", "lat", "lon")))}
+            salas = {}
+            salas_por_etapa_horario = defaultdict(list)
+            for escola_id, id_sala, etapa, horario, vagas in zip(
+                    *(s[c].tolist() for c in ("escola_id", "id", "etapa", "horario", "vagas"))):
+                salas[id_sala] = {"escola_id": escola_id, "etapa": etapa, "horario": horario,
+                                  "vagas": vagas}
+                salas_por_etapa_horario[(etapa, horario)].append(id_sala)
+            self._registros = (alunos, escolas, salas, salas_por_etapa_horario)
+        return self._registros
+
+    def groups(self):
+        """Índices dos alunos de cada grupo (etapa, horario), em ordem de grupo."""
+        a = self.modelo.alunos
+        codigos, inverso = np.unique(a["grupo"], return_inverse=True)
+        ordem = np.argsort(inverso, kind="stable")
+        limites = np.cumsum(np.bincount(inverso, minlength=len(codigos)))[:-1]
+        return {(c >> 16, c & 0xFFFF): indices.tolist()
+                for c, indices in zip(codigos.tolist(), np.split(ordem, limites))}
+
+    def greedy_seed(self, pasta_cache=None, unidades=False):
+        """
+        Solução do greedy balanceado em índices densos de sala (int32),
+        calculada uma vez; com `pasta_cache`, também em disco, pelo hash das
+        entradas (semeadura.cached_seed). Com `unidades`, uma sala por
+        unidade de alunos idênticos (ver expand_units).
+        """
+        if unidades not in self._semente:
+            chave = fingerprint(self.tabela_alunos, self.tabela_escolas, self.tabela_salas,
+                                np.array([N_CLOSEST_OPTIONS, unidades], dtype=np.int64),
+                                np.frombuffer(self.metrica.assinatura.encode(), dtype=np.uint8))
+            self._semente[unidades] = cached_seed(
+                pasta_cache, chave, functools.partial(self._build_greedy_seed, unidades))
+        return self._semente[unidades]
+
+    def _build_greedy_seed(self, unidades=False):
+        m = self.modelo
+        linhas = m.representante if unidades else slice(None)
+        especial = m.alunos["especial"][linhas].tolist()
+        ordem = priority_order(especial)
+        contagem = None
+        if unidades:
+            # Unidades inteiras: as maiores primeiro (dentro de cada classe), enquanto há vagas
+            contagem = m.contagem.tolist()
+            ordem.sort(key=lambda u: (not especial[u], -contagem[u]))
+        n_opcoes = m.n_opcoes[linhas].tolist()
+        solucao = greedy_fill(m.candidatas[linhas].tolist(), n_opcoes, m.salas["vagas"].tolist(),
+                              [0] * m.n_salas, ordem, [-1] * len(n_opcoes), contagem=contagem)
+        return np.array(solucao, dtype=np.int32)
+
+    def expand_units(self, genes):
+        """Salas por unidade -> salas por aluno (todos os alunos da unidade juntos)."""
+        return np.asarray(genes)[..., self.modelo.unidade]
+
+    def worker_initargs(self):
+        """Argumentos de inicialização dos workers de avaliação paralela."""
+        return (self.modelo, UNASSIGNED_ID, PENALIDADES)
+
+    def distance(self, i, id_sala):
+        """Distância (km) do aluno i à escola da sala, ou None se a escola não existe."""
+        col = self.modelo.salas["escola"][self.modelo.sala_pos[id_sala]]
+        if col < 0:
+            return None
+        return float(self.modelo.distance(i, col))
+
+    def columns(self, solucao):
+        """Colunas por aluno da solução (ver exportacao.allocation_columns)."""
+        return allocation_columns(self.tabela_alunos, self.tabela_salas, self.tabela_escolas,
+                                  solucao, UNASSIGNED_ID, self.modelo.distance)
+
+    def summary(self, solucao):
+        """Violações e estatísticas de distância da solução."""
+        return summarize(self.columns(solucao), self.tabela_salas, DISTANCE_TARGET_KM)
+
+    def violations(self, solucao):
+        """Contagens de violações de uma solução (para telemetria)."""
+        resumo = self.summary(solucao)
+        return {chave: resumo[chave] for chave in ("mismatch", "unassigned_special",
+                                                   "unassigned_normal", "overcapacity",
+                                                   "long_distance")}
+
+    def batch(self, unidades=False):
+        """
+        Arrays do motor vetorizado (ag_vetorizado.BatchProblem), com as salas
+        em índices densos do modelo; montado uma vez. Com `unidades`, uma
+        linha por unidade de alunos idênticos, com peso = tamanho da unidade.
+        """
+        if unidades not in self._lote:
+            m = self.modelo
+            linhas = m.representante if unidades else np.arange(m.n_alunos)
+            self._lote[unidades] = BatchProblem(
+                m.candidatas[linhas], self.custo_candidatas[linhas],
+                lambda alunos, escolas: m.distance(linhas[alunos], escolas),
+                m.salas["escola"], m.salas["grupo"], m.salas["vagas"], m.alunos["grupo"][linhas],
+                m.alunos["especial"][linhas], PENALIDADES, peso=m.contagem if unidades else None)
+        return self._lote[unidades]
+
+    def dense_rooms(self, solucao):
+        """Ids de sala -> índices densos (-1 = não alocado ou sala inexistente)."""
+        return self.modelo.room_index(solucao).astype(np.int32)
+
+    def room_ids(self, genes):
+        """Índices densos de sala -> ids (UNASSIGNED_ID para -1)."""
+        return self.modelo.room_ids(genes, UNASSIGNED_ID)
+
+    def signature(self):
+        """Hash das entradas (alunos e salas), para validar checkpoints."""
+        return fingerprint(self.tabela_alunos, self.tabela_salas)
+
+    def lower_bound(self):
+        """
+        Limite inferior barato do fitness: cada aluno na escola válida mais
+        próxima, ignorando capacidade (calculado uma vez).
+        """
+        if self._limite_inferior is None:
+            m = self.modelo
+            dist_min = m.dist_minima[m.unidade].astype(np.float64)
+            nao_alocado = np.where(m.alunos["especial"],
+                                   PENALTY_UNASSIGNED_SPECIAL, PENALTY_UNASSIGNED_NORMAL)
+            self._limite_inferior = lower_bound(arc_cost(dist_min), nao_alocado)
+        return self._limite_inferior
+
+    def print_viability(self):
+        print(f"\n📊 Análise de Viabilidade:")
+        print(f"  Total de alunos: {self.n_alunos}")
+        print(f"  Total de vagas: {self.total_vagas}")
+        print(f"  Taxa de ocupação: {(self.n_alunos/self.total_vagas)*100:.1f}%")
+
+def create_individual_balanced_greedy(problem):
     """
     OTIMIZADO: Greedy com balanceamento de carga.
     Evita lotar uma sala quando há alternativas próximas com espaço.
+    Calculado uma vez por Problem (ver Problem.greedy_seed).
     """
-    individual = [UNASSIGNED_ID] * N_ALUNOS
-    sala_occupation = defaultdict(int)
+    return creator.Individual(problem.room_ids(problem.greedy_seed()).tolist())
 
-    # Prioriza alunos especiais
-    indices_especiais = [i for i, a in enumerate(ALUNOS) if a['special'] == 1]
-    indices_normais = [i for i, a in enumerate(ALUNOS) if a['special'] == 0]
+def seed_genes(problem, n, pasta_cache=None, unidades=False):
+    """
+    Genes (n × alunos, índices densos de sala) da população inicial: a
+    semente gulosa e n - 1 reinícios parciais dela (semeadura.partial_restart).
+    Com `unidades`, n × unidades de alunos idênticos.
+    """
+    semente = problem.greedy_seed(pasta_cache, unidades)
+    genes = np.empty((n, len(semente)), dtype=np.int32)
+    if n == 0:
+        return genes
+    genes[0] = semente
+    m = problem.modelo
+    linhas = m.representante if unidades else slice(None)
+    contagem = m.contagem if unidades else None
+    candidatas = m.candidatas[linhas].tolist()
+    n_opcoes = m.n_opcoes[linhas].tolist()
+    vagas = m.salas["vagas"].tolist()
+    especial = m.alunos["especial"][linhas].tolist()
+    for k in range(1, n):
+        genes[k], _ = partial_restart(semente, candidatas, n_opcoes, vagas, especial,
+                                      contagem=contagem)
+    return genes
+
+def seed_population(problem, n, pasta_cache=None):
+    """
+    População inicial de seed_genes como Individuals. A semente é avaliada
+    uma vez; as perturbações herdam o estado de avaliação dela e marcam os
+    genes alterados, então a primeira avaliação de cada uma é incremental.
+    """
+    genes = seed_genes(problem, n, pasta_cache)
+    if n == 0:
+        return []
+    base_ind = creator.Individual(problem.room_ids(genes[0]).tolist())
+    base_ind.avaliacao = problem.evaluator.full_state(base_ind)
+    base_ind.alterados = {}
+    populacao = [base_ind]
+    for linha in genes[1:]:
+        ind = creator.Individual(base_ind)
+        ind.avaliacao = base_ind.avaliacao.copy()
+        ind.alterados = {}
+        mudaram = np.flatnonzero(linha != genes[0])
+        for i, id_sala in zip(mudaram.tolist(), problem.room_ids(linha[mudaram]).tolist()):
+            mark_changed(ind, i)
+            ind[i] = id_sala
+        populacao.append(ind)
+    return populacao
+
+def copy_evaluation_state(avaliado, duplicata):
+    """Duplicatas exatas herdam o estado incremental do indivíduo avaliado."""
+    estado = getattr(avaliado, "avaliacao", None)
+    if estado is not None and getattr(duplicata, "avaliacao", None) is None:
+        duplicata.avaliacao = estado.copy()
+        duplicata.alterados = {}
+
+def clone_individual(individual):
+    """
+    Clone do toolbox sem copy.deepcopy: os genes são ints imutáveis, então
+    basta uma cópia rasa da lista; a fitness e o estado incremental
+    (EstadoAvaliacao.copy, alterados) são copiados à parte.
+    """
+    clone = creator.Individual(individual)
+    clone.fitness = copy.deepcopy(individual.fitness)
+    estado = getattr(individual, "avaliacao", None)
+    if estado is not None:
+        clone.avaliacao = estado.copy()
+    alterados = getattr(individual, "alterados", None)
+    if alterados is not None:
+        clone.alterados = dict(alterados)
+    return clone
+
+def map_cached(func, individuals, cache, inner_map=map, sincronizar=None):
+    """
+    Avalia uma geração pelo cache, sem reavaliar duplicatas exatas.
+    `inner_map` é o backend das avaliações restantes (serial ou paralelo).
+    Acertos do cache não passam pelo avaliador: com `sincronizar`
+    (IncrementalEvaluator.sync), o estado deles é atualizado aqui, e as
+    posições alteradas não se acumulam de uma geração para outra.
+    """
+    individuals = list(individuals)
+    fitnesses = cache.map(func, individuals, inner_map=inner_map,
+                          on_duplicate=copy_evaluation_state)
+    if sincronizar is not None:
+        for ind in individuals:
+            if getattr(ind, "alterados", None):
+                sincronizar(ind)
+    return fitnesses
+
+def current_occupancy(individual):
+    """
+    Ocupação por sala do indivíduo. Reaproveita o estado do avaliador
+    incremental (corrigido pelas posições alteradas desde a avaliação) e só
+    conta o cromossomo inteiro quando não há estado.
+    """
+    estado = getattr(individual, "avaliacao", None)
+    if estado is None:
+        return Counter(individual)
+    ocupacao = Counter(estado.ocupacao)
+    for i, anterior in getattr(individual, "alterados", {}).items():
+        ocupacao[anterior] -= 1
+        ocupacao[individual[i]] += 1
+    return ocupacao
+
+def custom_mutate(individual, problem, indpb):
+    """
+    Mutação inteligente: favorece trocas que reduzem superlotação.
+    Só as posições sorteadas (mutacao.sample_positions) são visitadas.
+    """
+    vagas = problem.vagas
+    sala_counts = current_occupancy(individual)
 
-    for i in indices_especiais + indices_normais:
-        salas_proximas = ALUNO_SALA_MAP[i]
+    for i in sample_positions(len(individual), indpb):
+        n_opcoes = problem.n_opcoes[i]
 
-        if not salas_proximas:
+        if n_opcoes <= 1:
             continue
 
-        # Tenta as N mais próximas, escolhendo a com mais espaço
-        melhor_sala = None
-        melhor_score = float('inf')
+        sala_atual = individual[i]
 
-        for id_sala in salas_proximas[:N_CLOSEST_OPTIONS]:
-            vagas = SALAS[id_sala]["vagas"]
-            ocupacao = sala_occupation[id_sala]
+        # Se a sala atual está superlotada, força mudança
+        if sala_atual in vagas and sala_counts[sala_atual] > vagas[sala_atual]:
+            # Escolhe sala com mais espaço
+            opcoes = problem.candidatas[i, :n_opcoes].tolist()
+            nova_sala = max(opcoes, key=lambda s: vagas[s] - sala_counts[s])
+            if vagas[nova_sala] - sala_counts[nova_sala] <= 0:
+                nova_sala = opcoes[random.randrange(n_opcoes)]
+        else:
+            # Mutação normal
+            nova_sala = int(problem.candidatas[i, random.randrange(n_opcoes)])
 
-            if ocupacao < vagas:
-                # Score = posição na lista (distância) + penalidade por ocupação
-                idx_dist = salas_proximas.index(id_sala)
-                score = idx_dist + (ocupacao / vagas) * 10
+        if nova_sala != sala_atual:
+            mark_changed(individual, i)
+            individual[i] = nova_sala
+            sala_counts[sala_atual] -= 1
+            sala_counts[nova_sala] += 1
 
-                if score < melhor_score:
-                    melhor_score = score
-                    melhor_sala = id_sala
+    return individual,
 
-        if melhor_sala:
-            individual[i] = melhor_sala
-            sala_occupation[melhor_sala] += 1
-        else:
-            # Se todas estão cheias, pega a mais próxima mesmo
-            individual[i] = salas_proximas[0]
-            sala_occupation[salas_proximas[0]] += 1
-
-    return creator.Individual(individual)
-
-toolbox.register("individual", create_individual_balanced_greedy)
-toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-
-# Cache para fitness (evita recalcular)
-_fitness_cache = {}
-
-def evaluate(individual):
-    """OTIMIZADO: Fitness com cálculo incremental e cache."""
-    # Converte para tuple para usar como chave de cache
-    ind_tuple = tuple(individual)
-    if ind_tuple in _fitness_cache:
-        return _fitness_cache[ind_tuple]
-
-    total_distance = 0
-    unassigned_special = 0
-    unassigned_normal = 0
-    overcapacity_penalty = 0
-    mismatch_count = 0
-    penalty_long_distance = 0
-
-    # Conta ocupação (mais rápido com Counter)
-    sala_counts = Counter(individual)
-
-    # 1. Penalidade por superlotação
-    for id_sala, count in sala_counts.items():
-        if id_sala != UNASSIGNED_ID and id_sala in SALAS:
-            vagas = SALAS[id_sala]["vagas"]
-            if count > vagas:
-                overcapacity_penalty += (count - vagas) * PENALTY_OVERCAPACITY
-
-    # 2. Penalidades individuais
-    for i in range(N_ALUNOS):
-        aluno = ALUNOS[i]
-        id_sala = individual[i]
-
-        if id_sala == UNASSIGNED_ID or id_sala not in SALAS:
-            if aluno['special'] == 1:
-                unassigned_special += 1
-            else:
-                unassigned_normal += 1
-            continue
+def occupancy_array(individual, problem):
+    """
+    Ocupação densa (array por sala) do indivíduo, a partir do estado do
+    avaliador incremental corrigido pelas posições alteradas desde a
+    avaliação; sem estado, conta o cromossomo inteiro.
+    """
+    estado = getattr(individual, "avaliacao", None)
+    if estado is None:
+        salas = problem.dense_rooms(individual)
+        return np.bincount(salas[salas >= 0], minlength=problem.modelo.n_salas)
+    densa = np.zeros(problem.modelo.n_salas, dtype=np.int64)
+    _add_rooms(densa, problem, estado.ocupacao.keys(), estado.ocupacao.values())
+    alterados = getattr(individual, "alterados", {})
+    if alterados:
+        _add_rooms(densa, problem, alterados.values(), itertools.repeat(-1, len(alterados)))
+        _add_rooms(densa, problem, (individual[i] for i in alterados),
+                   itertools.repeat(1, len(alterados)))
+    return densa
+
+def _add_rooms(densa, problem, ids, quantidades):
+    indices = problem.dense_rooms(np.fromiter(ids, dtype=np.int64))
+    validas = indices >= 0
+    np.add.at(densa, indices[validas], np.fromiter(quantidades, dtype=np.int64)[validas])
+
+def repair_individual(individual, problem):
+    """
+    Reparo de capacidade (reparo.repair_capacity) de um indivíduo, in place.
+    A ocupação vem do estado do avaliador incremental (occupancy_array);
+    sem sala superlotada, o cromossomo nem é convertido para índices densos.
+    """
+    vagas = problem.modelo.salas["vagas"]
+    ocupacao = occupancy_array(individual, problem)
+    if not (ocupacao > vagas).any():
+        return individual
+    salas = problem.dense_rooms(individual)
+    movidos = repair_capacity(salas, vagas, problem.modelo.candidatas,
+                              problem.custo_candidatas, ocupacao=ocupacao)
+    if movidos:
+        ids = problem.room_ids(salas[movidos]).tolist()
+        for i, id_sala in zip(movidos, ids):
+            mark_changed(individual, i)
+            individual[i] = id_sala
+    return individual
+
+def build_toolbox(problem, cache, inner_map=map, reparo=True, pasta_cache=None):
+    """
+    Toolbox DEAP ligada a um Problem e a um cache de fitness. Com `reparo`,
+    os filhos passam pelo reparo de capacidade antes da avaliação
+    (`toolbox.repair`, ver parada.evaluate_invalid);
+    `pasta_cache` guarda a semente gulosa em disco (ver seed_population).
+    """
+    toolbox = base.Toolbox()
+    toolbox.register("individual", create_individual_balanced_greedy, problem)
+    toolbox.register("population", seed_population, problem, pasta_cache=pasta_cache)
+    toolbox.register("clone", clone_individual)
+    toolbox.register("evaluate", problem.evaluator.evaluate)
+    toolbox.register("mate", cx_uniform_tracked, indpb=0.5)
+    toolbox.register("mutate", custom_mutate, problem=problem, indpb=0.03)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+    toolbox.register("map", map_cached, cache=cache, inner_map=inner_map,
+                     sincronizar=problem.evaluator.sync)
+    if reparo:
+        toolbox.register("repair", repair_individual, problem=problem)
+    return toolbox
+
+# --- 4. Execução Otimizada ---
+
+# PARÂMETROS OTIMIZADOS para dataset grande
+DEFAULT_PARAMS = {
+    "mu": 200,        # População reduzida (qualidade inicial já é boa)
+    "lambda_": 300,   # Mais filhos para exploração
+    "ngen": 200,      # Gerações suficientes
+    "cxpb": 0.7,      # Crossover alto
+    "mutpb": 0.3,     # Mutação moderada
+    "workers": 1,     # Processos para avaliação paralela (1 = serial)
+    "seed": None,     # Semente do gerador aleatório
+    "verbose": True,
+    "reparo": True,   # Reparo de capacidade dos filhos (crossover e mutação)
+    "cache_semente": None,  # Pasta do cache em disco da semente gulosa (None = só em memória)
+    "unidades": False,  # AG vetorizado: um gene por unidade de alunos idênticos
+    # Parada antecipada (None desativa cada critério)
+    "janela": None,           # Gerações sem melhora relativa > melhora_minima para parar (ex.: 20)
+    "melhora_minima": 1e-5,
+    "limite_s": None,         # Orçamento de tempo da execução (s), incluindo a semente
+    "gap_alvo": 0.0,          # Para quando (melhor - limite inferior) / melhor <= gap_alvo
+    # Modelo de ilhas (ilhas > 1: uma população mu + lambda por processo)
+    "ilhas": 1,
+    "topologia": "anel",      # "anel" ou "aleatoria"
+    "intervalo_migracao": 10, # Gerações entre migrações
+    "migrantes": 5,           # Melhores indivíduos enviados por migração
+    # Checkpoints (população única): arquivo, intervalo em gerações, retomada
+    "checkpoint": None,
+    "intervalo_checkpoint": 10,
+    "resume": False,
+    "saida_parcial": None,    # Grava a melhor alocação a cada checkpoint (formato de alocacao_final.txt, outro arquivo)
+}
+
+ENGINES = ("ag", "vetorizado", "fluxo", "regret")
+
+def arc_cost(dist):
+    """Custo por aluno de um arco aluno -> sala (mesmas parcelas do evaluate)."""
+    excesso = np.maximum(0.0, dist - DISTANCE_TARGET_KM)
+    return dist + excesso ** 2 * PENALTY_DISTANCE_MULTIPLIER
+
+def finish_individual(problem, solucao):
+    """Cria o Individual de uma solução e avalia seu fitness."""
+    best = creator.Individual(solucao)
+    best.fitness.values = problem.evaluator.evaluate(best)
+    return best
+
+def run_min_cost_flow(problem, params):
+    """Resolve cada grupo (etapa, horario) de forma exata por fluxo de custo mínimo."""
+    start_time = time.time()
+    print(f"\n🚀 Iniciando motor de fluxo de custo mínimo (exato)...")
+
+    alunos, escolas, salas, salas_por_etapa_horario = problem.records()
+    solucao_total = [UNASSIGNED_ID] * problem.n_alunos
+    for grupo, indices in problem.groups().items():
+        solucao, info = solve_group(
+            [alunos[i] for i in indices], salas_por_etapa_horario.get(grupo, []),
+            salas, escolas, arc_cost,
+            PENALTY_UNASSIGNED_SPECIAL, PENALTY_UNASSIGNED_NORMAL, unassigned_id=UNASSIGNED_ID,
+            metrica=problem.metrica)
+        for i, id_sala in zip(indices, solucao):
+            solucao_total[i] = id_sala
+        if info["custo"] is not None and params["verbose"]:
+            print(f"  Etapa {grupo[0]}, Horário {grupo[1]}: {len(indices)} alunos "
+                  f"({info['unidades']} unidades, {info['arcos']} arcos, "
+                  f"{info['rodadas']} rodada(s)) -> custo "
+                  f"{'ótimo' if info['otimo'] else 'sem prova de otimalidade'} {info['custo']:.2f}")
+
+    best = finish_individual(problem, solucao_total)
 
-        sala = SALAS[id_sala]
+    elapsed = time.time() - start_time
+    print(f"\n✓ Fluxo de custo mínimo concluído em {elapsed:.2f}s")
+    return best
 
-        # Validação etapa/horário
-        if sala['etapa'] != aluno['etapa'] or sala['horario'] != aluno['horario']:
-            mismatch_count += 1
-            continue
+def run_regret(problem, params):
+    """Modo rápido: heurística construtiva por arrependimento, sem AG."""
+    start_time = time.time()
+    print(f"\n🚀 Iniciando heurística por arrependimento (regret)...")
+
+    # Uma linha por unidade de alunos idênticos; o regret divide cada unidade entre salas
+    m = problem.modelo
+    rep = m.representante
+    custos = problem.custo_candidatas[rep].tolist()
+    opcoes = [list(zip(ids[:n], c[:n])) for ids, c, n in zip(
+        problem.candidatas[rep].tolist(), custos, m.n_opcoes[rep].tolist())]
+
+    special = m.alunos["especial"][rep].tolist()
+    divisoes = regret_split(
+        opcoes, special, m.contagem.tolist(), problem.vagas,
+        custo_nao_alocado=[PENALTY_UNASSIGNED_SPECIAL if sp else PENALTY_UNASSIGNED_NORMAL
+                           for sp in special])
+    best = finish_individual(problem, expand_splits(m.unidade, divisoes, UNASSIGNED_ID).tolist())
 
-        escola_id = sala["escola_id"]
-        if escola_id not in ESCOLAS:
-            mismatch_count += 1
-            continue
+    elapsed = time.time() - start_time
+    print(f"✓ Heurística concluída em {elapsed:.2f}s")
+    return best
 
-        # Distância (usa cache do haversine)
-        escola = ESCOLAS[escola_id]
-        dist = haversine(aluno["lat"], aluno["lon"], escola["lat"], escola["lon"])
-        total_distance += dist
-
-        if dist > DISTANCE_TARGET_KM:
-            penalty_long_distance += ((dist - DISTANCE_TARGET_KM)**2) * PENALTY_DISTANCE_MULTIPLIER
-
-    final_score = (
-        mismatch_count * PENALTY_MISMATCH +
-        unassigned_special * PENALTY_UNASSIGNED_SPECIAL +
-        unassigned_normal * PENALTY_UNASSIGNED_NORMAL +
-        overcapacity_penalty +
-        penalty_long_distance +
-        total_distance
-    )
-
-    result = (final_score,)
-    _fitness_cache[ind_tuple] = result
-    return result
-
-def custom_mutate(individual, indpb):
-    """Mutação inteligente: favorece trocas que reduzem superlotação."""
-    sala_counts = Counter(individual)
-
-    for i in range(len(individual)):
-        if random.random() < indpb:
-            salas_proximas = ALUNO_SALA_MAP[i]
-
-            if not salas_proximas or len(salas_proximas) == 1:
-                continue
-
-            sala_atual = individual[i]
-            opcoes = salas_proximas[:N_CLOSEST_OPTIONS]
-
-            # Se a sala atual está superlotada, força mudança
-            if sala_atual in SALAS:
-                vagas_atual = SALAS[sala_atual]["vagas"]
-                if sala_counts[sala_atual] > vagas_atual:
-                    # Escolhe sala com mais espaço
-                    opcoes_espaco = [(s, SALAS[s]["vagas"] - sala_counts[s])
-                                     for s in opcoes if s in SALAS]
-                    opcoes_espaco.sort(key=lambda x: x[1], reverse=True)
-                    if opcoes_espaco and opcoes_espaco[0][1] > 0:
-                        individual[i] = opcoes_espaco[0][0]
-                        continue
+def run_ga(problem, params):
+    """Executa o AG (mu + lambda) e retorna o melhor indivíduo (ou None)."""
+    start_time = time.time()
+    mu, lambda_, ngen = params["mu"], params["lambda_"], params["ngen"]
+    cxpb, mutpb = params["cxpb"], params["mutpb"]
 
-            # Mutação normal
-            nova_sala = random.choice(opcoes)
-            if nova_sala != sala_atual:
-                individual[i] = nova_sala
+    print(f"\n🚀 Iniciando Algoritmo Genético:")
+    print(f"  População: {mu} | Filhos: {lambda_} | Gerações: {ngen}")
+    print(f"  Crossover: {cxpb} | Mutação: {mutpb} | "
+          f"Reparo de capacidade: {'sim' if params['reparo'] else 'não'}\n")
+
+    parada = EarlyStopping(params["janela"], params["melhora_minima"], params["limite_s"],
+                           limite_inferior=problem.lower_bound(), gap_alvo=params["gap_alvo"])
+    cache = FitnessCache(maxsize=FITNESS_CACHE_SIZE)
+    evaluator = problem.evaluator
+    avaliacoes_antes = (evaluator.delta_evaluations, evaluator.full_evaluations)
+
+    paralelo = None
+    inner_map = map
+    if params["workers"] > 1:
+        print(f"  Avaliação paralela: {params['workers']} processos\n")
+        paralelo = ParallelEvaluator(params["workers"], initargs=problem.worker_initargs())
+        inner_map = paralelo.map
+    toolbox = build_toolbox(problem, cache, inner_map, params["reparo"], params["cache_semente"])
+
+    telemetria = problem.telemetria
+    stats = GenerationStats(telemetria, problem.violations, lambda: cache.misses, cache)
+    logbook = tools.Logbook()
+    retomado = None
+    if params["checkpoint"] and params["resume"]:
+        if os.path.exists(params["checkpoint"]):
+            retomado = load_checkpoint(params["checkpoint"], problem.signature())
+        else:
+            print(f"  Nenhum checkpoint em {params['checkpoint']}; iniciando do zero.\n")
 
-    return individual,
+    checkpointer = None
+    if params["checkpoint"]:
+        ao_salvar = None
+        if params["saida_parcial"]:
+            ao_salvar = lambda melhor: write_allocation(problem, melhor, params["saida_parcial"])
+        checkpointer = Checkpointer(params["checkpoint"], params["intervalo_checkpoint"],
+                                    problem.signature(), logbook, parada, ao_salvar, telemetria,
+                                    geracao_inicial=retomado and retomado["geracao"])
 
-toolbox.register("evaluate", evaluate)
-toolbox.register("mate", tools.cxUniform, indpb=0.5)
-toolbox.register("mutate", custom_mutate, indpb=0.03)
-toolbox.register("select", tools.selTournament, tournsize=3)
+    try:
+        hof = tools.HallOfFame(1)
+
+        if retomado is not None:
+            # Continua da última geração gravada, com os mesmos geradores aleatórios
+            pop, melhores = restore_individuals(retomado, creator.Individual)
+            hof.update(melhores)
+            restore_rng(retomado)
+            logbook = checkpointer.logbook = retomado["logbook"]
+            if retomado["parada"] is not None:
+                parada.historico = retomado["parada"]["historico"]
+                parada.melhor = retomado["parada"]["melhor"]
+            stats.geracao = retomado["geracao"] + 1
+            fitnesses = [ind.fitness.values for ind in pop]
+            print(f"↻ Retomando do checkpoint {params['checkpoint']} "
+                  f"(geração {retomado['geracao']})")
+        else:
+            # Gera e avalia a população inicial
+            with telemetria.fase("semente", populacao=mu):
+                pop = toolbox.population(n=mu)
+                print("Avaliando população inicial...")
+                fitnesses = list(toolbox.map(toolbox.evaluate, pop))
+                for ind, fit in zip(pop, fitnesses):
+                    ind.fitness.values = fit
+
+        print(f"Fitness inicial: Melhor={min(fitnesses)[0]:.2f}, Média={np.mean([f[0] for f in fitnesses]):.2f}\n")
+
+        # Evolução
+        with telemetria.fase("evolucao", geracoes=ngen):
+            ea_mu_plus_lambda(
+                pop, toolbox,
+                mu=mu,
+                lambda_=lambda_,
+                cxpb=cxpb,
+                mutpb=mutpb,
+                ngen=ngen,
+                parada=parada,
+                stats=stats,
+                halloffame=hof,
+                verbose=params["verbose"],
+                callback=checkpointer,
+                geracao_inicial=retomado["geracao"] if retomado else 0,
+                logbook=logbook
+            )
+        if checkpointer is not None:
+            checkpointer.flush()
+    finally:
+        if paralelo is not None:
+            paralelo.close()
 
-# --- 5. Execução Otimizada ---
+    elapsed = time.time() - start_time
+    print(f"\n✓ Evolução concluída em {elapsed:.2f}s ({elapsed/60:.1f} min)")
+    print(f"  {parada.describe()}")
+    telemetria.emit("parada", motivo=parada.motivo, geracoes=len(parada.historico) - 1,
+                    gap=parada.gap(), limite_inferior=parada.limite_inferior)
+    print(f"  Cache de fitness: {cache.stats()}")
+    print(f"  Avaliações: {evaluator.delta_evaluations - avaliacoes_antes[0]} incrementais, "
+          f"{evaluator.full_evaluations - avaliacoes_antes[1]} completas"
+          + (f", {paralelo.avaliacoes} completas nos workers" if paralelo is not None else ""))
 
-def main():
-    start_time = time.time()
+    if not hof:
+        print("✗ ERRO: Nenhuma solução encontrada.")
+        return None
+    return hof[0]
 
-    # PARÂMETROS OTIMIZADOS para dataset grande
-    MU = 200         # População reduzida (qualidade inicial já é boa)
-    LAMBDA = 300     # Mais filhos para exploração
-    NGEN = 200       # Gerações suficientes
-    CXPB = 0.7       # Crossover alto
-    MUTPB = 0.3      # Mutação moderada
+def run_vectorized_ga(problem, params):
+    """
+    AG (mu + lambda) com a população em um array NumPy (ver ag_vetorizado).
+    Mesmos parâmetros e critério de parada de run_ga.
+    """
+    start_time = time.time()
+    mu, lambda_, ngen = params["mu"], params["lambda_"], params["ngen"]
+
+    unidades = params["unidades"]
+    print(f"\n🚀 Iniciando Algoritmo Genético vetorizado (NumPy):")
+    print(f"  População: {mu} | Filhos: {lambda_} | Gerações: {ngen}")
+    print(f"  Crossover: {params['cxpb']} | Mutação: {params['mutpb']} | "
+          f"Reparo de capacidade: {'sim' if params['reparo'] else 'não'}")
+    print(f"  Cromossomo: {problem.modelo.n_unidades if unidades else problem.n_alunos} genes "
+          f"({'um por unidade de alunos idênticos' if unidades else 'um por aluno'})\n")
+    if params["checkpoint"] or params["resume"]:
+        print(f"  ⚠ O AG vetorizado não grava nem retoma checkpoints; "
+              f"--checkpoint/--resume ignorados.\n")
+
+    parada = EarlyStopping(params["janela"], params["melhora_minima"], params["limite_s"],
+                           limite_inferior=problem.lower_bound(), gap_alvo=params["gap_alvo"])
+    rng = np.random.default_rng(params["seed"])
+    telemetria = problem.telemetria
+    lote = problem.batch(unidades)
+    expandir = problem.expand_units if unidades else (lambda linha: linha)
+
+    with telemetria.fase("semente", populacao=mu):
+        genes = seed_genes(problem, mu, params["cache_semente"], unidades)
+
+    with telemetria.fase("evolucao", geracoes=ngen):
+        genes, fitness, melhor, _ = ea_mu_plus_lambda_batch(
+            lote, genes, mu, lambda_, params["cxpb"], params["mutpb"], ngen, rng,
+            reparo=params["reparo"], parada=parada, telemetria=telemetria,
+            violations=lambda linha: problem.violations(problem.room_ids(expandir(linha))),
+            verbose=params["verbose"])
 
-    print(f"\n🚀 Iniciando Algoritmo Genético:")
-    print(f"  População: {MU} | Filhos: {LAMBDA} | Gerações: {NGEN}")
-    print(f"  Crossover: {CXPB} | Mutação: {MUTPB}\n")
+    elapsed = time.time() - start_time
+    print(f"\n✓ Evolução concluída em {elapsed:.2f}s ({elapsed/60:.1f} min)")
+    print(f"  {parada.describe()}")
+    print(f"  Avaliações: {lote.avaliacoes} (em lote)")
+    telemetria.emit("parada", motivo=parada.motivo, geracoes=len(parada.historico) - 1,
+                    gap=parada.gap(), limite_inferior=parada.limite_inferior)
+    return finish_individual(problem, problem.room_ids(expandir(melhor)).tolist())
 
-    pop = toolbox.population(n=MU)
+def run_island(indice, migracao, problem, params, semente, prazo):
+    """
+    Uma ilha do modelo de ilhas (no seu próprio processo): AG (mu + lambda)
+    com migração a cada geração via `migracao`. Retorna (hall da fama
+    codificado, resumo da parada, migrantes enviados, migrantes recebidos).
+    """
+    random.seed(semente + indice)
+    telemetria = problem.telemetria.with_context(ilha=indice)
+    parada = EarlyStopping(params["janela"], params["melhora_minima"], prazo=prazo,
+                           limite_inferior=problem.lower_bound(), gap_alvo=params["gap_alvo"])
+    cache = FitnessCache(maxsize=FITNESS_CACHE_SIZE)
+    toolbox = build_toolbox(problem, cache, reparo=params["reparo"],
+                            pasta_cache=params["cache_semente"])
+    stats = GenerationStats(telemetria, problem.violations, lambda: cache.misses, cache)
     hof = tools.HallOfFame(1)
 
-    stats = tools.Statistics(lambda ind: ind.fitness.values)
-    stats.register("avg", lambda x: np.mean([fit[0] for fit in x]))
-    stats.register("min", lambda x: np.min([fit[0] for fit in x]))
-
-    # Avalia população inicial
-    print("Avaliando população inicial...")
-    fitnesses = list(map(toolbox.evaluate, pop))
-    for ind, fit in zip(pop, fitnesses):
-        ind.fitness.values = fit
-
-    print(f"Fitness inicial: Melhor={min(fitnesses)[0]:.2f}, Média={np.mean([f[0] for f in fitnesses]):.2f}\n")
-
-    # Evolução
-    algorithms.eaMuPlusLambda(
-        pop, toolbox,
-        mu=MU,
-        lambda_=LAMBDA,
-        cxpb=CXPB,
-        mutpb=MUTPB,
-        ngen=NGEN,
-        stats=stats,
-        halloffame=hof,
-        verbose=True
-    )
+    with telemetria.fase("semente", populacao=params["mu"]):
+        pop = toolbox.population(n=params["mu"])
+    with telemetria.fase("evolucao", geracoes=params["ngen"]):
+        ea_mu_plus_lambda(pop, toolbox, mu=params["mu"], lambda_=params["lambda_"],
+                          cxpb=params["cxpb"], mutpb=params["mutpb"], ngen=params["ngen"],
+                          parada=parada, stats=stats, halloffame=hof, verbose=False,
+                          callback=migracao)
+
+    if parada.motivo == "gap":
+        migracao.finish()
+    elif parada.motivo is None and migracao.fim.is_set():
+        parada.motivo = "outra_ilha"
+    telemetria.emit("parada", motivo=parada.motivo, geracoes=len(parada.historico) - 1,
+                    gap=parada.gap(), limite_inferior=parada.limite_inferior,
+                    migrantes_enviados=migracao.enviados, migrantes_recebidos=migracao.recebidos)
+    return encode_individuals(hof), parada.describe(), migracao.enviados, migracao.recebidos
+
+def run_islands_ga(problem, params):
+    """Modelo de ilhas: uma população por processo, com migração periódica."""
+    start_time = time.time()
+    n_ilhas = params["ilhas"]
+
+    print(f"\n🚀 Iniciando modelo de ilhas: {n_ilhas} ilhas ({params['topologia']}), "
+          f"{params['migrantes']} migrantes a cada {params['intervalo_migracao']} gerações")
+    print(f"  População por ilha: {params['mu']} | Filhos: {params['lambda_']} | "
+          f"Gerações: {params['ngen']}")
+    if params["workers"] > 1:
+        print(f"  (avaliação serial dentro de cada ilha; --workers ignorado)")
+    if params["checkpoint"] or params["resume"]:
+        print(f"  ⚠ O modelo de ilhas não grava nem retoma checkpoints; "
+              f"--checkpoint/--resume ignorados.")
+
+    # Sementes distintas por ilha (os processos herdam o estado do gerador)
+    semente = params["seed"] if params["seed"] is not None else random.randrange(2**32)
+    prazo = None if params["limite_s"] is None else time.time() + params["limite_s"]
+    resultados = run_islands(n_ilhas, run_island, (problem, params, semente, prazo),
+                             params["topologia"], params["intervalo_migracao"],
+                             params["migrantes"])
+
+    # Hall da fama global
+    hof = tools.HallOfFame(n_ilhas)
+    for indice, (pacotes, resumo, enviados, recebidos) in enumerate(resultados):
+        melhores = decode_individuals(pacotes, creator.Individual)
+        hof.update(melhores)
+        print(f"  [Ilha {indice}] Fitness: {melhores[0].fitness.values[0]:.2f} ({resumo}; "
+              f"migrantes: {enviados} enviados, {recebidos} recebidos)")
 
     elapsed = time.time() - start_time
-    print(f"\n✓ Evolução concluída em {elapsed:.2f}s ({elapsed/60:.1f} min)")
-    print(f"  Cache de fitness: {len(_fitness_cache)} entradas")
+    print(f"\n✓ Modelo de ilhas concluído em {elapsed:.2f}s ({elapsed/60:.1f} min)")
+    return hof[0]
 
-    # --- 6. Análise e Saída ---
+def solve(problem, engine="ag", params=None):
+    """
+    Resolve `problem` com o motor escolhido ("ag", "vetorizado", "fluxo" ou
+    "regret").
 
-    if not hof:
-        print("✗ ERRO: Nenhuma solução encontrada.")
+    `params` sobrescreve DEFAULT_PARAMS. Retorna o melhor Individual (com
+    fitness avaliado) ou None. Pode ser chamado várias vezes sobre o mesmo
+    Problem.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconhecido: {engine!r} (opções: {', '.join(ENGINES)})")
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    if params["seed"] is not None:
+        random.seed(params["seed"])
+
+    if engine == "ag":
+        best = run_islands_ga(problem, params) if params["ilhas"] > 1 else run_ga(problem, params)
+    elif engine == "vetorizado":
+        best = run_vectorized_ga(problem, params)
+    else:
+        motor = run_min_cost_flow if engine == "fluxo" else run_regret
+        with problem.telemetria.fase("resolucao", motor=engine):
+            best = motor(problem, params)
+    emit_result(problem, engine, best)
+    return best
+
+def emit_result(problem, engine, best):
+    """Registro de telemetria com o fitness, o gap e as violações da solução final."""
+    if best is None:
+        return
+    fitness = best.fitness.values[0]
+    gap = max(0.0, fitness - problem.lower_bound()) / max(abs(fitness), 1e-12)
+    print(f"  Gap até o limite inferior ({problem.lower_bound():.2f}): {gap * 100:.3f}%")
+    if problem.telemetria.ativa:
+        problem.telemetria.emit("resultado", motor=engine, fitness=fitness, gap=gap,
+                                violacoes=problem.violations(best))
+
+def solve_incremental(problem, anterior, salas_anteriores=None):
+    """
+    Realocação incremental a partir de uma alocação anterior (arquivo no
+    formato de alocacao_final.txt). As alocações não afetadas pelas mudanças
+    nas entradas são mantidas; os alunos livres são re-otimizados de forma
+    exata (fluxo de custo mínimo) sobre a capacidade residual das salas.
+    `salas_anteriores` (salas.txt da execução anterior) faz os aumentos de
+    capacidade e as salas novas abrirem vagas na vizinhança.
+    """
+    start_time = time.time()
+    print(f"\n🚀 Realocação incremental a partir de {anterior}...")
+
+    def custo(i, id_sala):
+        dist = problem.distance(i, id_sala)
+        return float("inf") if dist is None else float(arc_cost(dist))
+
+    with problem.telemetria.fase("resolucao", motor="incremental"):
+        alocacao_anterior = load_previous_allocation(anterior, UNASSIGNED_ID)
+        vagas_anteriores = None
+        if salas_anteriores:
+            tabela = last_by_id(load_salas_array(salas_anteriores)[0])
+            vagas_anteriores = dict(zip(tabela["id"].tolist(), tabela["vagas"].tolist()))
+        alunos, escolas, salas, salas_por_etapa_horario = problem.records()
+        opcoes = [ids[:n] for ids, n in zip(problem.candidatas.tolist(), problem.n_opcoes)]
+        solucao, livres, info = plan_reallocation(
+            alocacao_anterior, alunos, salas, opcoes, custo, UNASSIGNED_ID, vagas_anteriores)
+        print(f"  Mantidos: {info['mantidos']} | Novos: {info['novos']} | "
+              f"Mudaram de etapa/horário: {info['mudaram']} | Desistentes: {info['desistentes']}")
+        print(f"  Sala inválida: {info['sala_invalida']} | Sem sala antes: {info['nao_alocados']} | "
+              f"Excedentes: {info['excedentes']} | Vizinhança: {info['vizinhanca']}")
+
+        vagas = residual_capacity(salas, solucao, UNASSIGNED_ID)
+        salas_residuais = {s: {**d, "vagas": vagas[s]} for s, d in salas.items()}
+
+        livres_por_grupo = defaultdict(list)
+        for i in livres:
+            aluno = alunos[i]
+            livres_por_grupo[(aluno["etapa"], aluno["horario"])].append(i)
+
+        for grupo, indices in sorted(livres_por_grupo.items()):
+            sub, _ = solve_group(
+                [alunos[i] for i in indices], salas_por_etapa_horario.get(grupo, []),
+                salas_residuais, escolas, arc_cost,
+                PENALTY_UNASSIGNED_SPECIAL, PENALTY_UNASSIGNED_NORMAL, unassigned_id=UNASSIGNED_ID,
+                metrica=problem.metrica)
+            for i, id_sala in zip(indices, sub):
+                solucao[i] = id_sala
+
+        best = finish_individual(problem, solucao)
+    emit_result(problem, "incremental", best)
+    inalterados = sum(1 for aluno, id_sala in zip(alunos, solucao)
+                      if alocacao_anterior.get(aluno["id"], (None,))[0] == id_sala)
+
+    elapsed = time.time() - start_time
+    print(f"✓ Realocação incremental concluída em {elapsed:.2f}s "
+          f"({len(livres)} alunos re-otimizados, {inalterados} de {problem.n_alunos} "
+          f"na mesma sala: {inalterados / max(1, problem.n_alunos) * 100:.1f}%)")
+    return best
+
+# --- 5. Análise e Saída ---
+
+def write_results(problem, best, output_file="alocacao_final.txt", binario=None):
+    """
+    Imprime as estatísticas da solução e grava `output_file` (CSV ';').
+    Com `binario`, grava também as colunas em formato .npz.
+    """
+    with problem.telemetria.fase("escrita", arquivo=output_file):
+        col = problem.columns(best)
+        resumo = summarize(col, problem.tabela_salas, DISTANCE_TARGET_KM)
+
+        print(f"\n{'='*60}")
+        print(f"MELHOR SOLUÇÃO ENCONTRADA")
+        print(f"{'='*60}")
+        print(f"Fitness total: {best.fitness.values[0]:.2f}\n")
+
+        print(f"📋 Restrições Hard:")
+        print(f"  ❌ Etapa/Horário incorretos: {resumo['mismatch']}")
+        print(f"  🔴 Alunos especiais não alocados: {resumo['unassigned_special']}")
+        print(f"  🟡 Alunos normais não alocados: {resumo['unassigned_normal']}")
+        print(f"  📦 Vagas excedidas: {resumo['overcapacity']}")
+
+        if col["com_escola"].any():
+            print(f"\n📏 Distâncias:")
+            print(f"  Total: {resumo['distancia_total_km']:.2f} km")
+            print(f"  Média: {resumo['distancia_media_km']:.3f} km")
+            print(f"  Mediana: {resumo['distancia_mediana_km']:.3f} km")
+            print(f"  Máxima: {resumo['distancia_maxima_km']:.3f} km")
+            print(f"  Acima de {DISTANCE_TARGET_KM}km: {resumo['long_distance']} alunos")
+
+        write_allocation(problem, best, output_file, col)
+        if binario:
+            write_columnar(binario, col)
+
+        print(f"\n✓ Arquivo salvo: {output_file}")
+        if binario:
+            print(f"✓ Colunas salvas: {binario}")
+        print(f"{'='*60}\n")
+
+def write_allocation(problem, best, output_file="alocacao_final.txt", col=None):
+    """Grava a alocação `best` em `output_file` (CSV ';', gravação atômica)."""
+    if col is None:
+        col = problem.columns(best)
+    nao_alocado = ~col["alocado"]
+    write_csv(output_file, [
+        ("id_aluno", col["id_aluno"], "", []),
+        ("necessidade_especial", col["necessidade_especial"], "", []),
+        ("id_escola", col["id_escola"], "", [(nao_alocado, "NAO_ALOCADO")]),
+        ("id_sala", col["id_sala"], "", [(nao_alocado, "NAO_ALOCADO")]),
+        ("etapa_desejada", col["etapa_desejada"], "", []),
+        ("etapa_sala", col["etapa_sala"], "",
+         [(col["etapa_sala"] != col["etapa_desejada"], "ERRO:{}"), (nao_alocado, "N/A")]),
+        ("horario_desejado", col["horario_desejado"], "", []),
+        ("horario_sala", col["horario_sala"], "",
+         [(col["horario_sala"] != col["horario_desejado"], "ERRO:{}"), (nao_alocado, "N/A")]),
+        ("distancia_km", col["distancia_km"], ".3f", [(nao_alocado, "N/A")]),
+    ])
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Alocação de alunos com AG (mu + lambda).")
+    parser.add_argument("--engine", choices=ENGINES, default="ag",
+                        help="Motor de alocação: AG (padrão), AG vetorizado (população em "
+                             "array NumPy), fluxo de custo mínimo exato ou heurística rápida "
+                             "por arrependimento.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PARAMS["workers"],
+                        help="Processos para avaliação paralela (padrão: 1, serial).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semente do gerador aleatório.")
+    parser.add_argument("--cache-semente", action="store_true",
+                        help="Guarda a semente gulosa da população inicial em Models/ "
+                             "(reaproveitada enquanto as entradas não mudarem).")
+    parser.add_argument("--unidades", action="store_true",
+                        help="AG vetorizado: um gene por unidade de alunos idênticos (mesmas "
+                             "coordenadas, etapa, horário e necessidade especial), alocada "
+                             "inteira em uma sala.")
+    parser.add_argument("--sem-reparo", action="store_true",
+                        help="Desativa o reparo de capacidade dos filhos do AG.")
+    parser.add_argument("--geracoes", type=int, default=DEFAULT_PARAMS["ngen"],
+                        help=f"Máximo de gerações do AG (padrão: {DEFAULT_PARAMS['ngen']}).")
+    parser.add_argument("--janela", type=int, default=DEFAULT_PARAMS["janela"],
+                        help="Para o AG após N gerações sem melhora relativa acima de "
+                             "--melhora-minima (padrão: desativado).")
+    parser.add_argument("--melhora-minima", type=float, default=DEFAULT_PARAMS["melhora_minima"],
+                        help=f"Melhora relativa mínima na janela (padrão: {DEFAULT_PARAMS['melhora_minima']}).")
+    parser.add_argument("--limite-tempo", type=float, default=DEFAULT_PARAMS["limite_s"],
+                        metavar="SEGUNDOS", help="Orçamento de tempo do AG (padrão: sem limite).")
+    parser.add_argument("--gap-alvo", type=float, default=DEFAULT_PARAMS["gap_alvo"],
+                        help="Para o AG quando o gap até o limite inferior (sem capacidade) "
+                             "fica abaixo deste valor (ex.: 0.01 = 1%%; padrão: 0, só no ótimo).")
+    parser.add_argument("--ilhas", type=int, default=DEFAULT_PARAMS["ilhas"],
+                        help="Modelo de ilhas: número de populações, uma por processo "
+                             "(padrão: 1, população única).")
+    parser.add_argument("--topologia", choices=TOPOLOGIAS, default=DEFAULT_PARAMS["topologia"],
+                        help="Destino dos migrantes: próxima ilha do anel ou ilha sorteada.")
+    parser.add_argument("--intervalo-migracao", type=int,
+                        default=DEFAULT_PARAMS["intervalo_migracao"],
+                        help=f"Gerações entre migrações (padrão: {DEFAULT_PARAMS['intervalo_migracao']}).")
+    parser.add_argument("--migrantes", type=int, default=DEFAULT_PARAMS["migrantes"],
+                        help=f"Melhores indivíduos enviados por migração (padrão: {DEFAULT_PARAMS['migrantes']}).")
+    parser.add_argument("--checkpoint", metavar="ARQUIVO", default=None,
+                        help="Grava checkpoints do AG em ARQUIVO (ex.: checkpoint_ag.pkl; padrão: "
+                             "desativado). A cada checkpoint a melhor alocação até o momento vai "
+                             "para alocacao_parcial.txt.")
+    parser.add_argument("--intervalo-checkpoint", type=int,
+                        default=DEFAULT_PARAMS["intervalo_checkpoint"],
+                        help=f"Gerações entre checkpoints (padrão: {DEFAULT_PARAMS['intervalo_checkpoint']}; "
+                             "0 desativa).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma o AG do último checkpoint de --checkpoint (se existir).")
+    parser.add_argument("--telemetria", metavar="ARQUIVO", default=None,
+                        help="Grava telemetria estruturada (JSONL) por fase e por geração.")
+    parser.add_argument("--binario", metavar="ARQUIVO", default=None,
+                        help="Grava também as colunas do resultado em formato binário (.npz).")
+    parser.add_argument("--rede-viaria", metavar="ARQUIVO", default=None,
+                        help="Mede as distâncias pela malha viária deste arquivo (arestas "
+                             "'lat_a lon_a lat_b lon_b km'; ver rede_viaria.py) em vez da "
+                             "linha reta. As buscas por escola ficam em cache em Models/.")
+    parser.add_argument("--anterior", metavar="ARQUIVO", default=None,
+                        help="Realocação incremental: mantém as alocações deste arquivo "
+                             "(formato de alocacao_final.txt) não afetadas pelas mudanças "
+                             "nas entradas e re-otimiza só o restante (ignora --engine).")
+    parser.add_argument("--salas-anteriores", metavar="ARQUIVO", default=None,
+                        help="Com --anterior: salas.txt da execução anterior, para que aumentos "
+                             "de capacidade e salas novas também liberem a vizinhança.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("\n" + "="*60)
+    print("SISTEMA DE ALOCAÇÃO DE ALUNOS - VERSÃO OTIMIZADA")
+    print("="*60 + "\n")
+
+    telemetria = Telemetria(args.telemetria, programa="main2")
+    try:
+        problem = Problem.load("Models", telemetria, args.rede_viaria)
+    except ValueError:
+        print("\n✗ Encerrando devido a erros no carregamento.")
+        return
+    problem.print_viability()
+
+    if args.resume and not args.checkpoint:
+        print("⚠ --resume sem --checkpoint: não há checkpoint a retomar.")
+
+    if args.anterior:
+        best = solve_incremental(problem, args.anterior, args.salas_anteriores)
+    else:
+        best = solve(problem, args.engine, {
+            "workers": args.workers, "seed": args.seed, "ngen": args.geracoes,
+            "reparo": not args.sem_reparo, "unidades": args.unidades,
+            "cache_semente": "Models" if args.cache_semente else None,
+            "janela": args.janela or None, "melhora_minima": args.melhora_minima,
+            "limite_s": args.limite_tempo, "gap_alvo": args.gap_alvo,
+            "ilhas": args.ilhas, "topologia": args.topologia,
+            "intervalo_migracao": args.intervalo_migracao, "migrantes": args.migrantes,
+            "checkpoint": args.checkpoint if args.intervalo_checkpoint > 0 else None,
+            "intervalo_checkpoint": args.intervalo_checkpoint, "resume": args.resume,
+            "saida_parcial": "alocacao_parcial.txt"})
+    if best is None:
         return
 
-    best = hof[0]
-    print(f"\n{'='*60}")
-    print(f"MELHOR SOLUÇÃO ENCONTRADA")
-    print(f"{'='*60}")
-    print(f"Fitness total: {best.fitness.values[0]:.2f}\n")
-
-    # Estatísticas detalhadas
-    sala_counts = Counter(best)
-    unassigned_special = sum(1 for i, a in enumerate(ALUNOS) if a['special'] == 1 and best[i] == UNASSIGNED_ID)
-    unassigned_normal = sum(1 for i, a in enumerate(ALUNOS) if a['special'] == 0 and best[i] == UNASSIGNED_ID)
-
-    overcapacity = sum(max(0, count - SALAS[id_s]["vagas"])
-                       for id_s, count in sala_counts.items()
-                       if id_s != UNASSIGNED_ID and id_s in SALAS)
-
-    mismatch = sum(1 for i in range(N_ALUNOS)
-                   if best[i] != UNASSIGNED_ID and best[i] in SALAS
-                   and (SALAS[best[i]]['etapa'] != ALUNOS[i]['etapa'] or
-                        SALAS[best[i]]['horario'] != ALUNOS[i]['horario']))
-
-    distancias = []
-    for i in range(N_ALUNOS):
-        if best[i] != UNASSIGNED_ID and best[i] in SALAS:
-            sala = SALAS[best[i]]
-            if sala["escola_id"] in ESCOLAS:
-                escola = ESCOLAS[sala["escola_id"]]
-                dist = haversine(ALUNOS[i]["lat"], ALUNOS[i]["lon"],
-                                escola["lat"], escola["lon"])
-                distancias.append(dist)
-
-    print(f"📋 Restrições Hard:")
-    print(f"  ❌ Etapa/Horário incorretos: {mismatch}")
-    print(f"  🔴 Alunos especiais não alocados: {unassigned_special}")
-    print(f"  🟡 Alunos normais não alocados: {unassigned_normal}")
-    print(f"  📦 Vagas excedidas: {overcapacity}")
-
-    if distancias:
-        print(f"\n📏 Distâncias:")
-        print(f"  Total: {sum(distancias):.2f} km")
-        print(f"  Média: {np.mean(distancias):.3f} km")
-        print(f"  Mediana: {np.median(distancias):.3f} km")
-        print(f"  Máxima: {max(distancias):.3f} km")
-        print(f"  Acima de {DISTANCE_TARGET_KM}km: {sum(1 for d in distancias if d > DISTANCE_TARGET_KM)} alunos")
-
-    # Gera arquivo de saída
-    output_file = "alocacao_final.txt"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("id_aluno;necessidade_especial;id_escola;id_sala;etapa_desejada;etapa_sala;horario_desejado;horario_sala;distancia_km\n")
-        for i in range(N_ALUNOS):
-            aluno = ALUNOS[i]
-            id_sala = best[i]
-
-            if id_sala == UNASSIGNED_ID or id_sala not in SALAS:
-                f.write(f"{aluno['id']};{aluno['special']};NAO_ALOCADO;NAO_ALOCADO;{aluno['etapa']};N/A;{aluno['horario']};N/A;N/A\n")
-            else:
-                sala = SALAS[id_sala]
-                id_escola = sala["escola_id"]
-
-                if id_escola in ESCOLAS:
-                    dist = haversine(aluno["lat"], aluno["lon"],
-                                    ESCOLAS[id_escola]["lat"], ESCOLAS[id_escola]["lon"])
-                else:
-                    dist = -1
-
-                etapa_str = f"ERRO:{sala['etapa']}" if sala['etapa'] != aluno['etapa'] else sala['etapa']
-                horario_str = f"ERRO:{sala['horario']}" if sala['horario'] != aluno['horario'] else sala['horario']
-
-                f.write(f"{aluno['id']};{aluno['special']};{id_escola};{id_sala};{aluno['etapa']};{etapa_str};{aluno['horario']};{horario_str};{dist:.3f}\n")
-
-    print(f"\n✓ Arquivo salvo: {output_file}")
-    print(f"{'='*60}\n")
+    write_results(problem, best, binario=args.binario)
+    problem.telemetria.close()
 
 if __name__ == "__main__":
     main()
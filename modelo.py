@@ -0,0 +1,211 @@
+"""
+Modelo de dados compacto (struct-of-arrays) para os motores de alocação.
+
+Em vez de uma lista de dicts por aluno e dicts de dicts por sala/escola
+(indexados por ids esparsos), cada entidade é um dicionário de colunas NumPy
+tipadas, com índices densos:
+
+- escolas: ordenadas por id (posição = coluna da matriz de distâncias);
+- salas: ordenadas por id, com a escola já remapeada para a posição densa
+  (`escola`, -1 se a escola não existe), `vagas` e o código do grupo;
+- alunos: na ordem do arquivo, com o código do grupo (etapa, horario).
+
+As candidatas de cada aluno (as K salas válidas mais próximas, em ordem de
+distância) ficam em uma única matriz int32 alunos × K de índices densos de
+sala (-1 completa as linhas curtas), com as distâncias em uma matriz float32
+paralela. Para avaliar salas fora do top-K, as distâncias ficam em um bloco
+float32 unidades × escolas por grupo (etapa, horario), só com as escolas
+que têm salas do grupo, concatenados em um único array (`dist_blocos`):
+uma matriz global aluno × escola teria quase todas as células fora do
+grupo do aluno.
+
+Distâncias e candidatas são calculadas uma vez por unidade de alunos
+idênticos (lat, lon, etapa, horario, special; ver unidades.py) e expandidas
+por aluno; `unidade`, `representante` e `contagem` descrevem as unidades.
+As distâncias vêm da métrica dada (padrão: Haversine; ver distancias.py).
+
+Ids repetidos em salas/escolas seguem a regra dos loaders antigos (dicts):
+vale a última linha.
+"""
+import numpy as np
+
+from distancias import HAVERSINE
+from indice_espacial import SchoolIndex
+from unidades import aggregate
+
+
+def last_by_id(tabela):
+    """Tabela ordenada por id, mantendo a última ocorrência de ids repetidos."""
+    ids = tabela["id"][::-1]
+    _, ultimas = np.unique(ids, return_index=True)
+    return tabela[len(tabela) - 1 - ultimas]
+
+
+def _columns(tabela):
+    return {nome: np.ascontiguousarray(tabela[nome]) for nome in tabela.dtype.names}
+
+
+def group_codes(etapa, horario):
+    """Código inteiro de (etapa, horario)."""
+    return (np.asarray(etapa, dtype=np.int64) << 16) + np.asarray(horario, dtype=np.int64)
+
+
+class CompactModel:
+    """
+    Colunas de alunos, salas e escolas (ver o docstring do módulo) e as
+    estruturas derivadas: candidatas top-K e blocos de distâncias por grupo.
+
+    `alunos`, `escolas` e `salas` são arrays estruturados nos dtypes de
+    carregamento.py; `k` é o número de candidatas por aluno e `metrica` a
+    métrica das distâncias.
+    """
+
+    def __init__(self, alunos, escolas, salas, k, metrica=HAVERSINE):
+        self.k = k
+        self.metrica = metrica
+        self.escolas = _columns(last_by_id(escolas))
+        self.salas = _columns(last_by_id(salas))
+        self.alunos = _columns(alunos)
+        self.alunos["special"] = self.alunos["special"].astype(np.int8)
+
+        # Remapeamento denso: sala -> escola, grupos (etapa, horario)
+        self.escola_pos = {id_e: j for j, id_e in enumerate(self.escolas["id"].tolist())}
+        self.sala_pos = {id_s: j for j, id_s in enumerate(self.salas["id"].tolist())}
+        self.salas["escola"] = self.school_index(self.salas["escola_id"]).astype(np.int32)
+        self.salas["grupo"] = group_codes(self.salas["etapa"], self.salas["horario"])
+        self.alunos["grupo"] = group_codes(self.alunos["etapa"], self.alunos["horario"])
+        self.alunos["especial"] = self.alunos["special"] == 1
+
+        self.n_alunos = len(self.alunos["id"])
+        self.n_salas = len(self.salas["id"])
+        self.n_escolas = len(self.escolas["id"])
+
+        a = self.alunos
+        self.unidade, self.representante, self.contagem = aggregate(
+            a["lat"], a["lon"], a["etapa"], a["horario"], a["special"])
+        self.n_unidades = len(self.contagem)
+
+        self.sem_opcoes = {}
+        candidatas, dist_candidatas = self._build_candidates()
+        self.candidatas = candidatas[self.unidade]
+        self.dist_candidatas = dist_candidatas[self.unidade]
+        self.n_opcoes = (self.candidatas >= 0).sum(axis=1).astype(np.int32)
+
+    def _build_candidates(self):
+        """
+        Candidatas e suas distâncias, por unidade; monta também os blocos de
+        distâncias por grupo (`dist_blocos`, `inicio_unidade`, `grupo_unidade`,
+        `col_escola`, `salas["col_bloco"]`) e a distância mínima de cada
+        unidade (`dist_minima`).
+        """
+        salas = self.salas
+        lat_u = self.alunos["lat"][self.representante]
+        lon_u = self.alunos["lon"][self.representante]
+        grupo_u = self.alunos["grupo"][self.representante]
+        candidatas = np.full((self.n_unidades, self.k), -1, dtype=np.int32)
+        dist_candidatas = np.full((self.n_unidades, self.k), np.inf, dtype=np.float32)
+        validas = salas["escola"] >= 0
+        grupos, inverso = np.unique(grupo_u, return_inverse=True)
+
+        # Bloco g: unidades do grupo × escolas com salas do grupo (ordenadas
+        # por id), alocados de uma vez. A linha extra de col_escola (só -1)
+        # é a das unidades sem salas no grupo.
+        por_grupo = []
+        tamanho = 0
+        for g, codigo in enumerate(grupos.tolist()):
+            indices = np.flatnonzero(inverso == g)
+            salas_g = np.flatnonzero((salas["grupo"] == codigo) & validas)
+            if len(salas_g) == 0:
+                self.sem_opcoes[(codigo >> 16, codigo & 0xFFFF)] = int(
+                    self.contagem[indices].sum())
+                continue
+            escolas_g, sala_col = np.unique(salas["escola"][salas_g], return_inverse=True)
+            por_grupo.append((g, indices, salas_g, escolas_g, sala_col, tamanho))
+            tamanho += len(indices) * len(escolas_g)
+
+        self.dist_blocos = np.empty(tamanho, dtype=np.float32)
+        self.inicio_unidade = np.zeros(self.n_unidades, dtype=np.int64)
+        self.grupo_unidade = np.full(self.n_unidades, len(grupos), dtype=np.int32)
+        self.col_escola = np.full((len(grupos) + 1, self.n_escolas), -1, dtype=np.int32)
+        self.dist_minima = np.full(self.n_unidades, np.inf, dtype=np.float32)
+        salas["col_bloco"] = np.full(self.n_salas, -1, dtype=np.int32)
+
+        for g, indices, salas_g, escolas_g, sala_col, inicio in por_grupo:
+            lat, lon = lat_u[indices], lon_u[indices]
+            dist = self.dist_blocos[inicio:inicio + len(indices) * len(escolas_g)].reshape(
+                len(indices), len(escolas_g))
+            dist[:] = self.metrica.matrix(lat, lon, self.escolas["lat"][escolas_g],
+                                          self.escolas["lon"][escolas_g])
+            self.grupo_unidade[indices] = g
+            self.inicio_unidade[indices] = inicio + np.arange(len(indices)) * len(escolas_g)
+            self.col_escola[g, escolas_g] = np.arange(len(escolas_g))
+            salas["col_bloco"][salas_g] = sala_col
+            self.dist_minima[indices] = dist.min(axis=1)
+
+            # Top-K pelo índice espacial (ou pela própria matriz, fora da linha
+            # reta); as distâncias vêm da matriz, como no avaliador
+            if self.metrica.linha_reta:
+                index = SchoolIndex(self.escolas["lat"][escolas_g],
+                                    self.escolas["lon"][escolas_g])
+                cols, _ = index.nearest(lat, lon, self.k)
+            else:
+                cols = np.argsort(dist, axis=1, kind="stable")[:, :self.k]
+            dists = np.take_along_axis(dist, cols, axis=1)
+            por_escola = np.bincount(sala_col, minlength=len(escolas_g))
+            if por_escola.max() == 1:
+                # Uma sala por escola (o caso comum): K escolas = K salas
+                sala_da_escola = np.empty(len(escolas_g), dtype=np.int64)
+                sala_da_escola[sala_col] = salas_g
+                candidatas[indices, :cols.shape[1]] = sala_da_escola[cols]
+                dist_candidatas[indices, :cols.shape[1]] = dists
+                continue
+
+            salas_da_escola = [[] for _ in range(len(escolas_g))]
+            for s, c in zip(salas_g.tolist(), sala_col.tolist()):
+                salas_da_escola[c].append(s)
+            for u, cs, ds in zip(indices.tolist(), cols.tolist(), dists.tolist()):
+                linha = [(s, d) for c, d in zip(cs, ds) for s in salas_da_escola[c]][:self.k]
+                candidatas[u, :len(linha)] = [s for s, _ in linha]
+                dist_candidatas[u, :len(linha)] = [d for _, d in linha]
+        return candidatas, dist_candidatas
+
+    def distance(self, alunos, escolas):
+        """
+        Distâncias (km, float32) dos alunos às escolas (posições densas, >= 0),
+        pelos blocos por grupo; inf se a escola não tem salas do grupo do aluno.
+        """
+        unidades = self.unidade[alunos]
+        col = self.col_escola[self.grupo_unidade[unidades], escolas]
+        dist = np.full(np.shape(col), np.inf, dtype=np.float32)
+        tem = col >= 0
+        dist[tem] = self.dist_blocos[(self.inicio_unidade[unidades] + col)[tem]]
+        return dist
+
+    def school_index(self, ids):
+        """Ids de escola -> posições densas (-1 se a escola não existe)."""
+        return self._index(self.escolas["id"], ids)
+
+    def room_index(self, ids):
+        """Ids de sala -> índices densos (-1 se a sala não existe)."""
+        return self._index(self.salas["id"], ids)
+
+    def room_ids(self, indices, unassigned_id=-1):
+        """Índices densos de sala -> ids (`unassigned_id` para -1)."""
+        indices = np.asarray(indices)
+        return np.where(indices >= 0, self.salas["id"][np.maximum(indices, 0)], unassigned_id)
+
+    @staticmethod
+    def _index(ids_tabela, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids_tabela) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(ids_tabela, ids), len(ids_tabela) - 1)
+        return np.where(ids_tabela[pos] == ids, pos, -1)
+
+    def nbytes(self):
+        """Memória ocupada pelas colunas e matrizes (bytes)."""
+        total = sum(v.nbytes for t in (self.alunos, self.salas, self.escolas) for v in t.values())
+        total += self.unidade.nbytes + self.representante.nbytes + self.contagem.nbytes
+        total += self.inicio_unidade.nbytes + self.grupo_unidade.nbytes + self.col_escola.nbytes
+        return total + (self.candidatas.nbytes + self.dist_candidatas.nbytes
+                        + self.dist_blocos.nbytes + self.dist_minima.nbytes)
@@ -0,0 +1,32 @@
+"""
+Sorteio esparso das posições mutadas.
+
+Os operadores de mutação testavam `random.random() < indpb` gene a gene: um
+número aleatório por gene, mesmo com indpb de 3%. `sample_positions` sorteia
+direto as posições mutadas, saltando entre elas com intervalos geométricos:
+o número de posições continua Binomial(n, indpb), cada posição entra com
+probabilidade indpb de forma independente e as posições saem em ordem
+crescente, como no laço original, mas com O(posições mutadas) sorteios.
+
+Só o gerador `random` é usado, então sementes e checkpoints (que guardam o
+estado dele) continuam reproduzindo a evolução.
+"""
+import math
+import random
+
+
+def sample_positions(n, indpb, rnd=random):
+    """Posições de 0..n-1 mutadas com probabilidade `indpb` cada, em ordem crescente."""
+    if indpb <= 0.0 or n <= 0:
+        return []
+    if indpb >= 1.0:
+        return list(range(n))
+    log_q = math.log1p(-indpb)
+    posicoes = []
+    pos = -1
+    while True:
+        # Genes pulados até a próxima mutação: Geométrica(indpb)
+        pos += 1 + int(math.log(1.0 - rnd.random()) / log_q)
+        if pos >= n:
+            return posicoes
+        posicoes.append(pos)
@@ -0,0 +1,205 @@
+"""
+Parada antecipada dos AGs por convergência, tempo e gap.
+
+`algorithms.eaSimple` e `algorithms.eaMuPlusLambda` do DEAP rodam sempre
+`ngen` gerações. `ea_simple` e `ea_mu_plus_lambda` repetem esses laços e, ao
+fim de cada geração, consultam um `EarlyStopping`, que encerra a evolução
+quando:
+
+- "gap": o gap até o limite inferior, (melhor - limite) / melhor, ficou
+  abaixo de `gap_alvo` (com gap 0 a solução é ótima);
+- "estagnacao": o melhor fitness melhorou menos que `melhora_minima`
+  (relativa) nas últimas `janela` gerações;
+- "tempo": a próxima geração estouraria `limite_s` segundos desde a criação
+  do critério ou o `prazo` absoluto (time.time()) do orçamento total.
+
+O limite inferior barato é a soma, por aluno, do custo da sala válida mais
+próxima ignorando capacidade (ver `lower_bound`).
+
+Se a toolbox tem `repair`, cada indivíduo sem fitness é reparado uma vez,
+logo antes da avaliação (ver `evaluate_invalid`), e não a cada operador.
+"""
+import time
+
+import numpy as np
+from deap import algorithms, tools
+
+# Tolerância numérica do gap (somas de float em ordens diferentes)
+TOLERANCIA_GAP = 1e-9
+
+
+def lower_bound(custos_minimos, custos_nao_alocado):
+    """
+    Limite inferior do fitness: cada aluno na opção mais barata ignorando
+    capacidade (inf se não há opção), ou não alocado, se isso custar menos.
+    """
+    minimos = np.asarray(custos_minimos, dtype=np.float64)
+    return float(np.minimum(minimos, np.asarray(custos_nao_alocado, dtype=np.float64)).sum())
+
+
+class EarlyStopping:
+    """
+    Critério de parada consultado a cada geração (ver o docstring do módulo).
+    Parâmetros None desativam o critério correspondente. Depois da evolução,
+    `motivo` diz por que ela parou (None = rodou todas as gerações).
+    """
+
+    def __init__(self, janela=None, melhora_minima=0.0, limite_s=None, prazo=None,
+                 limite_inferior=None, gap_alvo=None):
+        self.janela = janela
+        self.melhora_minima = melhora_minima
+        self.limite_s = limite_s
+        self.prazo = prazo
+        self.limite_inferior = limite_inferior
+        self.gap_alvo = gap_alvo
+        self.inicio = time.time()
+        self.historico = []
+        self.melhor = None
+        self.motivo = None
+        self._ultima = None
+
+    def gap(self, melhor=None):
+        """Gap relativo de `melhor` (padrão: o melhor visto) até o limite inferior."""
+        melhor = self.melhor if melhor is None else melhor
+        if self.limite_inferior is None or melhor is None:
+            return None
+        return max(0.0, melhor - self.limite_inferior) / max(abs(melhor), 1e-12)
+
+    def update(self, valor):
+        """Registra o melhor fitness da geração. Retorna o motivo de parada ou None."""
+        agora = time.time()
+        duracao = 0.0 if self._ultima is None else agora - self._ultima
+        self._ultima = agora
+        self.melhor = valor if self.melhor is None else min(self.melhor, valor)
+        self.historico.append(self.melhor)
+        self.motivo = self._reason(agora, duracao)
+        return self.motivo
+
+    def _reason(self, agora, duracao):
+        gap = self.gap()
+        if self.gap_alvo is not None and gap is not None and gap <= self.gap_alvo + TOLERANCIA_GAP:
+            return "gap"
+        if self.janela and len(self.historico) > self.janela:
+            referencia = self.historico[-self.janela - 1]
+            melhora = (referencia - self.melhor) / max(abs(referencia), 1e-12)
+            if melhora <= self.melhora_minima:
+                return "estagnacao"
+        # A próxima geração deve caber no orçamento (estimada pela última)
+        if self.limite_s is not None and agora + duracao - self.inicio > self.limite_s:
+            return "tempo"
+        if self.prazo is not None and agora + duracao > self.prazo:
+            return "tempo"
+        return None
+
+    def describe(self):
+        """Resumo textual: gerações, motivo da parada e gap final."""
+        texto = f"{len(self.historico) - 1} gerações, parada: {self.motivo or 'ngen'}"
+        gap = self.gap()
+        if gap is not None:
+            texto += f", gap {gap * 100:.3f}% (limite inferior {self.limite_inferior:.2f})"
+        return texto
+
+
+def evaluate_invalid(population, toolbox):
+    """
+    Avalia (com toolbox.map) os indivíduos sem fitness válida, depois de
+    passá-los por `toolbox.repair` quando registrado. Retorna quantos foram
+    avaliados.
+    """
+    invalid_ind = [ind for ind in population if not ind.fitness.valid]
+    reparar = getattr(toolbox, "repair", None)
+    if reparar is not None:
+        for ind in invalid_ind:
+            reparar(ind)
+    fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+    for ind, fit in zip(invalid_ind, fitnesses):
+        ind.fitness.values = fit
+    return len(invalid_ind)
+
+
+def _record(logbook, population, gen, nevals, stats, parada, verbose):
+    record = stats.compile(population) if stats else {}
+    if parada is not None:
+        parada.update(min(ind.fitness.values[0] for ind in population))
+        if parada.limite_inferior is not None:
+            record["gap"] = parada.gap()
+    logbook.record(gen=gen, nevals=nevals, **record)
+    if verbose:
+        print(logbook.stream)
+    return parada is not None and parada.motivo is not None
+
+
+def _callback(callback, gen, population, halloffame):
+    return callback is not None and bool(callback(gen, population, halloffame))
+
+
+def _logbook(stats, parada, logbook=None):
+    if logbook is None:
+        logbook = tools.Logbook()
+    if not logbook.header:
+        logbook.header = ["gen", "nevals"] + (stats.fields if stats else [])
+        if parada is not None and parada.limite_inferior is not None:
+            logbook.header.append("gap")
+    return logbook
+
+
+def ea_simple(population, toolbox, cxpb, mutpb, ngen, parada=None, stats=None,
+              halloffame=None, verbose=__debug__, callback=None, geracao_inicial=0,
+              logbook=None):
+    """
+    algorithms.eaSimple com parada antecipada por `parada` (EarlyStopping).
+    `callback(gen, population, halloffame)`, chamado ao fim de cada geração,
+    pode alterar a população e encerra a evolução se retornar True.
+
+    Para retomar uma execução, `geracao_inicial` é a última geração concluída
+    (a população já avaliada) e `logbook` o logbook dela, que continua.
+    """
+    logbook = _logbook(stats, parada, logbook)
+    nevals = evaluate_invalid(population, toolbox)
+    if halloffame is not None:
+        halloffame.update(population)
+    parar = False
+    if geracao_inicial == 0:
+        parar = _record(logbook, population, 0, nevals, stats, parada, verbose)
+        parar = _callback(callback, 0, population, halloffame) or parar
+
+    for gen in range(geracao_inicial + 1, ngen + 1):
+        if parar:
+            break
+        offspring = toolbox.select(population, len(population))
+        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        nevals = evaluate_invalid(offspring, toolbox)
+        if halloffame is not None:
+            halloffame.update(offspring)
+        population[:] = offspring
+        parar = _record(logbook, population, gen, nevals, stats, parada, verbose)
+        parar = _callback(callback, gen, population, halloffame) or parar
+
+    return population, logbook
+
+
+def ea_mu_plus_lambda(population, toolbox, mu, lambda_, cxpb, mutpb, ngen, parada=None,
+                      stats=None, halloffame=None, verbose=__debug__, callback=None,
+                      geracao_inicial=0, logbook=None):
+    """algorithms.eaMuPlusLambda com parada antecipada, `callback` e retomada (ver ea_simple)."""
+    logbook = _logbook(stats, parada, logbook)
+    nevals = evaluate_invalid(population, toolbox)
+    if halloffame is not None:
+        halloffame.update(population)
+    parar = False
+    if geracao_inicial == 0:
+        parar = _record(logbook, population, 0, nevals, stats, parada, verbose)
+        parar = _callback(callback, 0, population, halloffame) or parar
+
+    for gen in range(geracao_inicial + 1, ngen + 1):
+        if parar:
+            break
+        offspring = algorithms.varOr(population, toolbox, lambda_, cxpb, mutpb)
+        nevals = evaluate_invalid(offspring, toolbox)
+        if halloffame is not None:
+            halloffame.update(offspring)
+        population[:] = toolbox.select(population + offspring, mu)
+        parar = _record(logbook, population, gen, nevals, stats, parada, verbose)
+        parar = _callback(callback, gen, population, halloffame) or parar
+
+    return population, logbook
@@ -0,0 +1,149 @@
+"""
+Realocação incremental (warm start) a partir de uma alocação anterior.
+
+Lê o alocacao_final.txt de uma execução anterior e o compara com as entradas
+atuais. Alunos cuja sala anterior continua válida (mesma etapa/horário e a
+sala ainda existe) são mantidos; os demais ficam livres:
+
+- alunos novos, que mudaram de etapa/horário, cuja sala deixou de existir
+  ou que estavam sem alocação;
+- alunos excedentes de salas cuja capacidade diminuiu (saem os mais
+  distantes).
+
+A vizinhança das salas que mudaram é liberada junto: um aluno mantido volta
+a ser otimizado se alguma de suas salas candidatas com vaga aberta desde a
+alocação anterior for mais barata que a sala atual. Uma vaga é aberta por
+um ocupante anterior que saiu da sala (desistência, mudança de etapa/horário)
+ou, com `vagas_anteriores` (capacidade de cada sala na execução anterior),
+por aumento de capacidade ou sala nova; vagas que já sobravam antes não
+liberam ninguém, e entradas iguais mantêm toda a alocação. Só os alunos
+livres são re-otimizados, sobre a capacidade residual das salas.
+"""
+import os
+
+CAMPOS_SALA = ("id_sala", "id_sala_alocada")
+
+
+def load_previous_allocation(filepath, unassigned_id=-1):
+    """
+    Lê uma alocação anterior (formato de alocacao_final.txt).
+
+    Retorna um dicionário id_aluno -> (id_sala, etapa, horario), com
+    `unassigned_id` para alunos não alocados.
+    """
+    anterior = {}
+    with open(filepath, "r", encoding="utf-8") as f:
+        cabecalho = f.readline().strip().split(";")
+        col_sala = next((cabecalho.index(c) for c in CAMPOS_SALA if c in cabecalho), None)
+        if col_sala is None or "id_aluno" not in cabecalho:
+            raise ValueError(f"{os.path.basename(filepath)}: cabeçalho não reconhecido")
+        col_id = cabecalho.index("id_aluno")
+        col_etapa = cabecalho.index("etapa_desejada")
+        col_horario = cabecalho.index("horario_desejado")
+
+        for linha in f:
+            partes = linha.strip().split(";")
+            if len(partes) < len(cabecalho):
+                continue
+            sala = partes[col_sala]
+            id_sala = int(sala) if sala.lstrip("-").isdigit() else unassigned_id
+            anterior[partes[col_id]] = (id_sala, int(partes[col_etapa]), int(partes[col_horario]))
+    return anterior
+
+
+def plan_reallocation(anterior, alunos, salas, opcoes, custo, unassigned_id=-1,
+                      vagas_anteriores=None):
+    """
+    Compara a alocação anterior com as entradas atuais.
+
+    `opcoes[i]` são as salas candidatas do aluno i em ordem crescente de
+    distância e `custo(i, id_sala)` o custo do aluno i na sala;
+    `vagas_anteriores` (opcional) é id_sala -> vagas da execução anterior,
+    para contar aumentos de capacidade e salas novas na vizinhança. Retorna
+    (solucao, livres, info): a solução com as alocações mantidas
+    (`unassigned_id` nos livres), os índices dos alunos a re-otimizar e as
+    contagens de cada motivo.
+    """
+    info = {"mantidos": 0, "novos": 0, "mudaram": 0, "sala_invalida": 0,
+            "nao_alocados": 0, "excedentes": 0, "vizinhanca": 0, "desistentes": 0}
+    solucao = [unassigned_id] * len(alunos)
+    livres = []
+    ocupantes = {}
+
+    for i, aluno in enumerate(alunos):
+        anterior_i = anterior.get(aluno["id"])
+        if anterior_i is None:
+            info["novos"] += 1
+            livres.append(i)
+            continue
+        id_sala, etapa, horario = anterior_i
+        if (etapa, horario) != (aluno["etapa"], aluno["horario"]):
+            info["mudaram"] += 1
+        elif id_sala == unassigned_id:
+            info["nao_alocados"] += 1
+        elif (id_sala not in salas or salas[id_sala]["etapa"] != etapa
+              or salas[id_sala]["horario"] != horario):
+            info["sala_invalida"] += 1
+        else:
+            solucao[i] = id_sala
+            ocupantes.setdefault(id_sala, []).append(i)
+            continue
+        livres.append(i)
+
+    atuais = {aluno["id"] for aluno in alunos}
+    info["desistentes"] = sum(1 for id_a in anterior if id_a not in atuais)
+
+    # Vagas abertas: ocupantes anteriores que não continuam na sala (antes do
+    # corte por capacidade reduzida, que não abre vaga) e capacidade a mais
+    abertas = {}
+    for id_sala, _, _ in anterior.values():
+        if id_sala != unassigned_id:
+            abertas[id_sala] = abertas.get(id_sala, 0) + 1
+    for id_sala, membros in ocupantes.items():
+        abertas[id_sala] -= len(membros)
+    if vagas_anteriores is not None:
+        for id_sala, d in salas.items():
+            aumento = d["vagas"] - vagas_anteriores.get(id_sala, 0)
+            if aumento > 0:
+                abertas[id_sala] = abertas.get(id_sala, 0) + aumento
+
+    # Capacidade reduzida: saem os alunos mais distantes
+    for id_sala, membros in ocupantes.items():
+        excesso = len(membros) - salas[id_sala]["vagas"]
+        if excesso > 0:
+            membros.sort(key=lambda i: custo(i, id_sala))
+            for i in membros[-excesso:]:
+                solucao[i] = unassigned_id
+                livres.append(i)
+            del membros[-excesso:]
+            info["excedentes"] += excesso
+
+    # Vizinhança: salas com vaga aberta (e ainda livre) melhores que a sala atual
+    com_vaga = {s for s, d in salas.items()
+                if abertas.get(s, 0) > 0 and d["vagas"] > len(ocupantes.get(s, ()))}
+    for id_sala, membros in ocupantes.items():
+        for i in membros:
+            c_atual = None
+            for s in opcoes[i]:
+                if s == id_sala:
+                    break
+                if s in com_vaga:
+                    if c_atual is None:
+                        c_atual = custo(i, id_sala)
+                    if custo(i, s) < c_atual:
+                        solucao[i] = unassigned_id
+                        livres.append(i)
+                        info["vizinhanca"] += 1
+                        break
+
+    info["mantidos"] = len(alunos) - len(livres)
+    return solucao, livres, info
+
+
+def residual_capacity(salas, solucao, unassigned_id=-1):
+    """Vagas restantes de cada sala depois das alocações já feitas em `solucao`."""
+    vagas = {s: d["vagas"] for s, d in salas.items()}
+    for id_sala in solucao:
+        if id_sala != unassigned_id and id_sala in vagas:
+            vagas[id_sala] -= 1
+    return vagas
@@ -0,0 +1,164 @@
+"""
+Distâncias pela malha viária (métrica alternativa ao Haversine).
+
+A linha reta subestima os trajetos reais onde a malha contorna obstáculos
+(lagoa, encostas). Com esta métrica, a distância aluno -> escola é o
+caminho mínimo em uma malha viária local, sem nenhum serviço externo:
+
+- o arquivo da malha é texto no estilo de Models/ (total no cabeçalho e uma
+  aresta por linha: `lat_a lon_a lat_b lon_b km`, com km <= 0 para usar a
+  linha reta entre as pontas), lido com o cache binário de carregamento.py;
+  as vias são de mão dupla e os nós são as pontas distintas;
+- só a maior componente conexa é usada: alunos e escolas são encaixados no
+  nó mais próximo dela (KD-tree na projeção local), e o acesso até o nó
+  entra em linha reta;
+- uma busca de caminho mínimo (Dijkstra) por escola, da escola para todos
+  os nós: E buscas no total, em vez de uma por par aluno-sala. A matriz
+  aluno × escola é um gather nessas linhas, mais os acessos;
+- com `pasta_cache`, `prepare` grava as linhas das escolas (escolas × nós,
+  float32) em disco, pelo hash da malha e dos nós das escolas: as próximas
+  execuções, mesmo com outros alunos, não refazem as buscas.
+
+RoadNetwork tem a interface de distancias.HaversineMetric (`matrix`,
+`pairs`), então entra no lugar do Haversine em todos os motores.
+"""
+import os
+import time
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from scipy.spatial import cKDTree
+
+from carregamento import load_arestas_array
+from checkpoint import fingerprint, write_atomic
+from distancias import haversine_pairs
+from indice_espacial import project_local
+from unidades import aggregate
+
+# Escolas por chamada do Dijkstra (limita a matriz float64 temporária)
+BLOCO_FONTES = 16
+
+# Comprimento mínimo de aresta (km): arestas de comprimento 0 somem da matriz esparsa
+KM_MINIMO = 1e-6
+
+
+class RoadNetwork:
+    """
+    Malha viária carregada de `arquivo`, com as buscas por escola
+    memorizadas (e, com `pasta_cache`, persistidas por `prepare`).
+    """
+    nome = "rede"
+    linha_reta = False
+
+    def __init__(self, arquivo, pasta_cache=None):
+        arestas, _ = load_arestas_array(arquivo)
+        self.arquivo = arquivo
+        self.pasta_cache = pasta_cache
+        self.assinatura = fingerprint(arestas)
+
+        # Nós: pontas distintas das arestas
+        lat = np.concatenate([arestas["lat_a"], arestas["lat_b"]])
+        lon = np.concatenate([arestas["lon_a"], arestas["lon_b"]])
+        pontas, primeira, _ = aggregate(lat, lon)
+        self.lat, self.lon = lat[primeira], lon[primeira]
+        self.n_nos = len(primeira)
+
+        m = len(arestas)
+        a, b = pontas[:m], pontas[m:]
+        km = np.asarray(arestas["km"], dtype=np.float64)
+        km = np.where(km > 0, km, haversine_pairs(lat[:m], lon[:m], lat[m:], lon[m:]))
+
+        # Sem laços; arestas repetidas ficam com o menor comprimento
+        u, v = np.minimum(a, b), np.maximum(a, b)
+        validas = u != v
+        u, v, km = u[validas], v[validas], np.maximum(km[validas], KM_MINIMO)
+        ordem = np.lexsort((km, v, u))
+        u, v, km = u[ordem], v[ordem], km[ordem]
+        primeiras = np.ones(len(u), dtype=bool)
+        primeiras[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+        u, v, km = u[primeiras], v[primeiras], km[primeiras]
+        self.n_arestas = len(u)
+        self.grafo = coo_matrix((km, (u, v)), shape=(self.n_nos, self.n_nos)).tocsr()
+
+        # Encaixe só na maior componente conexa (todos os pares ficam finitos)
+        _, rotulos = connected_components(self.grafo, directed=False)
+        self.conectados = np.flatnonzero(rotulos == np.bincount(rotulos).argmax())
+        self.lat0 = float(self.lat[self.conectados].mean())
+        self.lon0 = float(self.lon[self.conectados].mean())
+        self.tree = cKDTree(project_local(self.lat[self.conectados], self.lon[self.conectados],
+                                          self.lat0, self.lon0))
+
+        self._linhas = {}  # nó de origem -> distâncias (float32) até todos os nós
+        self.buscas = 0
+
+    def snap(self, lat, lon):
+        """Nó mais próximo (da maior componente) de cada ponto e o acesso em km."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        _, idx = self.tree.query(project_local(lat, lon, self.lat0, self.lon0))
+        nos = self.conectados[idx]
+        return nos, haversine_pairs(lat, lon, self.lat[nos], self.lon[nos])
+
+    def _rows(self, nos):
+        """Linhas de distância (len(nos) × nós) a partir de `nos`; busca só os novos."""
+        novos = [n for n in dict.fromkeys(np.asarray(nos).tolist()) if n not in self._linhas]
+        for ini in range(0, len(novos), BLOCO_FONTES):
+            bloco = novos[ini:ini + BLOCO_FONTES]
+            dist = dijkstra(self.grafo, directed=False, indices=bloco)
+            for n, linha in zip(bloco, dist):
+                self._linhas[n] = linha.astype(np.float32)
+        self.buscas += len(novos)
+        return np.stack([self._linhas[n] for n in np.asarray(nos).tolist()])
+
+    def prepare(self, lat_escolas, lon_escolas):
+        """
+        Faz de uma vez as buscas de todas as escolas (antes dos motores e dos
+        workers), lendo/gravando o cache em disco quando há `pasta_cache`.
+        Retorna (buscas feitas, segundos).
+        """
+        inicio = time.time()
+        nos = np.unique(self.snap(lat_escolas, lon_escolas)[0])
+        caminho = None
+        if self.pasta_cache is not None:
+            chave = fingerprint(np.frombuffer(self.assinatura.encode(), dtype=np.uint8), nos)
+            caminho = os.path.join(self.pasta_cache, f"rede_viaria.{chave}.cache.npy")
+            if os.path.exists(caminho):
+                try:
+                    linhas = np.load(caminho)
+                    if linhas.shape == (len(nos), self.n_nos):
+                        self._linhas.update(zip(nos.tolist(), linhas))
+                        return 0, time.time() - inicio
+                except (OSError, ValueError) as e:
+                    print(f"⚠ Cache da malha viária ilegível ({e}); recalculando.")
+
+        antes = self.buscas
+        linhas = self._rows(nos)
+        if caminho is not None:
+            try:
+                write_atomic(caminho, lambda f: np.save(f, linhas))
+            except OSError as e:
+                print(f"⚠ Não foi possível gravar o cache da malha viária: {e}")
+        return self.buscas - antes, time.time() - inicio
+
+    def matrix(self, lat_alunos, lon_alunos, lat_escolas, lon_escolas, out=None):
+        """Matriz float32 (alunos × escolas) de distâncias pela malha, em km."""
+        nos_a, acesso_a = self.snap(lat_alunos, lon_alunos)
+        nos_e, acesso_e = self.snap(lat_escolas, lon_escolas)
+        if out is None:
+            out = np.empty((len(nos_a), len(nos_e)), dtype=np.float32)
+        np.add(self._rows(nos_e)[:, nos_a].T, acesso_a[:, None], out=out)
+        out += acesso_e[None, :]
+        return out
+
+    def pairs(self, lat1, lon1, lat2, lon2):
+        """Distâncias pela malha elemento a elemento (arrays 1-D de mesmo tamanho), em float32."""
+        nos1, acesso1 = self.snap(lat1, lon1)
+        nos2, acesso2 = self.snap(lat2, lon2)
+        fontes, inverso = np.unique(nos2, return_inverse=True)
+        linhas = self._rows(fontes)
+        return (linhas[inverso.reshape(-1), nos1] + acesso1 + acesso2).astype(np.float32)
+
+    def describe(self):
+        return (f"malha viária {os.path.basename(self.arquivo)} ({self.n_nos} nós, "
+                f"{self.n_arestas} arestas, {len(self.conectados)} na maior componente)")
@@ -0,0 +1,102 @@
+"""
+Heurística construtiva por arrependimento (regret) — modo rápido sem AG.
+
+Cada aluno tem uma lista de salas candidatas ordenada por custo. O
+arrependimento de um aluno é a diferença de custo entre sua melhor e sua
+segunda melhor opção ainda com vaga: quem tem mais a perder é alocado
+primeiro. Alunos especiais sempre têm prioridade sobre os demais.
+
+Os arrependimentos são atualizados de forma preguiçosa: ao retirar um aluno
+da fila, recalculamos sua chave com as vagas atuais; se ela mudou (porque
+alguma sala lotou), o aluno volta para a fila com a chave nova.
+
+`regret_split` trabalha com unidades de alunos idênticos (ver unidades.py):
+ao sair da fila, a unidade manda para a melhor sala quantos alunos couberem
+e, se sobrar alguém, volta para a fila com a chave recalculada.
+"""
+import heapq
+
+INF = float("inf")
+
+
+def _best_two(opcoes, ptr, restantes, custo_nao_alocado):
+    """
+    Avança ptr até a primeira sala com vaga e acha a segunda opção (que pode
+    ser ficar sem alocação). Retorna (ptr, c1, c2); c1 é None quando ficar
+    sem alocação é a melhor opção restante.
+    """
+    k = ptr
+    while k < len(opcoes) and restantes[opcoes[k][0]] <= 0:
+        k += 1
+    if k == len(opcoes) or opcoes[k][1] >= custo_nao_alocado:
+        return k, None, None
+    j = k + 1
+    while j < len(opcoes) and restantes[opcoes[j][0]] <= 0:
+        j += 1
+    c2 = opcoes[j][1] if j < len(opcoes) else INF
+    return k, opcoes[k][1], min(c2, custo_nao_alocado)
+
+
+def _key(special, c1, c2):
+    return (0 if special else 1, -(c2 - c1))
+
+
+def regret_allocation(opcoes, special, vagas, unassigned_id=-1, custo_nao_alocado=None):
+    """
+    Aloca todos os alunos por ordem de arrependimento.
+
+    `opcoes[i]` é a lista de (id_sala, custo) do aluno i, em ordem crescente
+    de custo; `special[i]` indica necessidade especial; `vagas` mapeia
+    id_sala -> capacidade. `custo_nao_alocado[i]` (opcional) é o custo de
+    deixar o aluno sem sala, tratado como uma opção sempre disponível.
+    Alunos sem nenhuma opção melhor com vaga ficam com `unassigned_id`.
+    Retorna a lista de salas por aluno.
+    """
+    divisoes = regret_split(opcoes, special, [1] * len(opcoes), vagas, custo_nao_alocado)
+    return [divisao[0][0] if divisao else unassigned_id for divisao in divisoes]
+
+
+def regret_split(opcoes, special, contagem, vagas, custo_nao_alocado=None):
+    """
+    Como regret_allocation, para unidades de `contagem[u]` alunos idênticos
+    (`opcoes`, `special` e `custo_nao_alocado` por unidade). Retorna, por
+    unidade, a lista de (id_sala, quantidade); quem não aparece nela fica
+    sem sala.
+    """
+    n = len(opcoes)
+    if custo_nao_alocado is None:
+        custo_nao_alocado = [INF] * n
+    restantes = dict(vagas)
+    for ops in opcoes:
+        for id_sala, _ in ops:
+            restantes.setdefault(id_sala, 0)
+
+    divisoes = [[] for _ in range(n)]
+    faltam = list(contagem)
+    ptr = [0] * n
+    heap = []
+    for i in range(n):
+        ptr[i], c1, c2 = _best_two(opcoes[i], 0, restantes, custo_nao_alocado[i])
+        if c1 is not None:
+            heap.append((_key(special[i], c1, c2), i))
+    heapq.heapify(heap)
+
+    while heap:
+        chave, i = heapq.heappop(heap)
+        ptr[i], c1, c2 = _best_two(opcoes[i], ptr[i], restantes, custo_nao_alocado[i])
+        if c1 is None:
+            continue  # lotaram as candidatas melhores que ficar sem sala
+        nova = _key(special[i], c1, c2)
+        if nova != chave:
+            heapq.heappush(heap, (nova, i))
+            continue
+
+        id_sala = opcoes[i][ptr[i]][0]
+        quantidade = min(faltam[i], restantes[id_sala])
+        divisoes[i].append((id_sala, quantidade))
+        restantes[id_sala] -= quantidade
+        faltam[i] -= quantidade
+        if faltam[i]:
+            heapq.heappush(heap, (nova, i))  # a sala lotou: chave recalculada na saída
+
+    return divisoes
@@ -0,0 +1,96 @@
+"""
+Reparo de capacidade dos filhos do AG.
+
+O crossover (uniforme em main2.py, dois pontos em main.py) mistura os pais
+gene a gene sem olhar as vagas, e os filhos costumam lotar salas além da
+capacidade. O reparo, aplicado uma vez a cada filho antes da avaliação
+(`toolbox.repair`, ver parada.evaluate_invalid), mantém um heap das salas
+superlotadas (maior excesso primeiro) e, em cada uma, move os alunos cuja
+alternativa é mais barata (custo da sala livre mais próxima menos o custo da
+sala atual) para a sala candidata mais próxima que ainda tem vaga, até
+zerar o excesso ou acabarem as alternativas.
+
+Fora a contagem de ocupação (uma passada vetorizada), o trabalho é
+proporcional ao excesso, não ao tamanho do cromossomo. Salas que recebem
+alunos nunca passam da capacidade, então um filho reparado só continua
+superlotado quando nenhum aluno da sala tem candidata com vaga.
+
+Com `pesos`, cada linha é uma unidade de `pesos[i]` alunos idênticos (ver
+unidades.py), que ocupa e libera esse número de vagas e só é movida para
+uma sala com vagas para a unidade inteira.
+"""
+import heapq
+
+import numpy as np
+
+
+def repair_capacity(salas, vagas, candidatas, custos, ocupacao=None, pesos=None):
+    """
+    Repara, in place, a alocação `salas` (array com o índice denso da sala de
+    cada aluno, -1 = não alocado).
+
+    `candidatas` é a matriz (alunos × K) de índices densos de sala em ordem
+    crescente de distância (-1 = sem opção) e `custos` o custo de cada
+    candidata; `ocupacao`, se já conhecida, evita recontar. Retorna a lista
+    dos alunos movidos. `pesos` (opcional) é o tamanho de cada unidade.
+    """
+    if ocupacao is None:
+        alocados = salas >= 0
+        ocupacao = np.bincount(salas[alocados], None if pesos is None else pesos[alocados],
+                               minlength=len(vagas)).astype(np.int64)
+    excesso = ocupacao - vagas
+    cheias = np.flatnonzero(excesso > 0)
+    if not len(cheias):
+        return []
+
+    livres = (vagas - ocupacao).tolist()
+    heap = [(-e, r) for r, e in zip(cheias.tolist(), excesso[cheias].tolist())]
+    heapq.heapify(heap)
+
+    membros = {}
+    indices = np.flatnonzero(np.isin(salas, cheias))
+    for i, r in zip(indices.tolist(), salas[indices].tolist()):
+        membros.setdefault(r, []).append(i)
+
+    movidos = []
+    while heap:
+        _, r = heapq.heappop(heap)
+        opcoes = []
+        linhas = {}
+        for i in membros[r]:
+            cand, custo = candidatas[i].tolist(), custos[i].tolist()
+            # Fora das candidatas (sala de outro grupo, por exemplo): sai primeiro
+            atual = custo[cand.index(r)] if r in cand else float("inf")
+            w = 1 if pesos is None else int(pesos[i])
+            linhas[i] = (cand, custo, atual, w)
+            j = _next_free(cand, 0, r, livres, w)
+            if j is not None:
+                opcoes.append((custo[j] - atual, i, j))
+        heapq.heapify(opcoes)
+
+        while livres[r] < 0 and opcoes:
+            _, i, j = heapq.heappop(opcoes)
+            cand, custo, atual, w = linhas[i]
+            s = cand[j]
+            if livres[s] < w:
+                # A sala encheu desde o cálculo: próxima candidata com vaga
+                j = _next_free(cand, j + 1, r, livres, w)
+                if j is not None:
+                    heapq.heappush(opcoes, (custo[j] - atual, i, j))
+                continue
+            salas[i] = s
+            livres[s] -= w
+            livres[r] += w
+            movidos.append(i)
+    return movidos
+
+
+def _next_free(cand, inicio, atual, livres, necessario=1):
+    """Posição da primeira candidata a partir de `inicio` com `necessario` vagas (ou None)."""
+    for j in range(inicio, len(cand)):
+        s = cand[j]
+        if s < 0:
+            return None
+        if s != atual and livres[s] >= necessario:
+            return j
+    return None
@@ -0,0 +1,130 @@
+"""
+População inicial dos AGs: uma semente gulosa e perturbações dela.
+
+O greedy balanceado é determinístico: chamado `mu` vezes, ele gera `mu`
+indivíduos idênticos (e custa `mu` vezes). Aqui ele roda uma vez, e o resto
+da população sai de perturbações baratas da semente, cada uma um reinício
+parcial:
+
+- os alunos de uma fração sorteada das salas são liberados;
+- eles são realocados pelo mesmo greedy, em ordem embaralhada (especiais
+  primeiro) e com ruído no score, sobre a ocupação que sobrou.
+
+Tudo opera sobre índices densos de sala (-1 = não alocado), com as
+candidatas em listas (alunos × K) em ordem crescente de distância.
+Com `contagem`, cada linha é uma unidade de alunos idênticos (ver
+unidades.py), alocada inteira em uma sala com vagas para todos.
+`cached_seed` guarda a semente em disco, com o nome derivado do hash das
+entradas, para as próximas execuções sobre os mesmos dados.
+"""
+import os
+import random
+
+import numpy as np
+
+from checkpoint import write_atomic
+
+# Peso da ocupação relativa no score do greedy (posição + PESO × ocupação/vagas)
+PESO_OCUPACAO = 10
+
+# Fração das salas liberadas em cada reinício parcial (sorteada no intervalo)
+FRACAO_REINICIO = (0.05, 0.25)
+
+# Amplitude do ruído uniforme somado ao score nos reinícios parciais
+RUIDO_SCORE = 3.0
+
+
+def greedy_fill(candidatas, n_opcoes, vagas, ocupacao, alunos, solucao, ruido=0.0, rnd=random,
+                peso_ocupacao=PESO_OCUPACAO, contagem=None):
+    """
+    Greedy balanceado: cada aluno de `alunos`, na ordem dada, vai para a
+    candidata de menor score (posição na lista + peso_ocupacao × ocupação
+    relativa, + ruído uniforme em [0, ruido)) que ainda tem vaga; se todas
+    estão cheias, para a mais próxima. Atualiza `solucao` e `ocupacao`.
+    Com peso_ocupacao=0 é o greedy da sala mais próxima com vaga. Com
+    `contagem`, a linha i ocupa contagem[i] vagas.
+    """
+    for i in alunos:
+        n = n_opcoes[i]
+        if not n:
+            continue
+        c = 1 if contagem is None else contagem[i]
+        salas_proximas = candidatas[i]
+
+        melhor_sala = None
+        melhor_score = float("inf")
+        for idx_dist in range(n):
+            if idx_dist >= melhor_score:
+                break  # score >= posição: nenhuma candidata seguinte ganha
+            s = salas_proximas[idx_dist]
+            ocupacao_s = ocupacao[s]
+            if ocupacao_s + c <= vagas[s]:
+                score = idx_dist + (ocupacao_s / vagas[s]) * peso_ocupacao
+                if ruido:
+                    score += ruido * rnd.random()
+                if score < melhor_score:
+                    melhor_score = score
+                    melhor_sala = s
+
+        if melhor_sala is None:
+            melhor_sala = salas_proximas[0]
+        solucao[i] = melhor_sala
+        ocupacao[melhor_sala] += c
+    return solucao
+
+
+def priority_order(especial, rnd=None):
+    """Especiais primeiro; com `rnd`, cada classe em ordem embaralhada."""
+    especiais = [i for i, e in enumerate(especial) if e]
+    normais = [i for i, e in enumerate(especial) if not e]
+    if rnd is not None:
+        rnd.shuffle(especiais)
+        rnd.shuffle(normais)
+    return especiais + normais
+
+
+def partial_restart(semente, candidatas, n_opcoes, vagas, especial, rnd=random,
+                    fracao=FRACAO_REINICIO, ruido=RUIDO_SCORE, peso_ocupacao=PESO_OCUPACAO,
+                    contagem=None):
+    """
+    Perturbação da solução `semente` (array de índices densos): libera os
+    alunos de uma fração sorteada das salas e os realoca pelo greedy com
+    ordem embaralhada e ruído. Retorna (solução, alunos liberados).
+    `contagem` (opcional, array) é o tamanho de cada unidade.
+    """
+    n_salas = len(vagas)
+    sorteadas = rnd.sample(range(n_salas), max(1, round(rnd.uniform(*fracao) * n_salas)))
+    liberados = np.flatnonzero(np.isin(semente, sorteadas))
+
+    solucao = np.array(semente)
+    solucao[liberados] = -1
+    alocados = solucao >= 0
+    ocupacao = np.bincount(solucao[alocados], None if contagem is None else contagem[alocados],
+                           minlength=n_salas).astype(np.int64).tolist()
+    ordem = priority_order([especial[i] for i in liberados.tolist()], rnd)
+    liberados_l = liberados.tolist()
+    nova = greedy_fill(candidatas, n_opcoes, vagas, ocupacao, [liberados_l[k] for k in ordem],
+                       solucao.tolist(), ruido, rnd, peso_ocupacao,
+                       None if contagem is None else contagem.tolist())
+    return np.array(nova, dtype=semente.dtype), liberados
+
+
+def cached_seed(pasta, chave, construir):
+    """
+    Semente gulosa com cache em disco: `pasta`/semente_gulosa.<chave>.cache.npy
+    (`chave` = hash das entradas). Sem `pasta`, apenas chama `construir()`.
+    """
+    if pasta is None:
+        return construir()
+    caminho = os.path.join(pasta, f"semente_gulosa.{chave}.cache.npy")
+    if os.path.exists(caminho):
+        try:
+            return np.load(caminho)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Cache da semente ilegível ({e}); recalculando.")
+    semente = construir()
+    try:
+        write_atomic(caminho, lambda f: np.save(f, semente))
+    except OSError as e:
+        print(f"⚠ Não foi possível gravar o cache da semente: {e}")
+    return semente
@@ -0,0 +1,151 @@
+"""
+Telemetria estruturada (JSONL) das execuções dos alocadores.
+
+Cada registro é uma linha JSON com o instante (`ts`, epoch), o tempo desde o
+início da execução (`t`), o RSS atual do processo e o contexto de quem emitiu
+(programa, grupo, pid). Tipos de evento:
+
+- "fase": duração de uma fase (carga, preprocessamento, semente, evolucao,
+  resolucao, escrita), emitido ao final dela;
+- "geracao": uma linha por geração do AG, com avaliações/s, melhor e média do
+  fitness, violações do melhor indivíduo e estatísticas do cache de fitness;
+- "resultado": fitness e violações da solução final de cada motor.
+
+Desativada (sem arquivo), a telemetria não grava nada: `fase` devolve um
+contexto nulo e `GenerationStats` só calcula as colunas do logbook.
+Processos e threads podem gravar no mesmo arquivo: cada registro é uma única
+escrita em modo append.
+"""
+import contextlib
+import json
+import os
+import resource
+import threading
+import time
+
+import numpy as np
+from deap import tools
+
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb():
+    """RSS atual do processo em MB (pico, onde /proc não existe)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGINA / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class Telemetria:
+    """Emissor de registros JSONL; inativo quando `caminho` é None."""
+
+    def __init__(self, caminho=None, **contexto):
+        self.caminho = caminho
+        self.ativa = caminho is not None
+        self.contexto = contexto
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+        self._arquivo = open(caminho, "a", encoding="utf-8") if self.ativa else None
+
+    def with_context(self, **contexto):
+        """Telemetria no mesmo arquivo, com campos de contexto adicionais."""
+        filha = Telemetria.__new__(Telemetria)
+        filha.__dict__.update(self.__dict__)
+        filha.contexto = {**self.contexto, **contexto}
+        return filha
+
+    def emit(self, evento, **campos):
+        if not self.ativa:
+            return
+        agora = time.time()
+        registro = {"ts": round(agora, 6), "t": round(agora - self.inicio, 6), "evento": evento,
+                    **self.contexto, "pid": os.getpid(), **campos, "rss_mb": round(rss_mb(), 1)}
+        linha = json.dumps(registro, default=_json_default) + "\n"
+        with self._lock:
+            self._arquivo.write(linha)
+            self._arquivo.flush()
+
+    def fase(self, nome, **campos):
+        """Context manager que emite a duração da fase `nome` ao sair."""
+        if not self.ativa:
+            return contextlib.nullcontext()
+        return self._fase(nome, campos)
+
+    @contextlib.contextmanager
+    def _fase(self, nome, campos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.emit("fase", fase=nome, duracao_s=round(time.perf_counter() - inicio, 6), **campos)
+
+    def close(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+            self.ativa = False
+
+
+def _json_default(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"não serializável: {type(valor).__name__}")
+
+
+DESATIVADA = Telemetria()
+
+
+class GenerationStats(tools.Statistics):
+    """
+    Statistics do DEAP (colunas avg/min do logbook) que, com a telemetria
+    ativa, emite um registro "geracao" a cada compile().
+
+    `violations(ind)` devolve o dicionário de violações do melhor indivíduo,
+    `count_evaluations()` o total de avaliações feitas até o momento (sem
+    ele, contam-se as chamadas da função devolvida por `counted`) e `cache`
+    (opcional) é o FitnessCache da execução.
+    """
+
+    def __init__(self, telemetria, violations=None, count_evaluations=None, cache=None):
+        super().__init__(lambda ind: ind.fitness.values)
+        self.register("avg", lambda x: np.mean([fit[0] for fit in x]))
+        self.register("min", lambda x: np.min([fit[0] for fit in x]))
+        self.telemetria = telemetria
+        self.violations = violations
+        self.avaliacoes = 0
+        self.count_evaluations = count_evaluations or (lambda: self.avaliacoes)
+        self.cache = cache
+        self.geracao = 0
+        self._ultimo = (time.perf_counter(), self.count_evaluations())
+
+    def counted(self, evaluate):
+        """Envolve `evaluate` contando as chamadas."""
+        def evaluate_counted(individual):
+            self.avaliacoes += 1
+            return evaluate(individual)
+        return evaluate_counted
+
+    def compile(self, population):
+        record = super().compile(population)
+        if self.telemetria.ativa:
+            self._emit(population, record)
+        self.geracao += 1
+        return record
+
+    def _emit(self, population, record):
+        agora = time.perf_counter()
+        campos = {"geracao": self.geracao, "melhor": float(record["min"]),
+                  "media": float(record["avg"])}
+        total = self.count_evaluations()
+        t0, n0 = self._ultimo
+        campos["avaliacoes"] = total - n0
+        campos["avaliacoes_s"] = round((total - n0) / max(agora - t0, 1e-9), 1)
+        self._ultimo = (agora, total)
+        if self.violations is not None:
+            melhor = min(population, key=lambda ind: ind.fitness.values[0])
+            campos["violacoes"] = self.violations(melhor)
+        if self.cache is not None:
+            campos["cache"] = self.cache.snapshot()
+        self.telemetria.emit("geracao", **campos)
@@ -0,0 +1,17 @@
+"""Fixtures compartilhadas: uma instância sintética pequena (gerador_dados.py)."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gerador_dados  # noqa: E402
+import main2  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def problem():
+    """Problem de main2.py sobre 600 alunos, com vagas justas (folga 1.0)."""
+    alunos, escolas, salas = gerador_dados.generate(600, folga=1.0, seed=7)
+    return main2.Problem(alunos, escolas, salas)
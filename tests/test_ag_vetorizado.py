@@ -0,0 +1,56 @@
+"""Motor vetorizado (ag_vetorizado.py) contra o avaliador exato."""
+import numpy as np
+import pytest
+
+import main2
+from ag_vetorizado import BatchProblem
+
+
+def _tiny(vagas, candidatas):
+    candidatas = np.array(candidatas, dtype=np.int32)
+    n_alunos = len(candidatas)
+    return BatchProblem(candidatas, np.ones(candidatas.shape), None, [0] * len(vagas),
+                        [0] * len(vagas), vagas, [0] * n_alunos, [False] * n_alunos,
+                        main2.PENALIDADES)
+
+
+@pytest.mark.parametrize("k", [None, 1])
+def test_evaluate_matches_exact_evaluator(problem, k):
+    m = problem.modelo
+    lote = problem.batch()
+    if k is not None:
+        # Só a candidata mais próxima no top-K: as outras salas usam a distância
+        lote = BatchProblem(m.candidatas[:, :k], problem.custo_candidatas[:, :k], m.distance,
+                            m.salas["escola"], m.salas["grupo"], m.salas["vagas"],
+                            m.alunos["grupo"], m.alunos["especial"], main2.PENALIDADES)
+    rng = np.random.default_rng(1)
+    genes = np.empty((6, problem.n_alunos), dtype=np.int32)
+    for linha in genes:
+        linha[:] = m.candidatas[np.arange(problem.n_alunos),
+                                (rng.random(problem.n_alunos) * m.n_opcoes).astype(int)]
+    # Não alocados e sala de outro grupo
+    genes[2, :5] = -1
+    genes[3, 0] = np.flatnonzero(m.salas["grupo"] != m.alunos["grupo"][0])[0]
+
+    esperado = [problem.evaluator.evaluate(main2.creator.Individual(problem.room_ids(linha).tolist()))[0]
+                for linha in genes]
+    np.testing.assert_allclose(lote.evaluate(genes), esperado, rtol=1e-6)
+
+
+def test_mutation_updates_occupancy_between_moves():
+    # Sala 0 com 2 vagas e 4 alunos: só os dois primeiros visitados saem por lotação
+    lote = _tiny([2, 100], [[0, 1]] * 4)
+    genes = lote.mutate(np.random.default_rng(0), np.zeros((200, 4), dtype=np.int32), 1.0)
+    assert (genes[:, :2] == 1).all()
+    assert (genes[:, 2:] == 0).any()
+    np.testing.assert_array_equal(lote.occupancy(genes).sum(axis=1), 4)
+
+
+@pytest.mark.parametrize("semente", range(3))
+def test_mutation_positions_are_distinct(semente):
+    # Duas candidatas com vaga de sobra: cada posição sorteada muda com prob. 1/2
+    n = 20000
+    lote = _tiny([n, n], [[0, 1]] * n)
+    genes = lote.mutate(np.random.default_rng(semente), np.zeros((4, n), dtype=np.int32), 0.5)
+    # Com repetição seriam n × (1 - e^-0.5) / 2 ≈ 0.197 n
+    np.testing.assert_allclose((genes != 0).mean(axis=1), 0.25, atol=0.01)
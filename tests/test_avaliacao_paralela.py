@@ -0,0 +1,59 @@
+"""Avaliação paralela (avaliacao_paralela.py) contra a avaliação serial."""
+import random
+
+import numpy as np
+import pytest
+from deap import tools
+
+import main2
+from avaliacao_paralela import ParallelEvaluator
+from cache_fitness import FitnessCache
+from parada import ea_mu_plus_lambda
+
+
+@pytest.fixture(scope="module")
+def paralelo(problem):
+    with ParallelEvaluator(2, initargs=problem.worker_initargs()) as avaliador:
+        yield avaliador
+
+
+def _trajectory(problem, inner_map, semente=5, ngen=4):
+    """Melhor fitness por geração e fitness final da população, com semente fixa."""
+    random.seed(semente)
+    np.random.seed(semente)
+    toolbox = main2.build_toolbox(problem, FitnessCache(maxsize=1000), inner_map)
+    pop = toolbox.population(n=10)
+    stats = tools.Statistics(lambda ind: ind.fitness.values[0])
+    stats.register("min", min)
+    _, logbook = ea_mu_plus_lambda(pop, toolbox, mu=10, lambda_=15, cxpb=0.7, mutpb=0.2,
+                                   ngen=ngen, stats=stats, verbose=False)
+    return logbook.select("min"), sorted(ind.fitness.values[0] for ind in pop), pop
+
+
+def test_same_trajectory_serial_and_parallel(problem, paralelo):
+    serial_min, serial_pop, _ = _trajectory(problem, map)
+    paralelo_min, paralelo_pop, _ = _trajectory(problem, paralelo.map)
+    assert paralelo_min == serial_min
+    assert paralelo_pop == serial_pop
+
+
+def test_parallel_map_refreshes_evaluation_state(problem, paralelo):
+    _, _, pop = _trajectory(problem, paralelo.map, semente=9, ngen=3)
+    for ind in pop:
+        assert ind.alterados == {}
+        esperado = problem.evaluator.full_state(main2.creator.Individual(ind))
+        assert {s: q for s, q in ind.avaliacao.ocupacao.items() if q} == \
+            {s: q for s, q in esperado.ocupacao.items() if q}
+        assert problem.evaluator.score(ind.avaliacao) == ind.fitness.values[0]
+
+
+def test_parallel_scores_match_serial(problem, paralelo):
+    rnd = random.Random(2)
+    individuos = [main2.creator.Individual(
+        [int(problem.candidatas[i, rnd.randrange(problem.n_opcoes[i])])
+         for i in range(problem.n_alunos)]) for _ in range(7)]
+    antes = paralelo.avaliacoes
+    assert paralelo.map(None, individuos) == [problem.evaluator.evaluate(main2.creator.Individual(ind))
+                                             for ind in individuos]
+    assert paralelo.avaliacoes - antes == len(individuos)
+    assert paralelo.map(None, []) == []
@@ -0,0 +1,72 @@
+"""Avaliação incremental (avaliador.py) contra o recálculo completo."""
+import random
+
+import pytest
+
+import main2
+from avaliador import cx_uniform_tracked, mark_changed
+
+
+def _random_individual(problem, rnd):
+    """Genes sorteados entre as candidatas, com alguns não alocados e salas de outro grupo."""
+    ids_salas = problem.modelo.salas["id"].tolist()
+    genes = []
+    for i in range(problem.n_alunos):
+        sorteio = rnd.random()
+        if sorteio < 0.05:
+            genes.append(main2.UNASSIGNED_ID)
+        elif sorteio < 0.10:
+            genes.append(rnd.choice(ids_salas))
+        else:
+            genes.append(int(problem.candidatas[i, rnd.randrange(problem.n_opcoes[i])]))
+    return main2.creator.Individual(genes)
+
+
+def _full_score(problem, individual):
+    return problem.evaluator.score(problem.evaluator.full_state(main2.creator.Individual(individual)))
+
+
+def _assign(individual, rnd, ids):
+    for i in rnd.sample(range(len(individual)), 10):
+        mark_changed(individual, i)
+        individual[i] = rnd.choice(ids)
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_delta_equals_full_recomputation(problem, semente):
+    rnd = random.Random(semente)
+    random.seed(semente)  # custom_mutate usa o gerador global
+    ids = problem.modelo.salas["id"].tolist() + [main2.UNASSIGNED_ID]
+    populacao = [_random_individual(problem, rnd) for _ in range(4)]
+    for ind in populacao:
+        problem.evaluator.evaluate(ind)
+
+    deltas = problem.evaluator.delta_evaluations
+    for _ in range(30):
+        ind1, ind2 = rnd.sample(populacao, 2)
+        operacao = rnd.randrange(4)
+        if operacao == 0:
+            cx_uniform_tracked(ind1, ind2, rnd.choice([0.05, 0.5]))
+        elif operacao == 1:
+            main2.custom_mutate(ind1, problem, indpb=0.05)
+        elif operacao == 2:
+            main2.repair_individual(ind1, problem)
+        else:
+            _assign(ind1, rnd, ids)
+        for ind in (ind1, ind2):
+            assert problem.evaluator.evaluate(ind)[0] == _full_score(problem, ind)
+    assert problem.evaluator.delta_evaluations > deltas
+
+
+def test_clone_keeps_state_independent(problem):
+    rnd = random.Random(11)
+    original = _random_individual(problem, rnd)
+    original.fitness.values = problem.evaluator.evaluate(original)
+    antes = dict(original.avaliacao.ocupacao)
+
+    clone = main2.clone_individual(original)
+    assert clone == original and clone.fitness.values == original.fitness.values
+    _assign(clone, rnd, problem.modelo.salas["id"].tolist())
+    assert problem.evaluator.evaluate(clone)[0] == _full_score(problem, clone)
+    assert original.avaliacao.ocupacao == antes
+
@@ -0,0 +1,44 @@
+"""Blocos de distâncias por grupo (modelo.CompactModel) contra a matriz densa."""
+import numpy as np
+import pytest
+
+import gerador_dados
+from distancias import haversine_matrix
+from modelo import CompactModel
+
+
+@pytest.fixture(scope="module")
+def modelo():
+    alunos, escolas, salas = gerador_dados.generate(800, n_escolas=40, seed=11)
+    return CompactModel(alunos, escolas, salas, k=5)
+
+
+def _dense(m):
+    """Matriz aluno × escola de antes: inf fora das escolas com salas do grupo do aluno."""
+    a, e, s = m.alunos, m.escolas, m.salas
+    dist = haversine_matrix(a["lat"], a["lon"], e["lat"], e["lon"]).astype(np.float32)
+    do_grupo = np.zeros(dist.shape, dtype=bool)
+    for codigo in np.unique(a["grupo"]):
+        escolas = s["escola"][(s["grupo"] == codigo) & (s["escola"] >= 0)]
+        do_grupo[np.ix_(a["grupo"] == codigo, escolas)] = True
+    return np.where(do_grupo, dist, np.inf)
+
+
+def test_distance_matches_dense_matrix(modelo):
+    m = modelo
+    densa = _dense(m)
+    alunos, escolas = np.meshgrid(np.arange(m.n_alunos), np.arange(m.n_escolas), indexing="ij")
+    np.testing.assert_allclose(m.distance(alunos, escolas), densa, rtol=1e-6)
+    np.testing.assert_allclose(m.dist_minima[m.unidade], densa.min(axis=1), rtol=1e-6)
+    assert m.distance(3, int(np.argmin(densa[3]))) == pytest.approx(densa[3].min(), rel=1e-6)
+    assert m.dist_blocos.size < densa.size
+
+
+def test_room_column_points_into_its_group_block(modelo):
+    m = modelo
+    s = m.salas
+    for i in range(0, m.n_alunos, 37):
+        salas = np.flatnonzero((s["grupo"] == m.alunos["grupo"][i]) & (s["escola"] >= 0))
+        inicio = m.inicio_unidade[m.unidade[i]]
+        np.testing.assert_array_equal(m.dist_blocos[inicio + s["col_bloco"][salas]],
+                                      m.distance(np.full(len(salas), i), s["escola"][salas]))
@@ -0,0 +1,54 @@
+"""Sorteio esparso das posições mutadas (mutacao.py)."""
+import random
+
+import numpy as np
+import pytest
+
+from mutacao import sample_positions
+
+
+@pytest.mark.parametrize("n, indpb", [(1, 0.5), (10, 0.3), (1000, 0.03), (5000, 0.9)])
+def test_positions_sorted_unique_and_in_bounds(n, indpb):
+    rnd = random.Random(0)
+    for _ in range(200):
+        posicoes = sample_positions(n, indpb, rnd)
+        assert posicoes == sorted(set(posicoes))
+        assert all(0 <= p < n for p in posicoes)
+
+
+@pytest.mark.parametrize("n, indpb, esperado", [
+    (0, 0.5, []),
+    (-3, 0.5, []),
+    (10, 0.0, []),
+    (10, -0.1, []),
+    (4, 1.0, [0, 1, 2, 3]),
+    (4, 1.5, [0, 1, 2, 3]),
+])
+def test_edge_cases(n, indpb, esperado):
+    assert sample_positions(n, indpb) == esperado
+
+
+def test_count_is_binomial():
+    rnd = random.Random(1)
+    n, indpb, amostras = 400, 0.05, 4000
+    contagens = np.array([len(sample_positions(n, indpb, rnd)) for _ in range(amostras)])
+    media, variancia = n * indpb, n * indpb * (1 - indpb)
+    # Média com tolerância de 5 erros-padrão; variância dentro de 10%
+    assert abs(contagens.mean() - media) < 5 * np.sqrt(variancia / amostras)
+    assert abs(contagens.var() / variancia - 1) < 0.1
+
+
+def test_every_position_has_probability_indpb():
+    rnd = random.Random(2)
+    n, indpb, amostras = 50, 0.2, 20000
+    frequencia = np.zeros(n)
+    for _ in range(amostras):
+        frequencia[sample_positions(n, indpb, rnd)] += 1
+    frequencia /= amostras
+    erro_padrao = np.sqrt(indpb * (1 - indpb) / amostras)
+    assert np.abs(frequencia - indpb).max() < 5 * erro_padrao
+
+
+def test_reproducible_with_seeded_generator():
+    assert (sample_positions(10000, 0.01, random.Random(42))
+            == sample_positions(10000, 0.01, random.Random(42)))
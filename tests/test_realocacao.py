@@ -0,0 +1,85 @@
+"""Realocação incremental (realocacao.py e main2.solve_incremental)."""
+import random
+
+import pytest
+
+import gerador_dados
+import main2
+from realocacao import plan_reallocation
+
+
+def _salas(vagas):
+    return {id_sala: {"etapa": 1, "horario": 0, "vagas": v} for id_sala, v in vagas.items()}
+
+
+def _alunos(n):
+    return [{"id": str(i), "etapa": 1, "horario": 0} for i in range(n)]
+
+
+# Sala 1 é a mais barata para todos; a sala 2 é a alternativa
+OPCOES = [[1, 2]] * 4
+CUSTO = {1: 1.0, 2: 2.0}.__getitem__
+
+
+def _plan(anterior, alunos, vagas, vagas_anteriores=None):
+    return plan_reallocation(anterior, alunos, _salas(vagas), OPCOES,
+                             lambda i, s: CUSTO(s), vagas_anteriores=vagas_anteriores)
+
+
+def test_spare_seats_from_before_free_nobody():
+    anterior = {"0": (1, 1, 0), "1": (2, 1, 0), "2": (2, 1, 0)}
+    solucao, livres, info = _plan(anterior, _alunos(3), {1: 3, 2: 3})
+    assert livres == [] and info["vizinhanca"] == 0
+    assert solucao == [1, 2, 2]
+
+
+def test_departure_opens_a_seat_for_the_neighbourhood():
+    anterior = {"0": (1, 1, 0), "1": (1, 1, 0), "2": (2, 1, 0), "3": (2, 1, 0)}
+    # O aluno "1" desistiu: a vaga aberta na sala 1 libera quem está na sala 2
+    alunos = [a for a in _alunos(4) if a["id"] != "1"]
+    _, livres, info = _plan(anterior, alunos, {1: 2, 2: 2})
+    assert info["desistentes"] == 1
+    assert info["vizinhanca"] == 2 and sorted(livres) == [1, 2]
+
+
+def test_capacity_increase_needs_previous_capacity():
+    anterior = {"0": (1, 1, 0), "1": (2, 1, 0)}
+    _, livres, _ = _plan(anterior, _alunos(2), {1: 2, 2: 1})
+    assert livres == []
+    _, livres, info = _plan(anterior, _alunos(2), {1: 2, 2: 1}, vagas_anteriores={1: 1, 2: 1})
+    assert livres == [1] and info["vizinhanca"] == 1
+
+
+@pytest.fixture(scope="module")
+def problem_folgado():
+    """Instância com vagas sobrando (folga 1.5): há para onde mover alunos."""
+    alunos, escolas, salas = gerador_dados.generate(600, folga=1.5, seed=3)
+    return main2.Problem(alunos, escolas, salas)
+
+
+def test_unchanged_inputs_keep_every_assignment(problem_folgado, tmp_path):
+    problem = problem_folgado
+    # Alocação viável mas não ótima (alunos trocados de sala ao acaso entre candidatas com vaga)
+    rnd = random.Random(4)
+    regret = main2.run_regret(problem, main2.DEFAULT_PARAMS)
+    genes = list(regret)
+    livres = {s: problem.vagas[s] for s in problem.vagas}
+    for s in genes:
+        if s in livres:
+            livres[s] -= 1
+    for i in rnd.sample(range(problem.n_alunos), problem.n_alunos // 5):
+        opcoes = [int(s) for s in problem.candidatas[i, :problem.n_opcoes[i]]
+                  if livres.get(int(s), 0) > 0 and s != genes[i]]
+        if opcoes:
+            livres[genes[i]] = livres.get(genes[i], 0) + 1
+            genes[i] = rnd.choice(opcoes)
+            livres[genes[i]] -= 1
+    anterior = main2.finish_individual(problem, list(genes))
+    caminho = tmp_path / "alocacao_anterior.txt"
+    main2.write_allocation(problem, anterior, str(caminho))
+
+    assert anterior.fitness.values[0] > regret.fitness.values[0]
+
+    atual = main2.solve_incremental(problem, str(caminho))
+
+    assert list(atual) == list(anterior)
@@ -0,0 +1,116 @@
+"""Reparo de capacidade (reparo.py)."""
+import random
+
+import numpy as np
+import pytest
+
+import main2
+from avaliador import mark_changed
+from reparo import repair_capacity
+
+
+def _instance(rng, n_alunos, n_salas, k, folga):
+    """Candidatas (alunos × k, sem repetição) ordenadas por custo, e vagas com `folga`."""
+    custos_salas = rng.random((n_alunos, n_salas))
+    candidatas = np.argsort(custos_salas, axis=1)[:, :k].astype(np.int64)
+    custos = np.take_along_axis(custos_salas, candidatas, axis=1)
+    vagas = rng.multinomial(int(n_alunos * folga) - n_salas, np.full(n_salas, 1 / n_salas)) + 1
+    return candidatas, custos, vagas
+
+
+def _occupancy(salas, n_salas, pesos=None):
+    alocados = salas >= 0
+    return np.bincount(salas[alocados], None if pesos is None else pesos[alocados],
+                       minlength=n_salas).astype(np.int64)
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_no_room_over_capacity_when_every_room_is_a_candidate(semente):
+    rng = np.random.default_rng(semente)
+    n_alunos, n_salas = 500, 20
+    candidatas, custos, vagas = _instance(rng, n_alunos, n_salas, n_salas, 1.1)
+    salas = candidatas[np.arange(n_alunos), rng.integers(0, 3, n_alunos)]
+    salas[rng.random(n_alunos) < 0.05] = -1
+    antes = salas.copy()
+
+    movidos = repair_capacity(salas, vagas, candidatas, custos)
+
+    assert (_occupancy(salas, n_salas) <= vagas).all()
+    np.testing.assert_array_equal(np.flatnonzero(salas != antes), np.unique(movidos))
+    assert (salas[antes < 0] == -1).all()
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_repair_never_overfills_rooms_with_pruned_candidates(semente):
+    rng = np.random.default_rng(semente)
+    n_alunos, n_salas = 500, 30
+    candidatas, custos, vagas = _instance(rng, n_alunos, n_salas, 4, 1.0)
+    salas = candidatas[:, 0].copy()
+    cheias_antes = _occupancy(salas, n_salas) > vagas
+
+    movidos = repair_capacity(salas, vagas, candidatas, custos)
+
+    depois = _occupancy(salas, n_salas)
+    assert (depois[~cheias_antes] <= vagas[~cheias_antes]).all()
+    for i in movidos:
+        assert salas[i] in candidatas[i]
+    # Quem ainda está em sala lotada não tinha candidata com vaga
+    livres = vagas - depois
+    for r in np.flatnonzero(depois > vagas):
+        for i in np.flatnonzero(salas == r):
+            assert all(livres[s] < 1 for s in candidatas[i] if s != r)
+
+
+def test_weighted_units_respect_capacity():
+    rng = np.random.default_rng(1)
+    n_unidades, n_salas = 200, 15
+    pesos = rng.integers(1, 4, n_unidades)
+    candidatas, custos, _ = _instance(rng, n_unidades, n_salas, n_salas, 1.0)
+    vagas = np.full(n_salas, int(pesos.sum() * 1.3) // n_salas + 3)
+    salas = candidatas[:, 0].copy()
+
+    repair_capacity(salas, vagas, candidatas, custos, pesos=pesos)
+
+    assert (_occupancy(salas, n_salas, pesos) <= vagas).all()
+
+
+def test_given_occupancy_is_used(problem):
+    n_salas = problem.modelo.n_salas
+    salas = problem.modelo.candidatas[:, 0].astype(np.int64)
+    ocupacao = _occupancy(salas, n_salas)
+    copia = salas.copy()
+    vagas = problem.modelo.salas["vagas"]
+
+    movidos = repair_capacity(salas, vagas, problem.modelo.candidatas, problem.custo_candidatas,
+                              ocupacao=ocupacao)
+    assert movidos == repair_capacity(copia, vagas, problem.modelo.candidatas,
+                                      problem.custo_candidatas)
+    np.testing.assert_array_equal(salas, copia)
+
+
+def test_repair_individual_leaves_no_room_over_capacity(problem):
+    rnd = random.Random(5)
+    genes = [int(problem.candidatas[i, rnd.randrange(min(2, problem.n_opcoes[i]))])
+             for i in range(problem.n_alunos)]
+    ind = main2.creator.Individual(genes)
+    problem.evaluator.evaluate(ind)
+
+    main2.repair_individual(ind, problem)
+
+    salas = problem.dense_rooms(ind)
+    ocupacao = _occupancy(salas.astype(np.int64), problem.modelo.n_salas)
+    assert (ocupacao <= problem.modelo.salas["vagas"]).all()
+
+
+def test_occupancy_array_matches_recount(problem):
+    rnd = random.Random(3)
+    ind = main2.creator.Individual(problem.candidatas[:, 0].tolist())
+    problem.evaluator.evaluate(ind)
+    ids = problem.modelo.salas["id"].tolist() + [main2.UNASSIGNED_ID]
+    for i in rnd.sample(range(len(ind)), 20):
+        mark_changed(ind, i)
+        ind[i] = rnd.choice(ids)
+
+    salas = problem.dense_rooms(ind)
+    esperado = np.bincount(salas[salas >= 0], minlength=problem.modelo.n_salas)
+    np.testing.assert_array_equal(main2.occupancy_array(ind, problem), esperado)
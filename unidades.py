@@ -0,0 +1,54 @@
+"""
+Agregação de alunos idênticos em unidades com contagem.
+
+Alunos com as mesmas coordenadas (irmãos, geocodificação no mesmo endereço
+ou no centroide da quadra), a mesma etapa, o mesmo horário e a mesma
+necessidade especial são intercambiáveis em todos os motores. Em vez de um
+gene, uma linha de distâncias e uma lista de candidatas por aluno, cada
+grupo desses vira uma unidade com `contagem` alunos:
+
+- o pré-processamento (distâncias e candidatas) roda uma vez por unidade e
+  é expandido por aluno com um gather (`unidade`);
+- os motores que trabalham com unidades decidem quantos alunos de cada
+  unidade vão para cada sala (`divisoes`: lista de (sala, quantidade) por
+  unidade) ou uma sala por unidade inteira (AG vetorizado);
+- `expand_splits` devolve a alocação por aluno, na ordem original.
+"""
+import numpy as np
+
+
+def aggregate(*colunas):
+    """
+    Agrupa as linhas com valores iguais em todas as `colunas`.
+
+    Retorna (unidade, representante, contagem): a unidade de cada linha, a
+    primeira linha de cada unidade e o número de linhas de cada unidade.
+    As unidades seguem a ordem crescente das chaves.
+    """
+    chaves = np.rec.fromarrays([np.asarray(c) for c in colunas])
+    _, representante, unidade, contagem = np.unique(chaves, return_index=True,
+                                                    return_inverse=True, return_counts=True)
+    return unidade.reshape(-1), representante, contagem
+
+
+def members(unidade, n_unidades):
+    """Linhas de cada unidade (em ordem crescente), como lista de arrays."""
+    ordem = np.argsort(unidade, kind="stable")
+    limites = np.cumsum(np.bincount(unidade, minlength=n_unidades))[:-1]
+    return np.split(ordem, limites)
+
+
+def expand_splits(unidade, divisoes, sem_sala=-1):
+    """
+    Alocação por aluno a partir das `divisoes` por unidade (listas de
+    (sala, quantidade)): os primeiros alunos da unidade, na ordem original,
+    vão para a primeira sala, e assim por diante. Alunos que sobram ficam
+    com `sem_sala`.
+    """
+    solucao = np.full(len(unidade), sem_sala, dtype=np.int64)
+    for linhas, divisao in zip(members(unidade, len(divisoes)), divisoes):
+        ini = 0
+        for sala, quantidade in divisao:
+            solucao[linhas[ini:ini + quantidade]] = sala
+            ini += quantidade
+    return solucao